@@ -0,0 +1,243 @@
+# Online backup / restore of the SQLite DB (backup API, gzip, rotating catalogued directory).
+# Notes:
+# - Backups copy through sqlite3's backup API `pages` at a time with a short sleep between steps,
+#   so a rollback-journal writer waits at most one step; in WAL mode readers never block writers
+#   anyway. A commit from another connection restarts the copy, so after `max_restarts` restarts
+#   without progress the copy finishes in one step (a single read transaction) instead
+# - The copy is PRAGMA integrity_check'ed, then gzip-compressed in 1 MB chunks (sha256 on the fly)
+#   to <dir>/saree_crm-<UTC stamp>-<reason>.db.gz; only the compressed file is kept
+# - catalog.json records every backup (size, pages, checksum, timing, reason); the newest `keep`
+#   files stay on disk, older ones are deleted and marked "pruned" so the history survives.
+#   "pre-restore" safety copies rotate on their own (`keep_safety`), so routine backups never push
+#   out the only copy of data a restore overwrote
+# - dump() writes the same kind of file outside the catalog (one-off downloads)
+# - Restore goes the other way: the uploaded file is checked, a "pre-restore" backup is taken and
+#   the backup API copies the upload *into* the live DB in one step. That is a single write
+#   transaction, so every connection in every worker sees either the old or the new DB, never a
+#   torn file (no os.replace under open connections); callers then dispose their pools
+
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+CHUNK = 1 << 20
+REQUIRED_TABLES = ("customer", "order")
+
+
+class BackupError(Exception):
+    pass
+
+
+class _NoProgress(Exception):
+    pass
+
+
+def online_backup(src_path, dest_path, pages=1024, sleep=0.005, max_restarts=3):
+    """Page-stepped backup API copy of src into a new file; returns {"pages", "restarts", "steps"}."""
+    dest_path = Path(dest_path)
+    dest_path.unlink(missing_ok=True)
+    stats = {"pages": 0, "restarts": 0, "steps": 0}
+    last = [None]
+
+    def progress(status, remaining, total):
+        stats["pages"], stats["steps"] = total, stats["steps"] + 1
+        if last[0] is not None and remaining >= last[0]:   # a writer committed: copy started over
+            stats["restarts"] += 1
+            if stats["restarts"] > max_restarts:
+                raise _NoProgress()
+        last[0] = remaining
+
+    src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True, timeout=30)
+    try:
+        dst = sqlite3.connect(dest_path)
+        try:
+            try:
+                src.backup(dst, pages=pages, progress=progress, sleep=sleep)
+            except _NoProgress:
+                src.backup(dst)   # busy DB: one read transaction, no restarts
+            dst.execute("PRAGMA journal_mode=DELETE")   # self-contained file, no -wal
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return stats
+
+
+def check_database(path):
+    """Raise BackupError unless `path` is an intact SQLite DB with the CRM tables."""
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"not a SQLite database: {e}") from None
+    if result != "ok":
+        raise BackupError(f"integrity check failed: {result}")
+    missing = [t for t in REQUIRED_TABLES if t not in tables]
+    if missing:
+        raise BackupError(f"missing tables: {', '.join(missing)}")
+
+
+def gzip_file(src, dest):
+    """Stream-compress src to dest; returns (compressed bytes, sha256 of the uncompressed data)."""
+    digest = hashlib.sha256()
+    tmp = Path(str(dest) + ".tmp")
+    with open(src, "rb") as fin, open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as gz:
+            while True:
+                chunk = fin.read(CHUNK)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                gz.write(chunk)
+    os.replace(tmp, dest)
+    return Path(dest).stat().st_size, digest.hexdigest()
+
+
+def save_upload(stream, dest):
+    """Write an uploaded .db or .db.gz stream to dest (decompressed, chunk by chunk)."""
+    head = stream.read(2)
+    with open(dest, "wb") as out:
+        if head == b"\x1f\x8b":
+            with gzip.GzipFile(fileobj=_Prefixed(head, stream), mode="rb") as gz:
+                shutil.copyfileobj(gz, out, CHUNK)
+        else:
+            out.write(head)
+            shutil.copyfileobj(stream, out, CHUNK)
+
+
+class _Prefixed:
+    """File-like: `head` bytes already read, then the rest of `stream`."""
+
+    def __init__(self, head, stream):
+        self.head, self.stream = head, stream
+
+    def read(self, n=-1):
+        if not self.head:
+            return self.stream.read(n)
+        if n is None or n < 0:
+            out, self.head = self.head, b""
+            return out + self.stream.read()
+        out, self.head = self.head[:n], self.head[n:]
+        return out + (self.stream.read(n - len(out)) if n > len(out) else b"")
+
+
+def restore_into(db_path, source_path, busy_timeout=30):
+    """Copy source over the live DB through the backup API (one write transaction)."""
+    src = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    try:
+        dst = sqlite3.connect(db_path, timeout=busy_timeout)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+
+def write_backup(db_path, dest, pages=1024, sleep=0.005):
+    """Online backup of db_path, checked and gzip'd to dest; returns its size / checksum / copy stats."""
+    dest = Path(dest)
+    raw = dest.with_name(dest.name + ".raw")
+    try:
+        copy = online_backup(db_path, raw, pages, sleep)
+        check_database(raw)
+        db_bytes = raw.stat().st_size
+        size, sha = gzip_file(raw, dest)
+    finally:
+        raw.unlink(missing_ok=True)
+    return {"bytes": size, "db_bytes": db_bytes, "sha256": sha, **copy}
+
+
+class BackupStore:
+    """Rotating directory of gzip'd backups plus catalog.json (see the notes at the top)."""
+
+    SAFETY = "pre-restore"
+
+    def __init__(self, directory, keep=14, keep_safety=5, pages=1024, sleep=0.005):
+        self.dir = Path(directory)
+        self.keep = keep
+        self.keep_safety = keep_safety
+        self.pages = pages
+        self.sleep = sleep
+        self.catalog_path = self.dir / "catalog.json"
+
+    # --- catalog -----------------------------------------------------------------------
+    def _lock(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        fh = open(self.dir / ".lock", "w")
+        fcntl.flock(fh, fcntl.LOCK_EX)   # one backup / prune at a time per host
+        return fh
+
+    def _load(self):
+        try:
+            return json.loads(self.catalog_path.read_text())
+        except (OSError, ValueError):
+            return []
+
+    def _save(self, entries):
+        tmp = self.catalog_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entries, indent=1))
+        os.replace(tmp, self.catalog_path)
+
+    def entries(self, include_pruned=True):
+        """Catalog entries, newest first."""
+        out = [e for e in self._load() if include_pruned or not e.get("pruned")]
+        return sorted(out, key=lambda e: e["created"], reverse=True)
+
+    def path(self, name):
+        """Path of a kept backup by file name, or None."""
+        name = Path(name).name
+        for e in self._load():
+            if e["file"] == name and not e.get("pruned") and (self.dir / name).exists():
+                return self.dir / name
+        return None
+
+    # --- operations ----------------------------------------------------------------------
+    def create(self, db_path, reason="manual"):
+        """Back up db_path into the store; returns its catalog entry."""
+        reason = "".join(ch for ch in reason if ch.isalnum() or ch in "-_")[:20] or "manual"
+        with self._lock():
+            t0 = time.perf_counter()
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+            name = f"{Path(db_path).stem}-{stamp}-{reason}.db.gz"
+            entry = {"file": name, "created": time.time(), "reason": reason,
+                     **write_backup(db_path, self.dir / name, self.pages, self.sleep),
+                     "seconds": round(time.perf_counter() - t0, 3)}
+            entries = self._load()
+            entries.append(entry)
+            self._prune(entries)
+            self._save(entries)
+        return entry
+
+    def dump(self, db_path):
+        """A one-off backup file outside the catalog and rotation (caller deletes it); returns its path."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        dest = self.dir / f"dump-{os.urandom(8).hex()}.db.gz"
+        write_backup(db_path, dest, self.pages, self.sleep)
+        return dest
+
+    def _prune(self, entries):
+        live = sorted((e for e in entries if not e.get("pruned")), key=lambda e: e["created"], reverse=True)
+        routine = [e for e in live if e["reason"] != self.SAFETY]
+        safety = [e for e in live if e["reason"] == self.SAFETY]
+        for e in routine[self.keep:] + safety[self.keep_safety:]:
+            (self.dir / e["file"]).unlink(missing_ok=True)
+            e["pruned"] = time.time()
+
+    def restore(self, db_path, upload_path):
+        """Check `upload_path`, back up the live DB ("pre-restore"), then copy the upload in."""
+        check_database(upload_path)
+        safety = self.create(db_path, reason=self.SAFETY)
+        restore_into(db_path, upload_path)
+        return safety
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# Large synthetic dataset for benchmarking (customers, orders, follow-ups).
+# Notes:
+# - Columns are generated a batch at a time (NumPy when installed, stdlib random otherwise)
+#   and written with plain sqlite3 executemany, one transaction per batch
+# - Distributions: weighted saree types with per-type price bands, 70/30 Paid/Pending,
+#   festive/wedding-season peaks in the order dates, and a few heavy repeat buyers
+# - Human IDs come from id_sequence (allocate), so the app keeps numbering after the load
+# - FTS, data_version and customer_stats triggers are dropped for the load; afterwards the summary
+#   tables, customer_stats, FTS indexes, secondary indexes and triggers are rebuilt in one pass each
+#
+# Usage: python bench/generate_data.py --db /tmp/big.db [--customers 1000000] [--orders 10000000]
+#        [--followups N] [--days 730] [--seed 42]
+# To load into the app's own DB, run `python saree_crm_flask_app.py --init` first and pass its path.
+
+import argparse
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import column, create_engine, table  # noqa: E402
+
+from customer_stats import drop_customer_stats_triggers, ensure_customer_stats, rebuild_customer_stats  # noqa: E402
+from id_sequences import allocate, ensure_id_sequence_table  # noqa: E402
+from response_cache import bump_versions, drop_data_version_triggers, ensure_data_version  # noqa: E402
+from search_index import INDEXES, ensure_search_index  # noqa: E402
+from summary_tables import ensure_summary_tables, rebuild_aggregates  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:   # optional; the stdlib path produces the same distributions, just slower
+    np = None
+
+BATCH = 50000
+
+# mirrors the models in saree_crm_flask_app.py (used only when the DB is empty)
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS customer (
+        id INTEGER PRIMARY KEY, customer_id VARCHAR(64) NOT NULL UNIQUE, name VARCHAR(120) NOT NULL,
+        insta VARCHAR(120), phone VARCHAR(32), city VARCHAR(120), ctype VARCHAR(64), notes TEXT)""",
+    """CREATE TABLE IF NOT EXISTS "order" (
+        id INTEGER PRIMARY KEY, order_id VARCHAR(64) NOT NULL UNIQUE, date DATE NOT NULL,
+        customer_id VARCHAR(64) NOT NULL REFERENCES customer (customer_id), saree_type VARCHAR(120),
+        amount INTEGER, purchase_type VARCHAR(16), payment_status VARCHAR(16),
+        payment_mode VARCHAR(16), delivery_status VARCHAR(16), remarks TEXT)""",
+    """CREATE TABLE IF NOT EXISTS follow_up (
+        id INTEGER PRIMARY KEY, customer_id VARCHAR(64) NOT NULL REFERENCES customer (customer_id),
+        followup_date DATE NOT NULL, notes TEXT, status VARCHAR(32))""",
+]
+INDEXES_SQL = [
+    'CREATE INDEX IF NOT EXISTS ix_order_date ON "order" (date)',
+    'CREATE INDEX IF NOT EXISTS ix_order_payment_status_date ON "order" (payment_status, date)',
+    'CREATE INDEX IF NOT EXISTS ix_order_payment_status_mode ON "order" (payment_status, payment_mode)',
+    'CREATE INDEX IF NOT EXISTS ix_order_customer_id_date ON "order" (customer_id, date)',
+    "CREATE INDEX IF NOT EXISTS ix_follow_up_followup_date ON follow_up (followup_date)",
+    "CREATE INDEX IF NOT EXISTS ix_follow_up_status_followup_date ON follow_up (status, followup_date)",
+    "CREATE INDEX IF NOT EXISTS ix_follow_up_customer_id ON follow_up (customer_id)",
+]
+
+FIRST = ["Anita", "Bhavya", "Charu", "Divya", "Eesha", "Farah", "Gita", "Hema", "Ishita", "Jaya", "Kajal",
+         "Lakshmi", "Meera", "Nisha", "Oviya", "Pooja", "Rani", "Sarita", "Tanya", "Uma", "Varsha", "Yamini", "Zara"]
+LAST = ["Agarwal", "Bhat", "Chandra", "Desai", "Iyer", "Jain", "Kapoor", "Khanna", "Menon", "Nair",
+        "Patel", "Rao", "Reddy", "Shah", "Sharma", "Singh", "Verma"]
+CITIES = (["Hyderabad", "Secunderabad", "Warangal", "Vijayawada", "Guntur", "Nizamabad"], [40, 15, 12, 14, 11, 8])
+CTYPES = (["Regular", "New", "VIP"], [60, 32, 8])
+# type -> (weight, low price, high price)
+SAREES = {
+    "Cotton": (22, 699, 1999), "Silk": (16, 2499, 8999), "Georgette": (12, 999, 2999),
+    "Chiffon": (10, 899, 2499), "Linen": (9, 1299, 3499), "Kanchipuram": (8, 4999, 18999),
+    "Banarasi": (8, 3999, 14999), "Organza": (6, 1499, 3999), "Kota": (5, 799, 1999), "Paithani": (4, 5999, 21999),
+}
+# Jan..Dec: wedding season (Nov-Feb), Ugadi/summer weddings (Apr-May), festive peak (Oct-Nov)
+MONTH_WEIGHTS = [1.3, 1.2, 0.8, 1.1, 1.1, 0.7, 0.6, 0.8, 1.0, 1.6, 1.7, 1.3]
+REMARKS = (["", "Gift", "Urgent", "Repeat buyer", "First-time buyer", "Wedding"], [70, 8, 5, 9, 5, 3])
+FOLLOWUP_NOTES = ["Call about new arrivals", "Payment reminder", "Delivery check", "Wedding collection",
+                  "Send festive catalogue", "Alteration request"]
+
+
+class Columns:
+    """Batch column generator: NumPy Generator when available, random.Random otherwise."""
+
+    def __init__(self, seed):
+        self.rng = np.random.default_rng(seed) if np else random.Random(seed)
+
+    def choice(self, values, weights, n):
+        if np:
+            p = np.asarray(weights, dtype=float)
+            return np.asarray(values, dtype=object)[self.rng.choice(len(values), n, p=p / p.sum())].tolist()
+        return self.rng.choices(values, weights, k=n)
+
+    def uniform(self, n):
+        if np:
+            return self.rng.random(n).tolist()
+        return [self.rng.random() for _ in range(n)]
+
+    def ints(self, lo, hi, n):
+        """n ints in [lo, hi]."""
+        if np:
+            return self.rng.integers(lo, hi + 1, n).tolist()
+        r = self.rng.randint
+        return [r(lo, hi) for _ in range(n)]
+
+
+def day_weights(days, today):
+    """Relative order volume for each of the last `days` days (seasonality + steady growth)."""
+    start = today - timedelta(days=days - 1)
+    out = []
+    for i in range(days):
+        d = start + timedelta(days=i)
+        weekend = 1.25 if d.weekday() >= 5 else 1.0
+        out.append(MONTH_WEIGHTS[d.month - 1] * weekend * (0.6 + 0.4 * i / max(days - 1, 1)))
+    return start, out
+
+
+def customers(gen, n, id_iter):
+    ids = [next(id_iter) for _ in range(n)]
+    first, last = gen.choice(FIRST, [1] * len(FIRST), n), gen.choice(LAST, [1] * len(LAST), n)
+    phones = gen.ints(6000000000, 9999999999, n)
+    cities = gen.choice(*CITIES, n)
+    ctypes = gen.choice(*CTYPES, n)
+    insta = gen.uniform(n)
+    for i in range(n):
+        name = f"{first[i]} {last[i]}"
+        handle = f"@{first[i].lower()}.{last[i].lower()}{ids[i][-4:]}" if insta[i] < 0.35 else None
+        yield (ids[i], name, handle, str(phones[i]), cities[i], ctypes[i], None)
+
+
+def orders(gen, n, cust_ids, start, weights):
+    types = list(SAREES)
+    saree = gen.choice(types, [SAREES[t][0] for t in types], n)
+    price_u = gen.uniform(n)
+    # u**3 skews toward low indexes: a small set of customers places many orders
+    who = [cust_ids[int(u ** 3 * len(cust_ids))] for u in gen.uniform(n)]
+    days = gen.choice(list(range(len(weights))), weights, n)
+    paid = gen.uniform(n)
+    mode = gen.choice(["UPI", "Cash"], [65, 35], n)
+    purchase = gen.choice(["Online", "Offline"], [55, 45], n)
+    deliv = gen.uniform(n)
+    remarks = gen.choice(*REMARKS, n)
+    for i in range(n):
+        _, lo, hi = SAREES[saree[i]]
+        amount = int((lo + (hi - lo) * price_u[i] ** 2) // 100 * 100 + 99)   # x99 price points
+        d = start + timedelta(days=days[i])
+        if paid[i] < 0.7:
+            status, pmode = "Paid", mode[i]
+            delivery = "Delivered" if deliv[i] < 0.70 else "Shipped" if deliv[i] < 0.95 else "Pending"
+        else:
+            status, pmode = "Pending", "Pending"
+            delivery = "Pending" if deliv[i] < 0.95 else "Cancelled"
+        yield [None, d, who[i], saree[i], amount, purchase[i], status, pmode, delivery, remarks[i]]
+
+
+def followups(gen, n, cust_ids, start, days, today):
+    who = [cust_ids[int(u ** 2 * len(cust_ids))] for u in gen.uniform(n)]
+    offs = gen.ints(0, days + 30, n)
+    done = gen.uniform(n)
+    notes = gen.choice(FOLLOWUP_NOTES, [1] * len(FOLLOWUP_NOTES), n)
+    for i in range(n):
+        d = start + timedelta(days=offs[i])
+        status = "Open" if d >= today or done[i] < 0.15 else "Done"
+        yield (who[i], d.isoformat(), notes[i], status)
+
+
+def _batches(gen, make, n, *args):
+    """n rows of `make(gen, size, *args)`, generated and yielded BATCH rows at a time."""
+    for off in range(0, n, BATCH):
+        yield list(make(gen, min(BATCH, n - off), *args))
+
+
+def _tick(label, done, total, t0):
+    rate = done / max(time.perf_counter() - t0, 1e-9)
+    print(f"\r{label}: {done:,}/{total:,} ({rate:,.0f} rows/s)", end="", flush=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a large synthetic CRM dataset")
+    ap.add_argument("--db", required=True, help="SQLite file to create or append to")
+    ap.add_argument("--customers", type=int, default=1_000_000)
+    ap.add_argument("--orders", type=int, default=10_000_000)
+    ap.add_argument("--followups", type=int, help="default: orders / 5")
+    ap.add_argument("--days", type=int, default=730, help="order dates span the last N days")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    n_follow = args.orders // 5 if args.followups is None else args.followups
+
+    today = date.today()
+    gen = Columns(args.seed)
+    engine = create_engine(f"sqlite:///{args.db}")
+    ensure_id_sequence_table(engine)
+    cust_col = table("customer", column("customer_id")).c.customer_id
+    order_col = table("order", column("order_id")).c.order_id
+    print(f"generator: {'numpy' if np else 'stdlib random'}; batch={BATCH:,}")
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")   # bulk load: a crash means re-running the script
+    conn.execute("PRAGMA cache_size=-200000")
+    for ddl in SCHEMA:
+        conn.execute(ddl)
+    for idx in INDEXES.values():
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {idx.name}_{suffix}")
+    conn.commit()
+    with engine.begin() as sa:
+        drop_data_version_triggers(sa)
+        drop_customer_stats_triggers(sa)
+    t_all = time.perf_counter()
+
+    # customers: one id_sequence reservation for the whole run
+    if args.customers:
+        with engine.begin() as sa:
+            last = allocate(sa, "CUST", "", cust_col, sep="", n=args.customers)
+        width = max(6, len(str(last)))
+        cust_ids = [f"CUST{str(i).zfill(width)}" for i in range(last - args.customers + 1, last + 1)]
+    else:   # --customers 0: attach new orders to the customers already in the DB
+        cust_ids = [r[0] for r in conn.execute("SELECT customer_id FROM customer")]
+    t0, done = time.perf_counter(), 0
+    for batch in _batches(gen, customers, args.customers, iter(cust_ids)):
+        conn.executemany("INSERT INTO customer (customer_id, name, insta, phone, city, ctype, notes) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+        conn.commit()
+        done += len(batch)
+        _tick("customers", done, args.customers, t0)
+    print()
+    if not cust_ids:
+        sys.exit("no customers to attach orders to")
+
+    # orders: generated per batch, numbered per day from id_sequence
+    start, weights = day_weights(args.days, today)
+    t0, done = time.perf_counter(), 0
+    for batch in _batches(gen, orders, args.orders, cust_ids, start, weights):
+        per_day = {}
+        for row in batch:
+            per_day.setdefault(row[1], []).append(row)
+        with engine.begin() as sa:
+            for d, rows in per_day.items():
+                day = d.strftime("%Y%m%d")
+                seq = allocate(sa, "ORD", day, order_col, n=len(rows)) - len(rows)
+                for row in rows:
+                    seq += 1
+                    row[0] = f"ORD{day}-{str(seq).zfill(5)}"
+                    row[1] = d.isoformat()
+        conn.executemany('INSERT INTO "order" (order_id, date, customer_id, saree_type, amount, purchase_type, '
+                         "payment_status, payment_mode, delivery_status, remarks) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        conn.commit()
+        done += len(batch)
+        _tick("orders", done, args.orders, t0)
+    print()
+
+    t0, done = time.perf_counter(), 0
+    for batch in _batches(gen, followups, n_follow, cust_ids, start, args.days, today):
+        conn.executemany("INSERT INTO follow_up (customer_id, followup_date, notes, status) VALUES (?, ?, ?, ?)",
+                         batch)
+        conn.commit()
+        done += len(batch)
+        _tick("followups", done, n_follow, t0)
+    print()
+
+    t0 = time.perf_counter()
+    for ddl in INDEXES_SQL:
+        conn.execute(ddl)
+    conn.commit()
+    conn.close()
+    print(f"indexes: {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    if not ensure_summary_tables(engine):
+        rebuild_aggregates(engine)
+    print(f"summary tables: {time.perf_counter() - t0:.1f}s")
+    t0 = time.perf_counter()
+    ensure_customer_stats(engine, backfill=False)
+    rebuild_customer_stats(engine)
+    print(f"customer stats: {time.perf_counter() - t0:.1f}s")
+    t0 = time.perf_counter()
+    enabled = ensure_search_index(engine, rebuild=True)
+    print(f"search index ({', '.join(enabled) or 'none'}): {time.perf_counter() - t0:.1f}s")
+    ensure_data_version(engine)
+    with engine.begin() as sa:
+        bump_versions(sa)   # cached stats / ETags of a running app are now stale
+        sa.exec_driver_sql("ANALYZE")
+    print(f"total: {time.perf_counter() - t_all:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
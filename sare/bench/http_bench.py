@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# End-to-end HTTP benchmark: boots the app against generated DBs and drives every hot route.
+# Notes:
+# - One DB per --sizes entry (orders; customers = orders / 10), built by generate_data.py and
+#   cached under --workdir, so reruns on another commit measure the same data
+# - The app runs as a real server process (app.run, or gunicorn with --server gunicorn) with
+#   CRM_DB_PATH / CRM_LOG_FILE pointed at the work dir; load comes from a thread pool of
+#   keep-alive http.client connections
+# - Per route: p50/p95/p99 latency over 2xx/3xx responses only, req/s, status codes and the peak
+#   RSS of the process serving the requests while that route ran (VmHWM reset through
+#   /proc/<pid>/clear_refs; with gunicorn that is the worker, not the arbiter; Linux only, null
+#   elsewhere)
+# - A route that got any other status (errors, dropped connections) is marked invalid: it is not
+#   compared, and the run exits 1 after writing the report
+# - --compare old.json prints per-route deltas and exits 1 when a p95 regresses past --threshold
+#
+# Usage: python bench/http_bench.py [--sizes 1000,100000,1000000] [--requests 200] [--concurrency 8]
+#        [--json out.json] [--compare baseline.json]
+
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from pathlib import Path
+from urllib.parse import urlencode
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# (name, method, path template) -- {q}/{order_id}/{customer_id} are filled per request
+ROUTES = [
+    ("dashboard", "GET", "/dashboard"),
+    ("orders", "GET", "/orders"),
+    ("orders_search", "GET", "/orders?q={q}"),
+    ("customers_search", "GET", "/customers?q={q}"),
+    ("followups", "GET", "/followups"),
+    ("payments", "GET", "/payments"),
+    ("status", "GET", "/_status"),
+    ("order_create", "POST", "/orders"),
+    ("order_edit", "POST", "/orders/edit/{order_id}"),
+]
+SEARCH_TERMS = ["silk", "meera", "kanchi", "cotton", "hyderabad", "patel", "gift", "banarasi", "CUST0001"]
+
+
+def percentile(sorted_ms, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_ms:
+        return None
+    k = max(0, min(len(sorted_ms) - 1, math.ceil(pct / 100 * len(sorted_ms)) - 1))
+    return round(sorted_ms[k], 2)
+
+
+def child_pids(pid):
+    """Direct children of `pid` (/proc/<pid>/task/*/children, else a scan of /proc/*/stat)."""
+    kids = []
+    for task in Path(f"/proc/{pid}/task").glob("*/children"):
+        try:
+            kids += [int(p) for p in task.read_text().split()]
+        except OSError:
+            pass
+    if kids:
+        return kids
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            # "pid (comm) state ppid ...": comm may hold spaces, so split after the last ')'
+            if int(stat.read_text().rsplit(")", 1)[1].split()[1]) == pid:
+                kids.append(int(stat.parent.name))
+        except (OSError, IndexError, ValueError):
+            pass
+    return kids
+
+
+class RssMonitor:
+    """Peak resident set size between reset() and peak_kb() (Linux /proc).
+
+    workers=True watches the children of `pid` (gunicorn workers) instead of `pid` itself (the
+    arbiter, which serves nothing); they are looked up on every call, so respawns are followed."""
+
+    def __init__(self, pid, workers=False):
+        self.pid = pid
+        self.workers = workers
+
+    def pids(self):
+        return child_pids(self.pid) if self.workers else [self.pid]
+
+    def reset(self):
+        for pid in self.pids():
+            try:
+                Path(f"/proc/{pid}/clear_refs").write_text("5")   # 5 = reset VmHWM to the current RSS
+            except OSError:
+                pass
+
+    def peak_kb(self):
+        peaks = []
+        for pid in self.pids():
+            try:
+                for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                    if line.startswith("VmHWM:"):
+                        peaks.append(int(line.split()[1]))
+            except OSError:
+                pass
+        return max(peaks) if peaks else None
+
+
+def build_db(workdir, orders):
+    path = workdir / f"bench_{orders}.db"
+    if path.exists():
+        return path
+    tmp = path.with_suffix(".tmp")
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{tmp}{suffix}").unlink(missing_ok=True)
+    subprocess.run([sys.executable, str(APP_DIR / "bench" / "generate_data.py"), "--db", str(tmp),
+                    "--customers", str(max(orders // 10, 10)), "--orders", str(orders)], check=True)
+    with sqlite3.connect(tmp) as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    tmp.rename(path)
+    return path
+
+
+def sample_ids(path, n=500):
+    with sqlite3.connect(path) as conn:
+        custs = [r[0] for r in conn.execute("SELECT customer_id FROM customer ORDER BY random() LIMIT ?", (n,))]
+        orders = [r[0] for r in conn.execute('SELECT order_id FROM "order" ORDER BY random() LIMIT ?', (n,))]
+    return custs, orders
+
+
+def start_server(db_path, port, server, workdir):
+    env = dict(os.environ, CRM_DB_PATH=str(db_path), CRM_LOG_FILE=str(workdir / "bench_crm.log"),
+               PORT=str(port), FLASK_DEBUG="0")
+    if server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-w", "1", "--threads", "8", "-b", f"127.0.0.1:{port}",
+               "saree_crm_flask_app:app"]
+    else:
+        cmd = [sys.executable, "saree_crm_flask_app.py"]
+    proc = subprocess.Popen(cmd, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"server exited with {proc.returncode}; see {workdir / 'bench_crm.log'}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/_status")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    sys.exit("server did not come up within 120s")
+
+
+def order_form(custs, rng):
+    status = "Paid" if rng.random() < 0.7 else "Pending"
+    return {
+        "order_id": "", "date": date.today().isoformat(), "customer_id": rng.choice(custs),
+        "saree_type": rng.choice(["Silk", "Cotton", "Kanchipuram"]), "amount": str(rng.randrange(799, 9999, 100)),
+        "purchase_type": rng.choice(["Online", "Offline"]), "payment_status": status,
+        "payment_mode": rng.choice(["UPI", "Cash"]) if status == "Paid" else "Pending",
+        "delivery_status": "Pending", "remarks": "bench",
+    }
+
+
+def run_route(port, route, n, concurrency, custs, order_ids, rss):
+    name, method, template = route
+    local = threading.local()
+    rng = random.Random(name)
+
+    def one(i):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        path = template.format(q=SEARCH_TERMS[i % len(SEARCH_TERMS)], order_id=order_ids[i % len(order_ids)],
+                               customer_id=custs[i % len(custs)])
+        body, headers = None, {}
+        if method == "POST":
+            body = urlencode(order_form(custs, rng))
+            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            local.conn = None
+            status = 0
+        return (time.perf_counter() - t0) * 1000, status
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(min(n, 10))))   # warm-up: connections, plan cache, page cache
+        rss.reset()
+        t0 = time.perf_counter()
+        results = list(pool.map(one, range(n)))
+        wall = time.perf_counter() - t0
+
+    # an error page is usually fast: timing it would show a broken route as a speedup
+    lat = sorted(ms for ms, status in results if 200 <= status < 400)
+    codes = {}
+    for _, status in results:
+        codes[str(status)] = codes.get(str(status), 0) + 1
+    return {
+        "method": method, "path": template, "requests": n,
+        "p50_ms": percentile(lat, 50), "p95_ms": percentile(lat, 95), "p99_ms": percentile(lat, 99),
+        "max_ms": round(lat[-1], 2) if lat else None,
+        "req_per_s": round(n / wall, 1) if wall else None,
+        "status": codes, "errors": n - len(lat), "valid": len(lat) == n, "peak_rss_kb": rss.peak_kb(),
+    }
+
+
+def git_rev():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=APP_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "") or None
+    except OSError:
+        return None
+
+
+def compare(report, baseline_path, threshold):
+    """Print p95 deltas vs a previous report; returns the list of regressed (size, route).
+
+    Invalid routes (non-2xx/3xx responses) on either side are skipped; main() fails those itself."""
+    base = json.loads(Path(baseline_path).read_text())
+    regressed = []
+    print(f"\nvs {baseline_path} ({base['meta'].get('git')}):")
+    for size, routes in report["results"].items():
+        for name, r in routes.items():
+            old = base["results"].get(size, {}).get(name)
+            if not r.get("valid", True) or (old and not old.get("valid", True)):
+                print(f"  {size:>8} {name:18s} not compared: {r['status']} / {old and old['status']}")
+                continue
+            if not old or not old.get("p95_ms") or r["p95_ms"] is None:
+                continue
+            delta = (r["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            flag = ""
+            if delta > threshold:
+                flag = "  REGRESSION"
+                regressed.append((size, name))
+            print(f"  {size:>8} {name:18s} p95 {old['p95_ms']:>9} -> {r['p95_ms']:>9} ms ({delta:+.0f}%){flag}")
+    return regressed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="HTTP latency/throughput benchmark for the CRM routes")
+    ap.add_argument("--sizes", default="1000,100000,1000000", help="comma-separated order counts")
+    ap.add_argument("--requests", type=int, default=200, help="requests per route")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--routes", help="comma-separated subset of: " + ", ".join(r[0] for r in ROUTES))
+    ap.add_argument("--server", choices=["flask", "gunicorn"], default="flask")
+    ap.add_argument("--port", type=int, default=5055)
+    ap.add_argument("--workdir", default=str(Path.home() / ".cache" / "crm-bench"))
+    ap.add_argument("--json", help="write the report to this file")
+    ap.add_argument("--compare", help="previous --json report to diff against")
+    ap.add_argument("--threshold", type=float, default=20.0, help="p95 regression threshold in percent")
+    args = ap.parse_args()
+
+    routes = ROUTES
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        routes = [r for r in ROUTES if r[0] in wanted]
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    report = {
+        "meta": {
+            "git": git_rev(), "when": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(), "cpus": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("json", "compare", "workdir")},
+        },
+        "results": {},
+    }
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        db_path = build_db(workdir, size)
+        # the write routes mutate the DB; run each size on a throwaway copy
+        run_path = workdir / f"run_{size}.db"
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{run_path}{suffix}").unlink(missing_ok=True)
+        with sqlite3.connect(db_path) as src, sqlite3.connect(run_path) as dst:
+            src.backup(dst)
+        custs, order_ids = sample_ids(run_path)
+
+        proc = start_server(run_path, args.port, args.server, workdir)
+        rss = RssMonitor(proc.pid, workers=args.server == "gunicorn")
+        results = report["results"][str(size)] = {}
+        try:
+            print(f"\n{size:,} orders ({args.server}, {args.concurrency} clients, {args.requests} req/route)")
+            for route in routes:
+                r = results[route[0]] = run_route(args.port, route, args.requests, args.concurrency,
+                                                  custs, order_ids, rss)
+                print(f"  {route[0]:18s} p50={r['p50_ms']:>8} p95={r['p95_ms']:>8} p99={r['p99_ms']:>8} ms "
+                      f"{r['req_per_s']:>8} req/s  rss={r['peak_rss_kb']} kB  {r['status']}"
+                      + ("" if r["valid"] else "  INVALID"))
+        finally:
+            proc.terminate()
+            proc.wait(10)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    regressed = compare(report, args.compare, args.threshold) if args.compare else []
+    invalid = [(size, name) for size, routes in report["results"].items()
+               for name, r in routes.items() if not r["valid"]]
+    if invalid:
+        print("\nroutes with non-2xx/3xx responses: " + ", ".join(f"{name} @ {size}" for size, name in invalid))
+    if regressed or invalid:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
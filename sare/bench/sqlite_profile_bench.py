@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# Concurrent read/write throughput: stock SQLite settings vs the app's SQLiteProfile.
+# Notes:
+# - Each worker is a separate process (like Gunicorn workers) with its own SQLAlchemy engine
+# - Writers insert orders one commit at a time; readers run the listing query (date desc LIMIT 50)
+# - Reports ops/s and "database is locked" errors per side, as text and JSON
+#
+# Usage: python bench/sqlite_profile_bench.py [--seconds 5] [--readers 4] [--writers 2] [--json out.json]
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from sqlite_profile import SQLiteProfile, install_sqlite_profile  # noqa: E402
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS "order" (
+        id INTEGER PRIMARY KEY, order_id TEXT UNIQUE NOT NULL, date DATE NOT NULL,
+        customer_id TEXT NOT NULL, amount INTEGER, payment_status TEXT
+    )
+"""
+READ = text('SELECT id, order_id, date, amount FROM "order" ORDER BY date DESC, id DESC LIMIT 50')
+WRITE = text('INSERT INTO "order" (order_id, date, customer_id, amount, payment_status) '
+             "VALUES (:oid, date('now'), 'CUST000001', 999, 'Paid')")
+
+
+def make_engine(path, tuned):
+    # timeout=0: no driver-level retry, so the stock side shows what busy_timeout buys us
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0})
+    if tuned:
+        install_sqlite_profile(engine, SQLiteProfile.from_env())
+    return engine
+
+
+def worker(path, tuned, role, seconds, wid, out):
+    engine = make_engine(path, tuned)
+    ops = locked = 0
+    deadline = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < deadline:
+        try:
+            with engine.begin() as conn:
+                if role == "w":
+                    n += 1
+                    conn.execute(WRITE, {"oid": f"W{wid}-{n}-{time.time_ns()}"})
+                else:
+                    conn.execute(READ).all()
+            ops += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            locked += 1
+    out.put((role, ops, locked))
+
+
+def run(tuned, seconds, readers, writers, preload):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        with make_engine(path, tuned).begin() as conn:
+            conn.execute(text(SCHEMA))
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_order_date ON "order" (date)'))
+            conn.execute(WRITE, [{"oid": f"P{i}"} for i in range(preload)])
+
+        out = mp.Queue()
+        procs = [mp.Process(target=worker, args=(path, tuned, "r", seconds, i, out)) for i in range(readers)]
+        procs += [mp.Process(target=worker, args=(path, tuned, "w", seconds, i, out)) for i in range(writers)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+
+    summary = {"reads": 0, "writes": 0, "locked": 0}
+    for role, ops, locked in results:
+        summary["reads" if role == "r" else "writes"] += ops
+        summary["locked"] += locked
+    summary["reads_per_s"] = round(summary["reads"] / seconds, 1)
+    summary["writes_per_s"] = round(summary["writes"] / seconds, 1)
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stock vs tuned SQLite read/write throughput")
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--readers", type=int, default=4)
+    ap.add_argument("--writers", type=int, default=2)
+    ap.add_argument("--preload", type=int, default=20000)
+    ap.add_argument("--json", help="also write results to this file")
+    args = ap.parse_args()
+
+    report = {
+        "config": vars(args),
+        "profile": SQLiteProfile.from_env().__dict__,
+        "default": run(False, args.seconds, args.readers, args.writers, args.preload),
+        "tuned": run(True, args.seconds, args.readers, args.writers, args.preload),
+    }
+    for side in ("default", "tuned"):
+        r = report[side]
+        print(f"{side:8s} reads/s={r['reads_per_s']:>9} writes/s={r['writes_per_s']:>8} locked={r['locked']}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# In-process prefix index for customer typeahead (/api/customers/suggest).
+# Notes:
+# - A sorted array of (key, customer pk) built from one narrow SELECT; lookups are a bisect
+#   plus a short forward scan, so suggest() never touches the DB once built
+# - Keys: each word of the name, the full name, phone digits, customer_id and insta handle
+# - Invalidated when a session that flushed Customer changes commits (after_flush marks the
+#   session, after_commit drops the index, a rollback just clears the mark), so the index is never
+#   rebuilt from rows that were rolled back; a rebuild that overlaps an invalidation is not kept as
+#   fresh. Other Gunicorn workers pick up changes within CRM_SUGGEST_TTL seconds
+
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+def _keys(customer_id, name, phone, insta):
+    keys = set()
+    if name:
+        low = name.strip().lower()
+        keys.add(low)
+        keys.update(re.findall(r"\w+", low))
+    if phone:
+        digits = re.sub(r"\D", "", phone)
+        if digits:
+            keys.add(digits)
+    if customer_id:
+        keys.add(customer_id.lower())
+    if insta:
+        keys.add(insta.strip().lstrip("@").lower())
+    keys.discard("")
+    return keys
+
+
+class CustomerPrefixIndex:
+    def __init__(self, loader, ttl=300):
+        self._loader = loader       # () -> iterable of (pk, customer_id, name, phone, insta)
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._keys = []             # sorted [(key, pk)]
+        self._rows = {}             # pk -> {"customer_id", "name", "phone"}
+        self._built_at = None
+        self._generation = 0        # bumped by invalidate(); a build only counts if it saw no bump
+
+    def invalidate(self, *_args):
+        self._generation += 1
+        self._built_at = None
+
+    def _fresh(self):
+        return self._built_at is not None and time.monotonic() - self._built_at < self._ttl
+
+    def _ensure(self):
+        if self._fresh():
+            return
+        with self._lock:
+            if self._fresh():
+                return
+            generation = self._generation
+            keys, rows = [], {}
+            for pk, customer_id, name, phone, insta in self._loader():
+                rows[pk] = {"customer_id": customer_id, "name": name, "phone": phone}
+                keys.extend((k, pk) for k in _keys(customer_id, name, phone, insta))
+            keys.sort()
+            # swap in one go so readers never see a half-built index; if a commit invalidated us
+            # meanwhile, serve this build but rebuild on the next call
+            self._keys, self._rows = keys, rows
+            self._built_at = time.monotonic() if generation == self._generation else None
+
+    def suggest(self, q, limit=10):
+        """Customers whose name/phone/ID/insta starts with `q`, newest first within the matches."""
+        q = (q or "").strip().lstrip("@").lower()
+        if not q:
+            return []
+        if q.replace(" ", "").isdigit():
+            q = q.replace(" ", "")
+        self._ensure()
+        keys, rows = self._keys, self._rows
+
+        hits = set()
+        i = bisect_left(keys, (q,))
+        # over-collect a little so the newest-first cut is meaningful
+        while i < len(keys) and keys[i][0].startswith(q) and len(hits) < limit * 5:
+            hits.add(keys[i][1])
+            i += 1
+        return [rows[pk] for pk in sorted(hits, reverse=True)[:limit]]
+
+    def watch(self, model, session_class=Session):
+        """Drop the index when a transaction that changed `model` rows commits in this process."""
+        mark = f"_prefix_index_{id(self)}"
+
+        def after_flush(session, _flush_context):
+            if any(isinstance(obj, model) for obj in (*session.new, *session.dirty, *session.deleted)):
+                session.info[mark] = True
+
+        def after_commit(session):
+            if session.info.pop(mark, False):
+                self.invalidate()
+
+        def after_rollback(session):
+            session.info.pop(mark, None)
+
+        event.listen(session_class, "after_flush", after_flush)
+        event.listen(session_class, "after_commit", after_commit)
+        event.listen(session_class, "after_rollback", after_rollback)
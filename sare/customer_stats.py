@@ -0,0 +1,163 @@
+# Per-customer lifetime rollups (customer_stats), kept current by SQLite triggers.
+# Notes:
+# - One row per customer: order count, total / Paid / Pending amounts and last order date
+#   ('' = no orders yet), so the customer list can show and sort by them without touching "order"
+# - AFTER INSERT/UPDATE/DELETE triggers on "order" apply the delta in the same statement as the
+#   row change: ORM writes, edit_order moving an order to another customer, bulk imports and raw
+#   SQL are all covered; last_order_date after an update/delete is re-read through
+#   ix_order_customer_id_date (one index seek)
+# - Customer insert/delete triggers keep exactly one row per customer, so list queries can
+#   INNER JOIN and walk ix_customer_stats_* in order (?sort=spend / ?sort=recent)
+# - customer_total is a one-row counter of customers kept by the same customer triggers, so the
+#   customers gauge (/metrics, /_status) is a single-row read instead of COUNT(*)
+# - reconcile_customer_stats() recomputes everything with one GROUP BY and repairs rows that
+#   drifted (e.g. after a load with the triggers dropped); run it from --reconcile-customer-stats
+#   or the job queue
+
+from sqlalchemy import inspect, text
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS customer_stats (
+        customer_id VARCHAR(64) NOT NULL PRIMARY KEY,
+        order_count INTEGER NOT NULL DEFAULT 0,
+        total_amount INTEGER NOT NULL DEFAULT 0,
+        paid_amount INTEGER NOT NULL DEFAULT 0,
+        pending_amount INTEGER NOT NULL DEFAULT 0,
+        last_order_date VARCHAR(10) NOT NULL DEFAULT ''
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_customer_stats_paid_amount ON customer_stats (paid_amount, customer_id)",
+    "CREATE INDEX IF NOT EXISTS ix_customer_stats_last_order_date ON customer_stats (last_order_date, customer_id)",
+    """CREATE TABLE IF NOT EXISTS customer_total (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        customers INTEGER NOT NULL
+    )""",
+]
+
+COLUMNS = "customer_id, order_count, total_amount, paid_amount, pending_amount, last_order_date"
+
+# {r} is NEW or OLD
+_PAID = "CASE WHEN {r}.payment_status = 'Paid' THEN COALESCE({r}.amount, 0) ELSE 0 END"
+_PENDING = "CASE WHEN {r}.payment_status = 'Pending' THEN COALESCE({r}.amount, 0) ELSE 0 END"
+_LAST_DATE = """COALESCE((SELECT MAX(date) FROM "order" WHERE customer_id = {r}.customer_id), '')"""
+_ADD = f"""
+    INSERT INTO customer_stats ({COLUMNS})
+    VALUES (NEW.customer_id, 1, COALESCE(NEW.amount, 0), {_PAID.format(r="NEW")}, {_PENDING.format(r="NEW")},
+            COALESCE(NEW.date, ''))
+    ON CONFLICT (customer_id) DO UPDATE SET
+        order_count = order_count + 1,
+        total_amount = total_amount + excluded.total_amount,
+        paid_amount = paid_amount + excluded.paid_amount,
+        pending_amount = pending_amount + excluded.pending_amount,
+        last_order_date = MAX(last_order_date, excluded.last_order_date);
+"""
+_REMOVE = f"""
+    UPDATE customer_stats SET
+        order_count = order_count - 1,
+        total_amount = total_amount - COALESCE(OLD.amount, 0),
+        paid_amount = paid_amount - {_PAID.format(r="OLD")},
+        pending_amount = pending_amount - {_PENDING.format(r="OLD")},
+        last_order_date = {_LAST_DATE.format(r="OLD")}
+    WHERE customer_id = OLD.customer_id;
+"""
+
+TRIGGERS = {
+    "customer_stats_order_ai": f'AFTER INSERT ON "order" BEGIN {_ADD} END',
+    "customer_stats_order_ad": f'AFTER DELETE ON "order" BEGIN {_REMOVE} END',
+    # old values out of the old customer, new values into the new one (same customer: net delta)
+    "customer_stats_order_au": f"""AFTER UPDATE OF customer_id, amount, payment_status, date ON "order" BEGIN
+        {_REMOVE}
+        {_ADD}
+        UPDATE customer_stats SET last_order_date = {_LAST_DATE.format(r="NEW")} WHERE customer_id = NEW.customer_id;
+    END""",
+    "customer_stats_customer_ai": """AFTER INSERT ON customer BEGIN
+        INSERT INTO customer_stats (customer_id) VALUES (NEW.customer_id) ON CONFLICT (customer_id) DO NOTHING;
+        UPDATE customer_total SET customers = customers + 1;
+    END""",
+    "customer_stats_customer_ad": """AFTER DELETE ON customer BEGIN
+        DELETE FROM customer_stats WHERE customer_id = OLD.customer_id;
+        UPDATE customer_total SET customers = customers - 1;
+    END""",
+}
+
+# what customer_stats should hold, computed from scratch
+EXPECTED = """
+    SELECT c.customer_id,
+           COUNT(o.id) AS order_count,
+           COALESCE(SUM(o.amount), 0) AS total_amount,
+           COALESCE(SUM(CASE WHEN o.payment_status = 'Paid' THEN o.amount END), 0) AS paid_amount,
+           COALESCE(SUM(CASE WHEN o.payment_status = 'Pending' THEN o.amount END), 0) AS pending_amount,
+           COALESCE(MAX(o.date), '') AS last_order_date
+    FROM customer AS c
+    LEFT JOIN "order" AS o ON o.customer_id = c.customer_id
+    GROUP BY c.customer_id
+"""
+SET_TOTAL = "INSERT OR REPLACE INTO customer_total (id, customers) VALUES (1, (SELECT COUNT(*) FROM customer))"
+
+
+def ensure_customer_stats(engine, backfill=True):
+    """Create customer_stats and its triggers; backfill when it is empty. False if tables are missing."""
+    insp = inspect(engine)
+    if not (insp.has_table("customer") and insp.has_table("order")):
+        return False
+    with engine.begin() as conn:
+        for ddl in SCHEMA:
+            conn.execute(text(ddl))
+        for name, body in TRIGGERS.items():
+            conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {body}"))
+        empty = conn.execute(text("SELECT 1 FROM customer_stats LIMIT 1")).first() is None
+        counted = conn.execute(text("SELECT 1 FROM customer_total")).first() is not None
+    if (empty or not counted) and backfill:
+        rebuild_customer_stats(engine)
+    return True
+
+
+def drop_customer_stats_triggers(conn):
+    """For bulk loads; ensure_customer_stats() puts them back (then rebuild_customer_stats)."""
+    for name in TRIGGERS:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def rebuild_customer_stats(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM customer_stats"))
+        conn.execute(text(f"INSERT INTO customer_stats ({COLUMNS}) {EXPECTED}"))
+        conn.execute(text(SET_TOTAL))
+
+
+def customer_count(conn):
+    """Number of customers from the trigger-kept counter (None before it is backfilled)."""
+    return conn.execute(text("SELECT customers FROM customer_total WHERE id = 1")).scalar()
+
+
+def reconcile_customer_stats(engine, fix=True):
+    """Compare customer_stats with a full recount; repair drifted/missing/orphan rows if `fix`."""
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS temp.customer_stats_expected"))
+        conn.execute(text(f"CREATE TEMP TABLE customer_stats_expected AS {EXPECTED}"))
+        drifted = [r[0] for r in conn.execute(text(f"""
+            SELECT customer_id FROM (
+                SELECT {COLUMNS} FROM temp.customer_stats_expected
+                EXCEPT SELECT {COLUMNS} FROM customer_stats
+            )"""))]
+        orphans = [r[0] for r in conn.execute(text("""
+            SELECT customer_id FROM customer_stats
+            WHERE customer_id NOT IN (SELECT customer_id FROM temp.customer_stats_expected)"""))]
+        checked = conn.execute(text("SELECT COUNT(*) FROM temp.customer_stats_expected")).scalar()
+        total_ok = conn.execute(text("SELECT customers FROM customer_total WHERE id = 1")).scalar() == checked
+        if not total_ok:
+            drifted.append("customer_total")
+        if fix and not total_ok:
+            conn.execute(text(SET_TOTAL))
+        if fix and (drifted or orphans):
+            conn.execute(text(f"""
+                INSERT OR REPLACE INTO customer_stats ({COLUMNS})
+                SELECT {COLUMNS} FROM temp.customer_stats_expected
+                WHERE customer_id IN (SELECT customer_id FROM (
+                    SELECT {COLUMNS} FROM temp.customer_stats_expected
+                    EXCEPT SELECT {COLUMNS} FROM customer_stats))"""))
+            conn.execute(text("""
+                DELETE FROM customer_stats
+                WHERE customer_id NOT IN (SELECT customer_id FROM temp.customer_stats_expected)"""))
+        conn.execute(text("DROP TABLE temp.customer_stats_expected"))
+    return {"checked": checked, "drifted": len(drifted), "orphans": len(orphans),
+            "fixed": bool(fix and (drifted or orphans)), "sample": drifted[:20] + orphans[:20]}
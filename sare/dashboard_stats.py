@@ -0,0 +1,75 @@
+# Dashboard / payments aggregates in one grouped pass.
+# Notes:
+# - Reads the month-bucketed order_summary / followup_summary tables (see summary_tables.py),
+#   so cost is O(months) rather than O(orders)
+# - Everything the dashboard and payments pages show is folded from those rows in Python
+
+from dataclasses import dataclass, field
+from datetime import date
+
+from summary_tables import followup_count, order_buckets
+
+
+@dataclass
+class DashboardStats:
+    total_orders: int = 0
+    total_paid: int = 0
+    total_pending: int = 0
+    paid_month: int = 0           # current calendar month onwards
+    pending_month: int = 0
+    pending_followups: int = 0
+    month_labels: list = field(default_factory=list)   # e.g. ["Jun 2025", ...] oldest first
+    month_counts: list = field(default_factory=list)
+    mode_split: dict = field(default_factory=dict)     # Paid orders per payment_mode
+
+    def paid_mode_split(self, modes=("UPI", "Cash")):
+        """Mode split restricted to the given modes (payments page only shows UPI/Cash)."""
+        return {m: c for m, c in self.mode_split.items() if m in modes}
+
+
+def month_keys(today: date, months=6):
+    """Last `months` months as (YYYY-MM key, 'Mon YYYY' label), oldest first."""
+    out = []
+    for i in range(months - 1, -1, -1):
+        m = (today.month - i - 1) % 12 + 1
+        y = today.year + ((today.month - i - 1) // 12)
+        d = date(y, m, 1)
+        out.append((d.strftime("%Y-%m"), d.strftime("%b %Y")))
+    return out
+
+
+def load_dashboard_stats(session, today=None, months=6):
+    """Compute every dashboard/payments KPI with two small summary-table reads."""
+    today = today or date.today()
+    rows = order_buckets(session)
+    open_followups = followup_count(session, "Open")
+    return fold_order_buckets(rows, open_followups, today, months)
+
+
+def fold_order_buckets(rows, open_followups, today, months=6):
+    """Fold (ym, payment_status, payment_mode, count, amount) rows into DashboardStats."""
+    current_ym = today.strftime("%Y-%m")
+    keys = month_keys(today, months)
+    per_month = {k: 0 for k, _ in keys}
+
+    stats = DashboardStats(pending_followups=int(open_followups))
+    for ym, status, mode, cnt, amount in rows:
+        cnt, amount = int(cnt or 0), int(amount or 0)
+        stats.total_orders += cnt
+        if ym in per_month:
+            per_month[ym] += cnt
+        this_month = ym is not None and ym >= current_ym
+        if status == "Paid":
+            stats.total_paid += amount
+            if this_month:
+                stats.paid_month += amount
+            label = mode or "Unknown"
+            stats.mode_split[label] = stats.mode_split.get(label, 0) + cnt
+        elif status == "Pending":
+            stats.total_pending += amount
+            if this_month:
+                stats.pending_month += amount
+
+    stats.month_labels = [label for _, label in keys]
+    stats.month_counts = [per_month[k] for k, _ in keys]
+    return stats
@@ -0,0 +1,68 @@
+# Secondary indexes + query-plan diagnostics.
+# Notes:
+# - The index set itself is declared on the models (__table_args__); ensure_indexes() creates
+#   whatever is missing on an existing saree_crm.db (CREATE INDEX IF NOT EXISTS, idempotent)
+# - Indexes whose columns don't exist in an old schema are skipped, not fatal
+# - explain_routes() replays GET routes through the test client, captures the SELECTs they issue
+#   and prints EXPLAIN QUERY PLAN for each (used by --explain)
+
+import logging
+
+from sqlalchemy import event, inspect, text
+
+log = logging.getLogger("crm")
+
+
+def ensure_indexes(engine, metadata):
+    """Create every declared index that is missing; returns the names created."""
+    insp = inspect(engine)
+    created = []
+    for tbl in metadata.sorted_tables:
+        if not insp.has_table(tbl.name):
+            continue
+        have_cols = {c["name"] for c in insp.get_columns(tbl.name)}
+        have_idx = {i["name"] for i in insp.get_indexes(tbl.name)}
+        for idx in tbl.indexes:
+            if idx.name in have_idx:
+                continue
+            missing = {c.name for c in idx.columns} - have_cols
+            if missing:
+                log.warning("Index %s skipped: %s lacks %s", idx.name, tbl.name, missing)
+                continue
+            idx.create(engine, checkfirst=True)
+            created.append(idx.name)
+    if created:
+        # refresh planner statistics so the new indexes actually get picked
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    return created
+
+
+def explain_routes(app, engine, urls, out=print):
+    """Print EXPLAIN QUERY PLAN for every SELECT issued while serving each GET url."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        client = app.test_client()
+        for url in urls:
+            captured.clear()
+            status = client.get(url).status_code
+            queries = list(captured)
+            out(f"\n=== GET {url} -> {status}, {len(queries)} queries")
+            for n, (stmt, params) in enumerate(queries, 1):
+                out(f"--- [{n}] " + " ".join(stmt.split()))
+                try:
+                    with engine.connect() as conn:
+                        plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + stmt, params).all()
+                except Exception as e:
+                    out(f"    (explain failed: {e})")
+                    continue
+                for row in plan:
+                    out(f"    {row[-1]}")
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
@@ -0,0 +1,83 @@
+# Human-readable ID allocation (ORD20251101-00001, CUST000001, ...).
+# Notes:
+# - One row per (prefix, day) in id_sequence; the common path is a single
+#   UPDATE ... RETURNING on its primary key, i.e. O(1) and no LIKE scan
+# - The UPDATE takes SQLite's write lock, so concurrent Gunicorn workers are serialized and can
+#   never hand out the same number; it also rolls back with the caller's insert (no gaps)
+# - The first allocation of a day seeds the row from the highest existing ID, so IDs created
+#   before this table existed are not reused
+# - Optional per-worker blocks (IdBlockCache) trade gaps on restart for fewer write-lock trips
+
+import threading
+
+from sqlalchemy import Integer, cast, func, select, text
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS id_sequence (
+        prefix TEXT NOT NULL,
+        day TEXT NOT NULL,
+        last_value INTEGER NOT NULL,
+        PRIMARY KEY (prefix, day)
+    )
+"""
+
+BUMP = text("""
+    UPDATE id_sequence SET last_value = last_value + :n
+    WHERE prefix = :prefix AND day = :day
+    RETURNING last_value
+""")
+
+SEED = text("""
+    INSERT INTO id_sequence (prefix, day, last_value) VALUES (:prefix, :day, :start)
+    ON CONFLICT (prefix, day) DO UPDATE SET last_value = last_value + :n
+    RETURNING last_value
+""")
+
+
+def ensure_id_sequence_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(SCHEMA))
+
+
+def _highest_existing(conn, column, stem):
+    """Largest numeric suffix of `column` values starting with `stem` (0 if none)."""
+    suffix = cast(func.substr(column, len(stem) + 1), Integer)
+    stmt = select(func.coalesce(func.max(suffix), 0)).where(column.like(stem + "%"))
+    return conn.execute(stmt).scalar() or 0
+
+
+def allocate(conn, prefix, day, column, sep="-", n=1):
+    """Reserve `n` numbers for (prefix, day) in the caller's transaction; returns the last one."""
+    params = {"prefix": prefix, "day": day, "n": n}
+    last = conn.execute(BUMP, params).scalar()
+    if last is None:
+        # first ID of the day: continue after whatever is already in the table
+        start = _highest_existing(conn, column, f"{prefix}{day}{sep}") + n
+        last = conn.execute(SEED, {**params, "start": start}).scalar()
+    return last
+
+
+class IdBlockCache:
+    """Hands out numbers from blocks reserved in their own short transactions."""
+
+    def __init__(self, engine, block=50):
+        self._engine = engine
+        self._block = block
+        self._lock = threading.Lock()
+        self._ranges = {}   # (prefix, day) -> [next, last]
+
+    def next(self, prefix, day, column, sep="-"):
+        key = (prefix, day)
+        with self._lock:
+            rng = self._ranges.get(key)
+            if not rng or rng[0] > rng[1]:
+                # committed separately so a rolled-back order can't recycle the block
+                with self._engine.begin() as conn:
+                    last = allocate(conn, prefix, day, column, sep, self._block)
+                rng = self._ranges[key] = [last - self._block + 1, last]
+                # days roll over; forget stale blocks
+                for k in [k for k in self._ranges if k[0] == prefix and k[1] != day]:
+                    del self._ranges[k]
+            value = rng[0]
+            rng[0] += 1
+            return value
@@ -0,0 +1,146 @@
+# Bulk CSV import for customers and orders (/import upload + --import-* CLI).
+# Notes:
+# - The CSV is read as a stream and handled in chunks of `batch` rows; each chunk is validated,
+#   checked for duplicate IDs with one IN query, and inserted with a single executemany in its
+#   own transaction (a bad chunk never rolls back earlier ones)
+# - Order rows go through the same validator as the order form, with customer references
+#   resolved against a preloaded set instead of one SELECT per row
+# - Core inserts skip the ORM hooks: order_summary is folded per chunk (apply_order_rows); the
+#   FTS triggers are plain SQL and still fire (as do the data_version ones)
+# - Blank order_id values get human IDs from id_sequence, reserved once per chunk
+
+import csv
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+
+from sqlalchemy import insert, select
+
+from id_sequences import allocate
+from summary_tables import apply_order_rows
+
+CUSTOMER_FIELDS = ("customer_id", "name", "insta", "phone", "city", "ctype", "notes")
+ORDER_FIELDS = ("order_id", "date", "customer_id", "saree_type", "amount", "purchase_type",
+                "payment_status", "payment_mode", "delivery_status", "remarks")
+MAX_REPORTED_ERRORS = 1000
+
+
+@dataclass
+class ImportReport:
+    entity: str
+    rows: int = 0
+    inserted: int = 0
+    errors: list = field(default_factory=list)   # [(csv line, message)], first MAX_REPORTED_ERRORS
+    error_rows: int = 0
+
+    def fail(self, line, msg):
+        self.error_rows += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, msg))
+
+    def summary(self):
+        return f"{self.entity}: {self.rows} rows, {self.inserted} inserted, {self.error_rows} rejected"
+
+
+def _chunks(reader, size):
+    # reader yields (line, row); DictReader.line_num is the physical line of the row just read
+    it = ((reader.line_num, row) for row in reader)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _clean(row, fields):
+    return {f: (row.get(f) or "").strip() for f in fields}
+
+
+def _existing(conn, column, values):
+    values = list(values)
+    if not values:
+        return set()
+    found = set()
+    for i in range(0, len(values), 500):   # stay under SQLite's bound-parameter limit
+        found.update(conn.execute(select(column).where(column.in_(values[i:i + 500]))).scalars())
+    return found
+
+
+def import_customers(engine, Customer, textfile, batch=5000):
+    """Insert customers from a CSV with a header row (customer_id and name are required)."""
+    report = ImportReport("customers")
+    reader = csv.DictReader(textfile)
+    seen = set()
+    for chunk in _chunks(reader, batch):
+        report.rows += len(chunk)
+        good = []
+        for line, raw in chunk:
+            row = _clean(raw, CUSTOMER_FIELDS)
+            if not row["customer_id"] or not row["name"]:
+                report.fail(line, "Customer ID and Name are required.")
+            elif row["customer_id"] in seen:
+                report.fail(line, f"Duplicate customer ID {row['customer_id']} in file.")
+            else:
+                seen.add(row["customer_id"])
+                good.append((line, row))
+
+        with engine.begin() as conn:
+            dupes = _existing(conn, Customer.customer_id, (r["customer_id"] for _, r in good))
+            rows = []
+            for line, row in good:
+                if row["customer_id"] in dupes:
+                    report.fail(line, f"Customer ID {row['customer_id']} already exists.")
+                else:
+                    rows.append(row)
+            if rows:
+                conn.execute(insert(Customer.__table__), rows)
+                report.inserted += len(rows)
+    return report
+
+
+def import_orders(engine, Order, Customer, textfile, validate, batch=5000):
+    """Insert orders from a CSV; `validate(row, known_customers=...)` is the order-form validator."""
+    report = ImportReport("orders")
+    reader = csv.DictReader(textfile)
+
+    with engine.connect() as conn:
+        known = set(conn.execute(select(Customer.customer_id)).scalars())
+
+    seen = set()
+    for chunk in _chunks(reader, batch):
+        report.rows += len(chunk)
+        good = []
+        for line, raw in chunk:
+            row = _clean(raw, ORDER_FIELDS)
+            data, errors = validate(row, known_customers=known)
+            oid = row["order_id"]
+            if oid and oid in seen:
+                errors.append(f"Duplicate order ID {oid} in file.")
+            if errors:
+                report.fail(line, " ".join(errors))
+                continue
+            seen.add(oid)
+            data["order_id"] = oid
+            good.append((line, data))
+
+        with engine.begin() as conn:
+            dupes = _existing(conn, Order.order_id, (d["order_id"] for _, d in good if d["order_id"]))
+            rows = []
+            for line, data in good:
+                if data["order_id"] in dupes:
+                    report.fail(line, f"Order ID {data['order_id']} already exists.")
+                else:
+                    rows.append(data)
+
+            blank = [d for d in rows if not d["order_id"]]
+            if blank:
+                day = date.today().strftime("%Y%m%d")
+                last = allocate(conn, "ORD", day, Order.order_id, n=len(blank))
+                for seq, d in enumerate(blank, last - len(blank) + 1):
+                    d["order_id"] = f"ORD{day}-{str(seq).zfill(5)}"
+
+            if rows:
+                conn.execute(insert(Order.__table__), rows)
+                apply_order_rows(conn, rows)
+                report.inserted += len(rows)
+    return report
@@ -0,0 +1,208 @@
+# SQLite-backed job queue for slow work (exports, imports, re-aggregation).
+# Notes:
+# - Web workers only INSERT a row (enqueue) and answer /jobs/<id>; a separate process
+#   (--worker) runs the handlers, so a big export/import never ties up a Gunicorn worker
+# - Claiming is a single UPDATE ... WHERE id = (oldest runnable) RETURNING: SQLite's write lock
+#   makes it atomic, so any number of workers can poll the same table
+# - A failed job is retried with exponential backoff until max_attempts; a job whose worker died
+#   (no heartbeat for `stale_after` seconds) goes back to the queue if it has attempts left and is
+#   marked failed otherwise, so a max_attempts=1 job (imports) never runs twice
+# - While a handler runs, a heartbeat thread refreshes claimed_at every `heartbeat` seconds, so a
+#   long export / import is never taken for a dead worker's job
+# - Handlers are plain callables kind -> fn(payload, job_id) -> JSON-able result; files a job
+#   produces live under `files_dir` and are deleted with the job after `retention_days`
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+log = logging.getLogger("crm")
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL DEFAULT 'queued',      -- queued / running / done / failed
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 3,
+        run_after REAL NOT NULL,
+        created REAL NOT NULL,
+        claimed_by TEXT,
+        claimed_at REAL,
+        finished REAL,
+        result TEXT,
+        error TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs (status, run_after, id)",
+]
+
+CLAIM = text("""
+    UPDATE jobs SET status = 'running', claimed_by = :me, claimed_at = :now, attempts = attempts + 1
+    WHERE id = (
+        SELECT id FROM jobs
+        WHERE status = 'queued' AND run_after <= :now AND attempts < max_attempts
+        ORDER BY run_after, id LIMIT 1
+    )
+    RETURNING id, kind, payload, attempts, max_attempts
+""")
+
+REQUEUE_STALE = text("""
+    UPDATE jobs SET status = 'queued', claimed_by = NULL
+    WHERE status = 'running' AND claimed_at < :stale AND attempts < max_attempts
+""")
+
+FAIL_STALE = text("""
+    UPDATE jobs SET status = 'failed', claimed_by = NULL, finished = :now,
+        error = COALESCE(error || '; ', '') || 'worker lost, no attempts left'
+    WHERE status = 'running' AND claimed_at < :stale AND attempts >= max_attempts
+""")
+
+HEARTBEAT = text("""
+    UPDATE jobs SET claimed_at = :now WHERE id = :id AND status = 'running' AND claimed_by = :me
+""")
+
+FIELDS = ("id", "kind", "status", "attempts", "max_attempts", "created", "claimed_at", "finished", "result", "error")
+
+
+def ensure_jobs_table(engine):
+    with engine.begin() as conn:
+        for ddl in SCHEMA:
+            conn.execute(text(ddl))
+
+
+def enqueue(conn, kind, payload=None, max_attempts=3, delay=0):
+    """Queue a job in the caller's transaction; returns its id."""
+    now = time.time()
+    return conn.execute(
+        text("INSERT INTO jobs (kind, payload, max_attempts, run_after, created) "
+             "VALUES (:kind, :payload, :max_attempts, :run_after, :now) RETURNING id"),
+        {"kind": kind, "payload": json.dumps(payload or {}), "max_attempts": max_attempts,
+         "run_after": now + delay, "now": now},
+    ).scalar()
+
+
+def get_job(conn, job_id):
+    """Job row as a dict (result decoded), or None."""
+    row = conn.execute(text(f"SELECT {', '.join(FIELDS)} FROM jobs WHERE id = :id"), {"id": job_id}).first()
+    if row is None:
+        return None
+    job = dict(zip(FIELDS, row))
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class JobWorker:
+    """Polls the queue and runs handlers[kind]; see the notes at the top."""
+
+    def __init__(self, engine, handlers, files_dir, poll=1.0, stale_after=3600, backoff=30, retention_days=7,
+                 heartbeat=60):
+        self.engine = engine
+        self.handlers = handlers
+        self.files_dir = Path(files_dir)
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+        self.poll = poll
+        self.stale_after = stale_after
+        self.backoff = backoff
+        self.retention_days = retention_days
+        self.heartbeat = heartbeat
+        self.me = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._last_housekeeping = 0.0
+
+    def claim(self):
+        now = time.time()
+        with self.engine.begin() as conn:
+            return conn.execute(CLAIM, {"me": self.me, "now": now}).first()
+
+    def _beat(self, job_id, done):
+        """Refresh claimed_at until `done` is set (runs next to the handler)."""
+        while not done.wait(self.heartbeat):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(HEARTBEAT, {"now": time.time(), "id": job_id, "me": self.me})
+            except Exception:
+                log.exception("Job %s heartbeat failed", job_id)
+
+    def run_one(self):
+        """Claim and run one job; returns its id, or None when the queue is empty."""
+        job = self.claim()
+        if job is None:
+            return None
+        job_id, kind, payload, attempts, max_attempts = job
+        handler = self.handlers.get(kind)
+        t0 = time.perf_counter()
+        done = threading.Event()
+        threading.Thread(target=self._beat, args=(job_id, done), name=f"job-{job_id}-heartbeat", daemon=True).start()
+        try:
+            if handler is None:
+                raise LookupError(f"no handler for job kind {kind!r}")
+            result = handler(json.loads(payload), job_id)
+        except Exception as e:
+            retry = attempts < max_attempts and handler is not None
+            log.exception("Job %s (%s) failed, attempt %s/%s", job_id, kind, attempts, max_attempts)
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text("UPDATE jobs SET status = :status, error = :error, run_after = :run_after, "
+                         "finished = :finished WHERE id = :id"),
+                    {"id": job_id, "status": "queued" if retry else "failed", "error": f"{type(e).__name__}: {e}",
+                     "run_after": time.time() + self.backoff * 2 ** (attempts - 1),
+                     "finished": None if retry else time.time()},
+                )
+            return job_id
+        finally:
+            done.set()
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("UPDATE jobs SET status = 'done', result = :result, error = NULL, finished = :now WHERE id = :id"),
+                {"id": job_id, "result": json.dumps(result), "now": time.time()},
+            )
+        log.info("Job %s (%s) done in %.1fs", job_id, kind, time.perf_counter() - t0)
+        return job_id
+
+    def housekeeping(self):
+        """Requeue (or fail, when out of attempts) jobs of dead workers; drop finished jobs past retention."""
+        now = time.time()
+        with self.engine.begin() as conn:
+            failed = conn.execute(FAIL_STALE, {"stale": now - self.stale_after, "now": now}).rowcount
+            requeued = conn.execute(REQUEUE_STALE, {"stale": now - self.stale_after}).rowcount
+            old = conn.execute(
+                text("SELECT id, result FROM jobs WHERE status IN ('done', 'failed') AND finished < :cutoff"),
+                {"cutoff": now - self.retention_days * 86400},
+            ).all()
+            for job_id, result in old:
+                name = (json.loads(result) or {}).get("file") if result else None
+                if name:
+                    (self.files_dir / Path(name).name).unlink(missing_ok=True)
+            if old:
+                conn.execute(text("DELETE FROM jobs WHERE id IN (%s)" % ",".join(str(r[0]) for r in old)))
+        if requeued or failed or old:
+            log.info("Jobs housekeeping: %d requeued, %d failed, %d purged", requeued, failed, len(old))
+
+    def run(self, once=False):
+        """Work until stop() (or until the queue is empty with once=True)."""
+        while not self._stop.is_set():
+            if time.monotonic() - self._last_housekeeping > 300:
+                self._last_housekeeping = time.monotonic()
+                try:
+                    self.housekeeping()
+                except Exception:
+                    log.exception("Jobs housekeeping failed")
+            try:
+                ran = self.run_one()
+            except Exception:
+                log.exception("Job worker error")
+                ran = None
+            if ran is None:
+                if once:
+                    return
+                self._stop.wait(self.poll)
+
+    def stop(self):
+        self._stop.set()
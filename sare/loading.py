@@ -0,0 +1,28 @@
+# Loader strategies for list views (no lazy loads while a template renders).
+# Notes:
+# - Many-to-one relationships are joined into the page query (joinedload); collections are
+#   fetched for the whole page with one extra IN query (selectinload), so a page costs a fixed
+#   number of queries whatever its size
+# - Guard mode adds raiseload("*", sql_only=True) under every listed relationship and on the
+#   rows themselves: touching anything that was not listed raises instead of quietly running
+#   one query per row (CRM_RAISE_ON_LAZY_LOAD=1, for dev / tests)
+# - Relationships are named as strings and resolved per call, so backrefs (Customer.orders)
+#   work before the mappers are configured
+
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+
+def loader_options(model, relationships, guard=False):
+    """Eager-load options for `model`'s named relationships (+ raiseload for the rest if guard)."""
+    opts = []
+    for name in relationships:
+        rel = getattr(model, name)
+        opt = selectinload(rel) if rel.property.uselist else joinedload(rel)
+        opts.append(opt.raiseload("*", sql_only=True) if guard else opt)
+    if guard:
+        opts.append(raiseload("*", sql_only=True))
+    return opts
+
+
+def eager(query, model, relationships, guard=False):
+    return query.options(*loader_options(model, relationships, guard))
@@ -0,0 +1,269 @@
+# Deduplicating snapshot store: frequent DB snapshots that only store the pages that changed.
+# Notes:
+# - A snapshot is an online backup (backups.online_backup) cut into fixed, page-aligned chunks
+#   (`chunk_size` rounded to whole pages). SQLite rewrites pages in place, so unchanged pages stay
+#   at the same offsets with the same bytes: aligned chunks dedupe as well as content-defined ones
+#   would, without a rolling hash
+# - Chunks are content-addressed: objects/<sha256[:2]>/<sha256>, zlib-compressed, written once
+#   (tmp + os.replace). A snapshot only writes the chunks no earlier snapshot had
+# - Chunk hashes are grouped FANOUT at a time into tree objects stored the same way, so a
+#   snapshot's manifest (snapshots/<id>.json) is a few KB: a 400 MB DB at 32 KB chunks is ~50 tree
+#   hashes, and after a few order edits only the trees over changed chunks are new
+# - restore() rebuilds any snapshot byte for byte and checks its sha256 before moving it into place
+# - verify() re-hashes every object the manifests reference (each once) and lists the snapshots
+#   that depend on a missing / damaged one; prune() drops snapshots outside the retention window
+#   (newest `keep` + one per day for `daily` days) and deletes objects nothing references anymore;
+#   a kept snapshot with a missing / damaged tree keeps that tree's hash live and is logged (and
+#   reported as unreadable) rather than stopping GC for every other snapshot; files under objects/
+#   that are not named like an object are left alone and logged
+# - snapshot() and prune() take the same flock, so objects can't be collected mid-snapshot; a run
+#   that dies half way leaves only unreferenced objects, which the next prune() removes
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+from backups import online_backup
+
+FANOUT = 256          # chunk hashes per tree object
+DIGEST = 32           # sha256
+OBJECT_NAME = re.compile(r"[0-9a-f]{64}")
+
+log = logging.getLogger("crm")
+
+
+class StoreError(Exception):
+    pass
+
+
+def page_size_of(path):
+    """Page size from the SQLite header (bytes 16-17; 1 means 65536)."""
+    with open(path, "rb") as fh:
+        header = fh.read(100)
+    if len(header) < 100 or not header.startswith(b"SQLite format 3\0"):
+        raise StoreError(f"{path} is not a SQLite database")
+    size = int.from_bytes(header[16:18], "big")
+    return 65536 if size == 1 else size
+
+
+class PageStore:
+    """Content-addressed chunk store of DB snapshots (see the notes at the top)."""
+
+    def __init__(self, directory, chunk_size=32768, keep=288, daily=30, level=6):
+        self.dir = Path(directory)
+        self.objects = self.dir / "objects"
+        self.snapshots = self.dir / "snapshots"
+        self.chunk_size = chunk_size
+        self.keep = keep
+        self.daily = daily
+        self.level = level
+
+    def _lock(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        fh = open(self.dir / ".lock", "w")
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        return fh
+
+    # --- objects ------------------------------------------------------------------------
+    def _object_path(self, digest):
+        name = digest.hex()
+        return self.objects / name[:2] / name
+
+    def _put(self, data):
+        """Store `data` under its sha256 unless present; returns (digest, bytes written)."""
+        digest = hashlib.sha256(data).digest()
+        path = self._object_path(digest)
+        if path.exists():
+            return digest, 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        packed = zlib.compress(data, self.level)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(packed)
+        os.replace(tmp, path)
+        return digest, len(packed)
+
+    def _get(self, digest):
+        """Object bytes, checked against their hash."""
+        try:
+            data = zlib.decompress(self._object_path(digest).read_bytes())
+        except (OSError, zlib.error) as e:
+            raise StoreError(f"object {digest.hex()} unreadable: {e}") from None
+        if hashlib.sha256(data).digest() != digest:
+            raise StoreError(f"object {digest.hex()} is damaged")
+        return data
+
+    def _tree_chunks(self, tree):
+        node = self._get(bytes.fromhex(tree))
+        return [node[i:i + DIGEST] for i in range(0, len(node), DIGEST)]
+
+    def _chunks(self, manifest):
+        """Chunk digests of a snapshot, in file order."""
+        for tree in manifest["trees"]:
+            yield from self._tree_chunks(tree)
+
+    # --- snapshots ----------------------------------------------------------------------
+    def manifests(self):
+        """All snapshot manifests, newest first."""
+        out = []
+        for path in self.snapshots.glob("*.json"):
+            try:
+                out.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return sorted(out, key=lambda m: m["created"], reverse=True)
+
+    def manifest(self, snapshot_id):
+        path = self.snapshots / f"{Path(snapshot_id).name}.json"
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            raise StoreError(f"no snapshot {snapshot_id}") from None
+
+    def snapshot(self, db_path, reason="manual"):
+        """Snapshot db_path; returns its manifest (new_objects / new_bytes = what it cost)."""
+        with self._lock():
+            t0 = time.perf_counter()
+            created = datetime.now(timezone.utc)
+            snapshot_id = created.strftime("%Y%m%dT%H%M%S%fZ")
+            raw = self.dir / f"{snapshot_id}.db.tmp"
+            try:
+                copy = online_backup(db_path, raw)
+                page_size = page_size_of(raw)
+                chunk = max(page_size, self.chunk_size // page_size * page_size)
+                whole = hashlib.sha256()
+                size = new_objects = new_bytes = 0
+                trees, node = [], []
+
+                def flush():
+                    nonlocal new_objects, new_bytes
+                    digest, written = self._put(b"".join(node))
+                    trees.append(digest.hex())
+                    new_objects, new_bytes = new_objects + bool(written), new_bytes + written
+                    node.clear()
+
+                with open(raw, "rb") as fh:
+                    while data := fh.read(chunk):
+                        whole.update(data)
+                        size += len(data)
+                        digest, written = self._put(data)
+                        new_objects, new_bytes = new_objects + bool(written), new_bytes + written
+                        node.append(digest)
+                        if len(node) == FANOUT:
+                            flush()
+                if node:
+                    flush()
+            finally:
+                raw.unlink(missing_ok=True)
+            manifest = {
+                "id": snapshot_id, "created": created.timestamp(), "reason": reason, "size": size,
+                "page_size": page_size, "chunk_size": chunk, "sha256": whole.hexdigest(), "trees": trees,
+                "new_objects": new_objects, "new_bytes": new_bytes, "pages": copy["pages"],
+                "seconds": round(time.perf_counter() - t0, 3),
+            }
+            self.snapshots.mkdir(parents=True, exist_ok=True)
+            path = self.snapshots / f"{snapshot_id}.json"
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(json.dumps(manifest))
+            os.replace(tmp, path)   # the snapshot exists once its manifest does
+        return manifest
+
+    def restore(self, snapshot_id, dest):
+        """Rebuild snapshot `snapshot_id` into the file `dest` (checked, then moved into place)."""
+        manifest = self.manifest(snapshot_id)
+        dest = Path(dest)
+        tmp = dest.with_name(dest.name + ".tmp")
+        whole = hashlib.sha256()
+        try:
+            with open(tmp, "wb") as out:
+                for digest in self._chunks(manifest):
+                    data = self._get(digest)
+                    whole.update(data)
+                    out.write(data)
+            if whole.hexdigest() != manifest["sha256"]:
+                raise StoreError(f"snapshot {snapshot_id} does not rebuild to its checksum")
+            os.replace(tmp, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return manifest
+
+    # --- upkeep -------------------------------------------------------------------------
+    def verify(self):
+        """Re-hash every referenced object once; returns counts plus the damaged snapshots."""
+        checked, bad, damaged = set(), set(), []
+        manifests = self.manifests()
+        for manifest in manifests:
+            broken = False
+            try:
+                for digest in self._chunks(manifest):   # tree objects are hashed by _get here
+                    if digest in bad:
+                        broken = True
+                    elif digest not in checked:
+                        try:
+                            self._get(digest)
+                            checked.add(digest)
+                        except StoreError:
+                            bad.add(digest)
+                            broken = True
+            except StoreError:
+                broken = True   # a tree object itself is missing / damaged
+            if broken:
+                damaged.append(manifest["id"])
+        return {"snapshots": len(manifests), "objects": len(checked), "bad_objects": len(bad),
+                "damaged": damaged}
+
+    def retained(self, manifests):
+        """Ids to keep: the newest `keep`, plus the newest snapshot of each of the last `daily` days."""
+        keep = {m["id"] for m in manifests[:self.keep]}
+        days = {}
+        for m in manifests:   # newest first: first seen per day wins
+            days.setdefault(m["id"][:8], m["id"])
+        keep.update(sorted(days.values(), reverse=True)[:self.daily])
+        return keep
+
+    def prune(self):
+        """Apply retention, then delete objects no remaining snapshot references."""
+        with self._lock():
+            manifests = self.manifests()
+            keep = self.retained(manifests)
+            dropped = [m["id"] for m in manifests if m["id"] not in keep]
+            for snapshot_id in dropped:
+                (self.snapshots / f"{snapshot_id}.json").unlink(missing_ok=True)
+            live, unreadable = set(), []
+            for manifest in manifests:
+                if manifest["id"] not in keep:
+                    continue
+                live.update(bytes.fromhex(t) for t in manifest["trees"])
+                for tree in manifest["trees"]:   # tree by tree: one bad tree must not hide the rest
+                    try:
+                        live.update(self._tree_chunks(tree))
+                    except StoreError as e:
+                        log.error("Snapshot prune: keeping snapshot %s as is, %s", manifest["id"], e)
+                        if manifest["id"] not in unreadable:
+                            unreadable.append(manifest["id"])
+            for leftover in self.dir.glob("*.db.tmp"):   # image of a snapshot that died
+                leftover.unlink()
+            removed = freed = 0
+            stray = []
+            for path in self.objects.glob("*/*"):
+                if OBJECT_NAME.fullmatch(path.name.removesuffix(".tmp")) is None or not path.is_file():
+                    stray.append(str(path.relative_to(self.objects)))   # not ours (.DS_Store, swap files): leave it
+                elif path.name.endswith(".tmp") or bytes.fromhex(path.name) not in live:
+                    freed += path.stat().st_size
+                    path.unlink()
+                    removed += 1
+            if stray:
+                log.warning("Snapshot prune: skipped %d stray file(s) under objects/: %s", len(stray), stray[:10])
+        return {"snapshots": len(keep), "dropped": len(dropped), "objects_removed": removed, "bytes_freed": freed,
+                "unreadable": unreadable, "stray": len(stray)}
+
+    def usage(self):
+        """Bytes on disk for objects vs. the sum of all snapshot sizes (what full copies would take)."""
+        stored = sum(p.stat().st_size for p in self.objects.glob("*/*"))
+        return {"stored_bytes": stored, "logical_bytes": sum(m["size"] for m in self.manifests())}
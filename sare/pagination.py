@@ -0,0 +1,103 @@
+# Keyset (seek) pagination for the list views.
+# Notes:
+# - Pages are addressed by an opaque cursor: base64url(JSON {"d": "n"|"p", "k": [sort key values]})
+# - "n" = rows after the key (older), "p" = rows before it (newer); no OFFSET, so every page
+#   costs the same index seek + LIMIT no matter how deep it is
+# - Sort keys must be unique overall (always end with the primary key)
+# - The query may add extra sort columns (e.g. a search rank) with add_columns(); rows then come
+#   back as (entity, extra...) and Page.items holds just the entities
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.engine import Row
+
+
+@dataclass
+class Page:
+    items: list
+    next_cursor: str = None   # older rows
+    prev_cursor: str = None   # newer rows
+    size: int = 50
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps({"d": direction, "k": [v.isoformat() if isinstance(v, date) else v for v in values]})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort):
+    """Return (direction, values) or (None, None) for a missing/garbled cursor."""
+    if not token:
+        return None, None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        direction, values = data["d"], data["k"]
+        if direction not in ("n", "p") or len(values) != len(sort):
+            return None, None
+        out = []
+        for (col, _desc), v in zip(sort, values):
+            if v is not None and _python_type(col) is date:
+                v = date.fromisoformat(v)
+            out.append(v)
+        return direction, out
+    except Exception:
+        return None, None
+
+
+def _python_type(col):
+    try:
+        return col.type.python_type
+    except NotImplementedError:   # e.g. bm25() rank
+        return None
+
+
+def _seek(sort, values, forward):
+    """Rows strictly after (forward) or before the key in `sort` order."""
+    descs = {desc for _col, desc in sort}
+    if len(descs) == 1:
+        # uniform direction: a row-value comparison lets SQLite seek the index directly
+        cols = tuple_(*[col for col, _desc in sort])
+        return (cols < tuple_(*values)) if descs.pop() == forward else (cols > tuple_(*values))
+    clauses = []
+    for i, (col, desc) in enumerate(sort):
+        later = (col < values[i]) if desc == forward else (col > values[i])
+        clauses.append(and_(*[c == v for (c, _), v in zip(sort[:i], values[:i])], later))
+    return or_(*clauses)
+
+
+def _key(row, sort):
+    if isinstance(row, Row):
+        extra = row._fields[1:]
+        return [getattr(row, col.key) if col.key in extra else getattr(row[0], col.key) for col, _desc in sort]
+    return [getattr(row, col.key) for col, _desc in sort]
+
+
+def keyset_page(query, sort, cursor=None, size=50):
+    """Fetch one page of `query` ordered by `sort` ([(column, descending), ...])."""
+    direction, values = decode_cursor(cursor, sort)
+    forward = direction != "p"
+
+    if values is not None:
+        query = query.filter(_seek(sort, values, forward))
+    order = [(col.desc() if desc == forward else col.asc()) for col, desc in sort]
+    rows = query.order_by(*order).limit(size + 1).all()
+
+    more = len(rows) > size
+    rows = rows[:size]
+    if not forward:
+        rows.reverse()
+
+    page = Page(items=[r[0] if isinstance(r, Row) else r for r in rows], size=size)
+    if rows:
+        first, last = _key(rows[0], sort), _key(rows[-1], sort)
+        # going forward there is a newer page iff we came from one; going back, iff we hit the limit
+        if (forward and values is not None) or (not forward and more):
+            page.prev_cursor = encode_cursor("p", first)
+        if (forward and more) or not forward:
+            page.next_cursor = encode_cursor("n", last)
+    return page
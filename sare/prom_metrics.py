@@ -0,0 +1,313 @@
+# Prometheus /metrics (text format 0.0.4) with a file-backed multiprocess registry.
+# Notes:
+# - Each worker keeps its counters/histograms in plain dicts (one lock, a few dict updates per
+#   request) and dumps them to <dir>/<pid>.json at most once per flush interval; a scrape sums
+#   every file, so whichever Gunicorn worker answers /metrics reports all of them
+# - Counters must not go backwards when a worker exits: a worker folds its counters/histograms
+#   into <dir>/dead.json on exit, and dumps of PIDs that are no longer alive (killed workers) are
+#   folded the same way at startup and on every scrape, then deleted. A dump left by an earlier
+#   process with our PID (PID reuse) is folded before we first overwrite it. Gauges are never
+#   dumped, so a dead worker contributes none. --init clears the dir. The dir must be host-local
+#   (liveness is os.kill(pid, 0))
+# - Pool checkout time is the wait inside engine.raw_connection()
+# - SQLite never reports busy_timeout waits, so a "lock wait" is a write statement slower than
+#   lock_wait seconds; "database is locked" errors that escape busy_timeout are counted apart
+# - Business gauges come from a callable (summary tables), cached for gauge_ttl seconds
+
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from flask import g, request
+from sqlalchemy import event
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+HELP = {
+    "crm_http_requests_total": ("counter", "HTTP requests by route, method and status code."),
+    "crm_http_request_duration_seconds": ("histogram", "Request latency by route and method."),
+    "crm_db_pool_checkout_seconds": ("histogram", "Time spent waiting for a pooled DB connection."),
+    "crm_sqlite_lock_waits_total": ("counter", "Write statements that waited on the SQLite write lock."),
+    "crm_sqlite_lock_errors_total": ("counter", "Statements that failed with database is locked/busy."),
+}
+WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+DEAD = "dead.json"
+FOLDED_KEEP = 1000    # dump tokens remembered in dead.json (a fold interrupted before the unlink)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(counters, hists, buckets, dump):
+    buckets.update({n: tuple(b) for n, b in dump.get("buckets", {}).items()})
+    for n, lb, v in dump.get("counters", ()):
+        key = (n, tuple(map(tuple, lb)))
+        counters[key] = counters.get(key, 0) + v
+    for n, lb, h in dump.get("hists", ()):
+        key = (n, tuple(map(tuple, lb)))
+        acc = hists.get(key)
+        hists[key] = list(h) if acc is None else [a + b for a, b in zip(acc, h)]
+
+
+def _as_dump(counters, hists, buckets):
+    return {
+        "counters": [[n, list(map(list, lb)), v] for (n, lb), v in counters.items()],
+        "hists": [[n, list(map(list, lb)), h] for (n, lb), h in hists.items()],
+        "buckets": {n: list(b) for n, b in buckets.items()},
+    }
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+class FileRegistry:
+    """Counters and histograms for one process, merged with sibling processes' dumps."""
+
+    def __init__(self, directory, flush_seconds=1.0):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._counters = {}   # (name, labels) -> value; labels = ((k, v), ...)
+        self._hists = {}      # (name, labels) -> [per-bucket counts..., +Inf count, sum]
+        self._buckets = {}    # histogram name -> bucket bounds
+        self._last_flush = 0.0
+        self._pid = self._token = None
+        self.reap_dead()
+        atexit.register(self.retire)
+
+    @property
+    def token(self):
+        """Identity of this process's dump; new after fork, so a reused PID is told apart."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._token = f"{self._pid}:{time.time()!r}"
+            own = self.dir / f"{self._pid}.json"
+            old = _read(own)
+            if old is not None and old.get("token") != self._token:
+                self._fold([own])   # an earlier process with our PID left this behind
+        return self._token
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._maybe_flush()
+
+    def observe(self, name, labels, seconds, buckets=BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                self._buckets[name] = buckets
+                h = self._hists[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if seconds <= bound:
+                    h[i] += 1
+                    break
+            else:
+                h[len(buckets)] += 1
+            h[-1] += seconds
+        self._maybe_flush()
+
+    def _dump(self):
+        with self._lock:
+            return _as_dump(self._counters, self._hists, self._buckets)
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        token = self.token
+        path = self.dir / f"{os.getpid()}.json"   # resolved per call: workers fork after import
+        tmp = path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps({**self._dump(), "token": token}))
+            os.replace(tmp, path)
+        except OSError:
+            pass   # metrics must never break a request
+
+    def _fold(self, paths):
+        """Add the dumps at `paths` to dead.json, then delete them (one process at a time)."""
+        try:
+            with open(self.dir / ".lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                dead = _read(self.dir / DEAD) or {}
+                counters, hists, buckets = {}, {}, {}
+                _merge(counters, hists, buckets, dead)
+                folded = dead.get("folded", [])
+                for path in paths:
+                    dump = _read(path)
+                    if dump is not None and dump.get("token") not in folded:
+                        _merge(counters, hists, buckets, dump)
+                        folded.append(dump.get("token"))
+                tmp = self.dir / "dead.tmp"
+                tmp.write_text(json.dumps({**_as_dump(counters, hists, buckets), "folded": folded[-FOLDED_KEEP:]}))
+                os.replace(tmp, self.dir / DEAD)
+                for path in paths:
+                    path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def reap_dead(self):
+        """Fold dumps whose process has exited."""
+        me = os.getpid()
+        dead = [p for p in self.dir.glob("[0-9]*.json") if int(p.stem) != me and not _alive(int(p.stem))]
+        if dead:
+            self._fold(dead)
+
+    def retire(self):
+        """atexit: move this process's totals into dead.json."""
+        self.flush()
+        self._fold([self.dir / f"{os.getpid()}.json"])
+
+    def collect(self):
+        """(counters, hists, buckets) summed over this process (live), live siblings and dead.json."""
+        self.reap_dead()
+        dumps = [self._dump()]
+        own = f"{os.getpid()}.json"
+        for path in [*self.dir.glob("[0-9]*.json"), self.dir / DEAD]:
+            if path.name == own:
+                continue
+            dump = _read(path)
+            if dump is not None:
+                dumps.append(dump)
+        counters, hists, buckets = {}, {}, {}
+        for d in dumps:
+            _merge(counters, hists, buckets, d)
+        return counters, hists, buckets
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    esc = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, esc)) + "}"
+
+
+def render(counters, hists, buckets, gauges):
+    """Prometheus text exposition of merged counters/histograms plus gauge values."""
+    lines = []
+    for name, (kind, doc) in HELP.items():
+        lines += [f"# HELP {name} {doc}", f"# TYPE {name} {kind}"]
+        if kind == "counter":
+            for (n, lb), v in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(lb)} {v}")
+            continue
+        bounds = buckets.get(name, BUCKETS)
+        for (n, lb), h in sorted(hists.items()):
+            if n != name:
+                continue
+            cum = 0
+            for bound, c in zip(bounds, h):
+                cum += c
+                lines.append(f"{name}_bucket{_labels(lb + (('le', repr(bound)),))} {cum}")
+            cum += h[len(bounds)]
+            lines.append(f"{name}_bucket{_labels(lb + (('le', '+Inf'),))} {cum}")
+            lines.append(f"{name}_sum{_labels(lb)} {h[-1]:.6f}")
+            lines.append(f"{name}_count{_labels(lb)} {cum}")
+    for name, (doc, value) in gauges.items():
+        lines += [f"# HELP {name} {doc}", f"# TYPE {name} gauge", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusMetrics:
+    """Wires request/DB hooks into a FileRegistry; `exposition()` is the /metrics body."""
+
+    def __init__(self, app, engine, directory, gauges, gauge_ttl=15, lock_wait=0.05, flush_seconds=1.0):
+        self.registry = FileRegistry(directory, flush_seconds)
+        self._gauges = gauges            # () -> {name: (help, value)}
+        self._gauge_ttl = gauge_ttl
+        self._gauge_cache = (0.0, {})
+        self._lock_wait = lock_wait
+        for name in ("crm_sqlite_lock_waits_total", "crm_sqlite_lock_errors_total"):
+            self.registry.inc(name, value=0)   # export 0 rather than nothing
+
+        app.before_request(self._begin)
+        app.after_request(self._finish)
+        event.listen(engine, "before_cursor_execute", self._before_sql)
+        event.listen(engine, "after_cursor_execute", self._after_sql)
+        event.listen(engine, "handle_error", self._on_error)
+
+        # no pool event fires before a checkout starts, so time the call itself
+        raw_connection = engine.raw_connection
+
+        def timed_raw_connection():
+            t0 = time.perf_counter()
+            try:
+                return raw_connection()
+            finally:
+                self.registry.observe("crm_db_pool_checkout_seconds", (), time.perf_counter() - t0, POOL_BUCKETS)
+
+        engine.raw_connection = timed_raw_connection
+
+    def _begin(self):
+        g._prom_t0 = time.perf_counter()
+
+    def _finish(self, response):
+        t0 = g.pop("_prom_t0", None)
+        if t0 is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else "unmatched"   # bounded label set
+        method = request.method
+        self.registry.inc("crm_http_requests_total",
+                          (("route", route), ("method", method), ("status", str(response.status_code))))
+        self.registry.observe("crm_http_request_duration_seconds", (("route", route), ("method", method)),
+                              time.perf_counter() - t0)
+        return response
+
+    def _before_sql(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:7].upper().startswith(WRITE_VERBS):
+            conn.info["_prom_write_t0"] = time.perf_counter()
+
+    def _after_sql(self, conn, cursor, statement, parameters, context, executemany):
+        t0 = conn.info.pop("_prom_write_t0", None)
+        if t0 is not None and time.perf_counter() - t0 >= self._lock_wait:
+            self.registry.inc("crm_sqlite_lock_waits_total")
+
+    def _on_error(self, ctx):
+        conn = ctx.connection
+        if conn is not None:
+            conn.info.pop("_prom_write_t0", None)
+        msg = str(ctx.original_exception).lower()
+        if "locked" in msg or "busy" in msg:
+            self.registry.inc("crm_sqlite_lock_errors_total")
+
+    def gauges(self):
+        """Business gauges, recomputed at most every gauge_ttl seconds per worker."""
+        stamp, values = self._gauge_cache
+        if time.monotonic() - stamp >= self._gauge_ttl or not values:
+            values = self._gauges()
+            self._gauge_cache = (time.monotonic(), values)
+        return values
+
+    def exposition(self):
+        counters, hists, buckets = self.registry.collect()
+        return render(counters, hists, buckets, self.gauges())
+
+
+def clear_registry(directory):
+    """Drop every worker dump (run before the workers start, e.g. under --init)."""
+    for path in Path(directory).glob("*.json"):
+        path.unlink(missing_ok=True)
@@ -0,0 +1,180 @@
+# Read-only connection routing for report / dashboard queries.
+# Notes:
+# - Reads that only aggregate (dashboard, payments, /metrics gauges, reports) go through
+#   ReadRouter.connect(); everything else, and every write, stays on the primary engine
+# - mode "ro": a second pool opened with file:...?mode=ro&uri=true plus PRAGMA query_only, so long
+#   scans never hold a connection the write path is waiting for and cannot take the write lock;
+#   in WAL mode they read a consistent snapshot while orders keep committing
+# - mode "snapshot": readers use a copy made with the SQLite online backup API, refreshed every
+#   `refresh` seconds by a background thread (one process per host at a time, via flock); the
+#   copy is switched in with os.replace and each process re-opens its pool when the file changes.
+#   Numbers (and the ETags built from them) may lag the primary by up to `refresh` seconds
+# - mode "off": connect() is the primary engine's, as before
+# - on_engine callbacks see every read engine created (e.g. to hook request metrics onto it)
+# - If the read side cannot be opened (no DB yet, no snapshot yet) the primary is used
+
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+
+log = logging.getLogger("crm")
+
+MODES = ("off", "ro", "snapshot")
+
+
+def _reader_engine(path, profile, pool_size):
+    engine = create_engine(f"sqlite:///file:{path}?mode=ro&uri=true", pool_size=pool_size, max_overflow=pool_size)
+    pragmas = [
+        "PRAGMA query_only=ON",
+        f"PRAGMA busy_timeout={int(profile.busy_timeout)}",
+        f"PRAGMA cache_size={int(profile.cache_size)}",
+        f"PRAGMA mmap_size={int(profile.mmap_size)}",
+        f"PRAGMA temp_store={profile.temp_store}",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for p in pragmas:
+                cur.execute(p)
+        finally:
+            cur.close()
+
+    return engine
+
+
+def make_snapshot(src_path, dest_path):
+    """Copy src into dest atomically with the backup API; returns the seconds it took."""
+    t0 = time.perf_counter()
+    dest_path = Path(dest_path)
+    tmp = dest_path.with_name(dest_path.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True)
+    dst = sqlite3.connect(tmp)
+    try:
+        # one step: a WAL read transaction never blocks the writer, while a paged copy would
+        # restart from scratch every time an order commits between two steps
+        src.backup(dst)
+        dst.execute("PRAGMA journal_mode=DELETE")   # plain file: mode=ro readers need no -wal/-shm
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp, dest_path)
+    return time.perf_counter() - t0
+
+
+class ReadRouter:
+    """Hands out connections for read-only reporting queries; see the notes at the top."""
+
+    def __init__(self, primary, primary_path, mode="ro", snapshot_path=None, refresh=60, profile=None,
+                 pool_size=5, on_engine=()):
+        if mode not in MODES:
+            raise ValueError(f"read routing mode must be one of {MODES}, not {mode!r}")
+        self.primary = primary
+        self.primary_path = Path(primary_path)
+        self.mode = mode
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.refresh = refresh
+        self.profile = profile
+        self.pool_size = pool_size
+        self.on_engine = list(on_engine)
+        self._engine = None
+        self._inode = None
+        self._lock = threading.Lock()
+        self._refreshing = None
+
+    @property
+    def read_path(self):
+        return self.snapshot_path if self.mode == "snapshot" else self.primary_path
+
+    def _reader(self):
+        path = self.read_path
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        with self._lock:
+            if self._engine is not None and st.st_ino != self._inode:
+                self._engine.dispose()   # snapshot was replaced: new connections open the new file
+                self._engine = None
+            if self._engine is None:
+                self._engine = _reader_engine(path, self.profile, self.pool_size)
+                for hook in self.on_engine:
+                    hook(self._engine)
+                self._inode = st.st_ino
+            return self._engine
+
+    def connect(self):
+        """A Connection for read-only queries (use as a context manager)."""
+        if self.mode == "off":
+            return self.primary.connect()
+        if self.mode == "snapshot":
+            self.maybe_refresh()
+        engine = self._reader()
+        if engine is not None:
+            try:
+                return engine.connect()
+            except OperationalError:
+                log.exception("Read-only pool unavailable; reading from the primary")
+        return self.primary.connect()
+
+    # --- snapshot upkeep -------------------------------------------------------------
+    def age(self):
+        try:
+            return time.time() - self.snapshot_path.stat().st_mtime
+        except OSError:
+            return None
+
+    def maybe_refresh(self):
+        """Start a background refresh when the snapshot is missing or older than `refresh`."""
+        age = self.age()
+        if age is not None and age < self.refresh:
+            return
+        with self._lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+            self._refreshing = threading.Thread(target=self.refresh_snapshot, name="read-snapshot", daemon=True)
+            self._refreshing.start()
+
+    def refresh_snapshot(self, force=False):
+        """Rebuild the snapshot unless another process is already doing it; True if we did."""
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.snapshot_path.with_name(self.snapshot_path.name + ".lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            age = self.age()
+            if not force and age is not None and age < self.refresh:
+                return False   # another process refreshed it while we waited
+            try:
+                took = make_snapshot(self.primary_path, self.snapshot_path)
+            except Exception:
+                log.exception("Read snapshot refresh failed")
+                return False
+        log.info("Read snapshot refreshed in %.2fs", took)
+        return True
+
+    def reset(self):
+        """Drop pooled read connections (the primary was restored); a snapshot is rebuilt at once."""
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
+                self._engine = None
+        if self.mode == "snapshot":
+            self.refresh_snapshot(force=True)
+
+    def status(self):
+        out = {"mode": self.mode, "path": str(self.read_path)}
+        if self.mode == "snapshot":
+            age = self.age()
+            out["age_seconds"] = None if age is None else round(age, 1)
+        return out
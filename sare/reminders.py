@@ -0,0 +1,235 @@
+# Follow-up reminder scheduler (digests of due / overdue open follow-ups).
+# Notes:
+# - Runs as a daemon thread in every web worker (started on the first request) or in its own
+#   process (--reminders); a lease row in scheduler_lease elects one leader, the others idle
+#   until the lease expires (3 ticks without renewal, e.g. the leader's worker died)
+# - Each tick reads Open follow-ups with followup_date <= today + lookahead through
+#   ix_follow_up_status_followup_date, skipping ones already sent today (reminder_sent), so an
+#   overdue follow-up is repeated once a day until it is closed
+# - Items are grouped into Digests of at most `batch` rows and handed to a notifier: log (crm.log),
+#   smtp://host:port?to=a@x,b@y (e.g. a local debugging SMTP server) or http(s)://webhook
+# - Delivery is at-least-once: rows are marked sent only after the notifier returns
+# - Plain SQL on the engine: no app context or ORM session needed in the thread
+
+import json
+import logging
+import os
+import smtplib
+import socket
+import threading
+import time
+import urllib.request
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from email.message import EmailMessage
+from urllib.parse import parse_qs, urlparse
+
+from sqlalchemy import inspect, text
+
+log = logging.getLogger("crm")
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS scheduler_lease (
+        name TEXT PRIMARY KEY,
+        holder TEXT NOT NULL,
+        expires REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS reminder_sent (
+        followup_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        PRIMARY KEY (followup_id, day)
+    )""",
+]
+
+# take the lease if it is free, expired or already ours; RETURNING tells us who holds it now
+ACQUIRE = text("""
+    INSERT INTO scheduler_lease (name, holder, expires) VALUES (:name, :me, :expires)
+    ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires = excluded.expires
+        WHERE scheduler_lease.holder = :me OR scheduler_lease.expires < :now
+    RETURNING holder
+""")
+
+DUE = text("""
+    SELECT f.id, f.customer_id, c.name, f.followup_date, f.notes
+    FROM follow_up AS f
+    LEFT JOIN customer AS c ON c.customer_id = f.customer_id
+    WHERE f.status = 'Open' AND f.followup_date <= :until
+      AND NOT EXISTS (SELECT 1 FROM reminder_sent AS r WHERE r.followup_id = f.id AND r.day = :today)
+    ORDER BY f.followup_date, f.id
+    LIMIT :limit
+""")
+
+
+def ensure_reminder_tables(engine):
+    """Create the scheduler tables; returns False when follow_up lacks the needed columns."""
+    with engine.begin() as conn:
+        for ddl in SCHEMA:
+            conn.execute(text(ddl))
+    insp = inspect(engine)
+    if not insp.has_table("follow_up"):
+        return False
+    cols = {c["name"] for c in insp.get_columns("follow_up")}
+    return {"customer_id", "followup_date", "status", "notes"} <= cols
+
+
+# --- Digest & notifiers -------------------------------------------------------------
+@dataclass
+class Digest:
+    day: date
+    overdue: list = field(default_factory=list)    # [dict(id, customer_id, name, date, notes)]
+    due_today: list = field(default_factory=list)
+    upcoming: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.overdue) + len(self.due_today) + len(self.upcoming)
+
+    def subject(self):
+        return f"Follow-ups {self.day}: {len(self.overdue)} overdue, {len(self.due_today)} due today"
+
+    def text(self):
+        lines = [self.subject(), ""]
+        for title, items in (("Overdue", self.overdue), ("Due today", self.due_today), ("Upcoming", self.upcoming)):
+            if not items:
+                continue
+            lines.append(f"{title}:")
+            for it in items:
+                lines.append(f"  {it['date']}  {it['customer_id']} {it['name'] or ''} - {it['notes'] or ''}".rstrip())
+            lines.append("")
+        return "\n".join(lines)
+
+    def as_dict(self):
+        return {"day": self.day.isoformat(), "overdue": self.overdue, "due_today": self.due_today,
+                "upcoming": self.upcoming}
+
+
+class LogNotifier:
+    def send(self, digest):
+        log.info("Reminder digest\n%s", digest.text())
+
+
+class SmtpNotifier:
+    def __init__(self, host, port, to, sender="crm@localhost"):
+        self.host, self.port, self.to, self.sender = host, port, to, sender
+
+    def send(self, digest):
+        msg = EmailMessage()
+        msg["Subject"] = digest.subject()
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.to)
+        msg.set_content(digest.text())
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(msg)
+
+
+class WebhookNotifier:
+    def __init__(self, url):
+        self.url = url
+
+    def send(self, digest):
+        req = urllib.request.Request(self.url, data=json.dumps(digest.as_dict()).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            resp.read()
+
+
+def make_notifier(spec):
+    """'log' | 'smtp://host:port?to=a@x,b@y[&from=..]' | 'http(s)://...' -> notifier."""
+    spec = (spec or "log").strip()
+    url = urlparse(spec)
+    if url.scheme == "smtp":
+        qs = parse_qs(url.query)
+        to = [a for v in qs.get("to", []) for a in v.split(",") if a] or ["staff@localhost"]
+        return SmtpNotifier(url.hostname or "localhost", url.port or 25, to, qs.get("from", ["crm@localhost"])[0])
+    if url.scheme in ("http", "https"):
+        return WebhookNotifier(spec)
+    return LogNotifier()
+
+
+# --- Scheduler ------------------------------------------------------------------------
+class ReminderScheduler:
+    """One leader-elected tick every `interval` seconds; see the notes at the top."""
+
+    def __init__(self, engine, notifier, interval=300, lookahead_days=1, batch=500, name="followup-reminders"):
+        self.engine = engine
+        self.notifier = notifier
+        self.interval = interval
+        self.lookahead_days = lookahead_days
+        self.batch = batch
+        self.name = name
+        self._holder = self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    @property
+    def holder(self):
+        """Lease identity of this process; made after fork (gunicorn --preload builds us in the master,
+        and workers sharing one identity would all "hold" the lease)."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._holder = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+        return self._holder
+
+    def is_leader(self):
+        now = time.time()
+        with self.engine.begin() as conn:
+            holder = conn.execute(ACQUIRE, {"name": self.name, "me": self.holder, "now": now,
+                                            "expires": now + 3 * self.interval}).scalar()
+        return holder == self.holder
+
+    def tick(self, today=None):
+        """Send the digests due now if we are the leader; returns the number of follow-ups sent."""
+        if not self.is_leader():
+            return 0
+        today = today or date.today()
+        until = today + timedelta(days=self.lookahead_days)
+        sent = 0
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(DUE, {"until": until.isoformat(), "today": today.isoformat(),
+                                          "limit": self.batch}).all()
+            if not rows:
+                break
+            digest = Digest(today)
+            for fid, cid, name, fdate, notes in rows:
+                fdate = fdate if isinstance(fdate, date) else date.fromisoformat(str(fdate)[:10])
+                item = {"id": fid, "customer_id": cid, "name": name, "date": fdate.isoformat(), "notes": notes}
+                bucket = digest.overdue if fdate < today else digest.due_today if fdate == today else digest.upcoming
+                bucket.append(item)
+            self.notifier.send(digest)
+            with self.engine.begin() as conn:
+                conn.execute(text("INSERT OR IGNORE INTO reminder_sent (followup_id, day) VALUES (:f, :d)"),
+                             [{"f": r[0], "d": today.isoformat()} for r in rows])
+            sent += len(rows)
+            if len(rows) < self.batch:
+                break
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM reminder_sent WHERE day < :d"),
+                         {"d": (today - timedelta(days=7)).isoformat()})
+        if sent:
+            log.info("Reminders: %d follow-ups sent in digests of <= %d", sent, self.batch)
+        return sent
+
+    def run(self, once=False):
+        """Tick until stop() (or once); errors are logged and retried on the next tick."""
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                log.exception("Reminder tick failed")
+            if once:
+                return
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the background thread once per process (safe to call on every request)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run, name="reminders", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
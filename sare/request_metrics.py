@@ -0,0 +1,153 @@
+# Per-request instrumentation: SQL count/time, template time, response size.
+# Notes:
+# - SQLAlchemy cursor events time every statement; Flask's template signals time rendering;
+#   before/after_request ties them to the request (state lives on flask.g, so threads are fine)
+# - Each response gets a Server-Timing header (db / tpl / app), visible in the browser devtools
+# - The last `window` requests are kept per process for /_metrics (p50/p95, queries, slowest SQL)
+# - Slow requests and repeated statements (N+1: same SQL text run `repeat_warn`+ times in one
+#   request, e.g. o.customer.name in a loop) are logged to crm.log
+# - Streamed responses (exports) are recorded when the headers go out, before the body streams
+
+import logging
+import math
+import threading
+import time
+from collections import Counter, deque
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+log = logging.getLogger("crm")
+
+
+def _pct(sorted_vals, pct):
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, math.ceil(pct / 100 * len(sorted_vals)) - 1))
+    return round(sorted_vals[k], 2)
+
+
+def _short(sql, limit=300):
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= limit else sql[:limit] + "..."
+
+
+class RequestMetrics:
+    """Hooks `app` and `engine`; `snapshot()` summarises the rolling window per endpoint."""
+
+    def __init__(self, app, engine, window=1000, slow_ms=500, repeat_warn=10, server_timing=True):
+        self.slow_ms = slow_ms
+        self.repeat_warn = repeat_warn
+        self.server_timing = server_timing
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+        self.watch(engine)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._begin)
+        app.after_request(self._finish)
+
+    def watch(self, engine):
+        """Count `engine`'s statements too (e.g. the read-only report pool)."""
+        event.listen(engine, "before_cursor_execute", self._before_sql)
+        event.listen(engine, "after_cursor_execute", self._after_sql)
+
+    # --- collection ---
+    def _begin(self):
+        g._rm = {"t0": time.perf_counter(), "queries": 0, "sql_ms": 0.0, "slowest": (0.0, None),
+                 "stmts": Counter(), "tpl_ms": 0.0, "tpl_t0": None}
+
+    def _state(self):
+        return g.get("_rm") if has_request_context() else None
+
+    def _before_sql(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["_rm_t0"] = time.perf_counter()   # a connection runs one statement at a time
+
+    def _after_sql(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("_rm_t0", None)
+        if started is None:
+            return
+        ms = (time.perf_counter() - started) * 1000
+        st = self._state()
+        if st is None:
+            return
+        st["queries"] += 1
+        st["sql_ms"] += ms
+        st["stmts"][statement] += 1
+        if ms > st["slowest"][0]:
+            st["slowest"] = (ms, statement)
+
+    def _before_render(self, sender, template, context, **extra):
+        st = self._state()
+        if st is not None:
+            st["tpl_t0"] = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        st = self._state()
+        if st is not None and st["tpl_t0"] is not None:
+            st["tpl_ms"] += (time.perf_counter() - st["tpl_t0"]) * 1000
+            st["tpl_t0"] = None
+
+    def _finish(self, response):
+        st = self._state()
+        if st is None:
+            return response
+        total_ms = (time.perf_counter() - st["t0"]) * 1000
+        size = None if response.is_streamed else response.calculate_content_length()
+        repeated, repeats = st["stmts"].most_common(1)[0] if st["stmts"] else (None, 0)
+        rec = {
+            "endpoint": request.endpoint or "(unmatched)", "method": request.method, "status": response.status_code,
+            "total_ms": total_ms, "queries": st["queries"], "sql_ms": st["sql_ms"], "tpl_ms": st["tpl_ms"],
+            "bytes": size, "slowest_ms": st["slowest"][0], "slowest_sql": st["slowest"][1],
+            "repeated_sql": repeated if repeats >= self.repeat_warn else None, "repeats": repeats,
+        }
+        with self._lock:
+            self._recent.append(rec)
+
+        if self.server_timing:
+            response.headers.add("Server-Timing", f'db;dur={st["sql_ms"]:.1f};desc="{st["queries"]} queries"')
+            response.headers.add("Server-Timing", f'tpl;dur={st["tpl_ms"]:.1f}')
+            response.headers.add("Server-Timing", f"app;dur={total_ms:.1f}")
+
+        if rec["repeated_sql"]:
+            log.warning("Possible N+1 in %s %s: same statement ran %d times: %s",
+                        request.method, request.path, repeats, _short(repeated))
+        if total_ms >= self.slow_ms:
+            log.warning("Slow request %s %s -> %s: %.0f ms total, %d queries / %.0f ms SQL, template %.0f ms, "
+                        "%s bytes; slowest SQL %.0f ms: %s",
+                        request.method, request.full_path.rstrip("?"), response.status_code, total_ms,
+                        st["queries"], st["sql_ms"], st["tpl_ms"], size, st["slowest"][0],
+                        _short(st["slowest"][1] or "-"))
+        return response
+
+    # --- reporting ---
+    def snapshot(self):
+        """Per-endpoint aggregates over the rolling window (JSON-ready)."""
+        with self._lock:
+            recent = list(self._recent)
+        by_ep = {}
+        for rec in recent:
+            by_ep.setdefault(rec["endpoint"], []).append(rec)
+
+        endpoints = {}
+        for ep, recs in sorted(by_ep.items()):
+            n = len(recs)
+            totals = sorted(r["total_ms"] for r in recs)
+            sizes = [r["bytes"] for r in recs if r["bytes"] is not None]
+            slowest = max(recs, key=lambda r: r["slowest_ms"])
+            repeated = [r for r in recs if r["repeated_sql"]]
+            endpoints[ep] = {
+                "requests": n,
+                "p50_ms": _pct(totals, 50), "p95_ms": _pct(totals, 95), "max_ms": round(totals[-1], 2),
+                "avg_queries": round(sum(r["queries"] for r in recs) / n, 1),
+                "max_queries": max(r["queries"] for r in recs),
+                "avg_sql_ms": round(sum(r["sql_ms"] for r in recs) / n, 2),
+                "avg_template_ms": round(sum(r["tpl_ms"] for r in recs) / n, 2),
+                "avg_bytes": round(sum(sizes) / len(sizes)) if sizes else None,
+                "slowest_sql": {"ms": round(slowest["slowest_ms"], 2), "statement": _short(slowest["slowest_sql"] or "")},
+                "n_plus_one": ({"repeats": repeated[-1]["repeats"], "statement": _short(repeated[-1]["repeated_sql"])}
+                               if repeated else None),
+            }
+        return {"window": len(recent), "since": self._started, "slow_ms": self.slow_ms, "endpoints": endpoints}
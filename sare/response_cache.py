@@ -0,0 +1,185 @@
+# Cache for read-mostly views + ETag / 304 for every GET page.
+# Notes:
+# - data_version holds one counter per table, bumped by AFTER INSERT/UPDATE/DELETE triggers, so
+#   ORM writes, bulk imports and raw SQL all count; cache keys and ETags include the versions of
+#   the tables a view reads, so a write makes every older entry unreachable (no invalidation)
+# - Backends: in-process LRU with TTL (default), or a shared SQLite file so all Gunicorn
+#   workers reuse one computation (CRM_CACHE_BACKEND=sqlite)
+# - Values are context objects (e.g. DashboardStats), not HTML: pages still render per request,
+#   so flashed messages never end up in the cache
+# - ETags hash the build (template/code mtimes), endpoint, query args and table versions; a
+#   matching If-None-Match gets an empty 304 after one tiny SELECT and no ORM work; a page that
+#   shows flash messages gets no ETag and Cache-Control: no-store
+
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from flask import Response, make_response, request, session
+from sqlalchemy import bindparam, inspect, text
+
+VERSIONED_TABLES = ("customer", "order", "follow_up")
+SCHEMA = "CREATE TABLE IF NOT EXISTS data_version (tbl TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS data_version_{name}_{suffix} AFTER {op} ON "{name}" BEGIN
+        UPDATE data_version SET version = version + 1 WHERE tbl = '{name}';
+    END
+"""
+OPS = {"ai": "INSERT", "au": "UPDATE", "ad": "DELETE"}
+
+MISSING = object()
+
+
+# --- Table versions ----------------------------------------------------------------
+def ensure_data_version(engine, tables=VERSIONED_TABLES):
+    """Create data_version and its triggers for the `tables` that exist; returns them."""
+    present = [t for t in tables if inspect(engine).has_table(t)]
+    with engine.begin() as conn:
+        conn.execute(text(SCHEMA))
+        for name in present:
+            conn.execute(text("INSERT OR IGNORE INTO data_version (tbl, version) VALUES (:t, 0)"), {"t": name})
+            for suffix, op in OPS.items():
+                conn.execute(text(TRIGGER.format(name=name, suffix=suffix, op=op)))
+    return present
+
+
+def drop_data_version_triggers(conn, tables=VERSIONED_TABLES):
+    """For bulk loads; ensure_data_version() puts them back (then bump_versions)."""
+    for name in tables:
+        for suffix in OPS:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS data_version_{name}_{suffix}"))
+
+
+def bump_versions(conn, tables=VERSIONED_TABLES):
+    conn.execute(text("UPDATE data_version SET version = version + 1 WHERE tbl IN :t")
+                 .bindparams(bindparam("t", expanding=True)), {"t": list(tables)})
+
+
+def table_versions(conn, tables):
+    """Current versions of `tables`, in that order (0 for untracked tables)."""
+    rows = dict(conn.execute(text("SELECT tbl, version FROM data_version WHERE tbl IN :t")
+                             .bindparams(bindparam("t", expanding=True)), {"t": list(tables)}).all())
+    return tuple(rows.get(t, 0) for t in tables)
+
+
+# --- Backends ----------------------------------------------------------------------
+class MemoryCache:
+    """Per-process LRU with a TTL."""
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return MISSING
+            if hit[0] < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class SQLiteCache:
+    """Pickled values in a small SQLite file shared by every worker on the host."""
+
+    def __init__(self, path, maxsize=1024, ttl=300):
+        self.path = str(path)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS response_cache "
+                         "(key TEXT PRIMARY KEY, expires REAL NOT NULL, value BLOB NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")   # a lost cache entry is just a miss
+        return conn
+
+    def get(self, key):
+        try:
+            row = self._conn().execute("SELECT value FROM response_cache WHERE key = ? AND expires > ?",
+                                       (repr(key), time.time())).fetchone()
+        except sqlite3.Error:
+            return MISSING
+        return MISSING if row is None else pickle.loads(row[0])
+
+    def set(self, key, value):
+        try:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO response_cache (key, expires, value) VALUES (?, ?, ?)",
+                         (repr(key), time.time() + self.ttl, pickle.dumps(value)))
+            # entries of old versions are never read again: drop expired ones and cap the size
+            conn.execute("DELETE FROM response_cache WHERE expires <= ? OR key NOT IN "
+                         "(SELECT key FROM response_cache ORDER BY expires DESC LIMIT ?)",
+                         (time.time(), self.maxsize))
+        except sqlite3.Error:
+            pass   # cache is best-effort
+
+
+def make_cache(backend, path=None, maxsize=256, ttl=300):
+    if backend == "sqlite":
+        return SQLiteCache(path, maxsize, ttl)
+    return MemoryCache(maxsize, ttl)
+
+
+def cached(cache, key, compute):
+    """cache[key], computing and storing it on a miss."""
+    value = cache.get(key)
+    if value is MISSING:
+        value = compute()
+        cache.set(key, value)
+    return value
+
+
+# --- Conditional responses ---------------------------------------------------------------
+def build_token(*paths):
+    """Changes when any file under `paths` changes (a deploy must not 304 old HTML)."""
+    h = hashlib.sha1()
+    for root in paths:
+        for f in sorted(Path(root).rglob("*") if Path(root).is_dir() else [Path(root)]):
+            if f.is_file():
+                st = f.stat()
+                h.update(f"{f}:{st.st_mtime_ns}:{st.st_size};".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def etag_for(*parts):
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:24]
+
+
+def conditional_view(etag, render):
+    """Empty 304 when the client already has `etag`; otherwise render() tagged with it.
+
+    A page that shows flashed messages is one-off: it gets no ETag and must not be stored, or a
+    later revalidation would 304 the browser back to the old message."""
+    if session.get("_flashes"):
+        resp = make_response(render())
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        resp = make_response(render())
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"   # browsers keep the copy but revalidate
+    return resp
@@ -7,19 +7,49 @@
 # - Gentle server-side validation for orders (amount, status/mode coupling)
 # - Logs errors to crm.log
 
+import io
 import os
 import logging
 from datetime import datetime, date
 from pathlib import Path
 
 from flask import (
-    Flask, request, redirect, url_for, jsonify, render_template, flash
+    Flask, request, redirect, url_for, jsonify, render_template, flash, Response, send_file, send_from_directory,
+    session, stream_with_context,
 )
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import Session, contains_eager, raiseload
+
+from backups import BackupError, BackupStore, save_upload, write_backup
+from customer_index import CustomerPrefixIndex
+from customer_stats import customer_count, ensure_customer_stats, reconcile_customer_stats
+from dashboard_stats import DashboardStats, load_dashboard_stats
+from db_indexes import ensure_indexes, explain_routes
+from exporter import FORMATS as EXPORT_FORMATS, export_stream
+from id_sequences import IdBlockCache, allocate, ensure_id_sequence_table
+from importer import import_customers, import_orders
+from jobs import JobWorker, enqueue, ensure_jobs_table, get_job
+from loading import eager
+from page_store import PageStore, StoreError
+from pagination import keyset_page
+from prom_metrics import PrometheusMetrics, clear_registry
+from read_replica import ReadRouter
+from reminders import ReminderScheduler, ensure_reminder_tables, make_notifier
+from request_metrics import RequestMetrics
+from response_cache import (
+    VERSIONED_TABLES, build_token, cached, conditional_view, ensure_data_version, etag_for, make_cache,
+    table_versions,
+)
+from segments import ensure_segment_tables, run_segmentation
+from search_index import ensure_search_index, search_enabled, search_subquery
+from sqlite_profile import install_sqlite_profile
+from summary_tables import (
+    ensure_summary_tables, followup_count, order_range_totals, rebuild_aggregates, register_summary_hooks
+)
 
 APP_NAME = "Vihaa Vastra Sarees"
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "saree_crm.db"         # keep at project root for now
+DB_PATH = Path(os.environ.get("CRM_DB_PATH", BASE_DIR / "saree_crm.db"))   # keep at project root for now
 INSTANCE_DIR = BASE_DIR / "instance"        # Flask instance (not strictly needed here)
 
 # --- Flask & DB setup ----------------------------------------------------------
@@ -30,10 +60,87 @@ app.secret_key = os.environ.get("FLASK_SECRET", "vv-sarees-secret")
 app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{DB_PATH}"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# List views are keyset-paginated; ?per_page= may lower/raise this up to MAX_PAGE_SIZE
+app.config["PAGE_SIZE"] = int(os.environ.get("CRM_PAGE_SIZE", "50"))
+app.config["MAX_PAGE_SIZE"] = int(os.environ.get("CRM_MAX_PAGE_SIZE", "500"))
+# Customer typeahead index lifetime (other workers' edits show up within this many seconds)
+app.config["SUGGEST_TTL"] = int(os.environ.get("CRM_SUGGEST_TTL", "300"))
+# >1 = each worker reserves human IDs in blocks of this size (fewer write-lock trips, gaps on restart)
+app.config["ID_BLOCK_SIZE"] = int(os.environ.get("CRM_ID_BLOCK", "1"))
+# Request instrumentation: slow-request log threshold, /_metrics window, N+1 warning threshold
+app.config["SLOW_REQUEST_MS"] = int(os.environ.get("CRM_SLOW_REQUEST_MS", "500"))
+app.config["METRICS_WINDOW"] = int(os.environ.get("CRM_METRICS_WINDOW", "1000"))
+app.config["N_PLUS_ONE_REPEATS"] = int(os.environ.get("CRM_N_PLUS_ONE", "10"))
+app.config["SERVER_TIMING"] = os.environ.get("CRM_SERVER_TIMING", "1") == "1"
+# Prometheus /metrics: per-worker dumps shared through this dir; business gauges cache lifetime
+app.config["METRICS_DIR"] = Path(os.environ.get("CRM_METRICS_DIR", INSTANCE_DIR / "metrics"))
+app.config["METRICS_GAUGE_TTL"] = int(os.environ.get("CRM_METRICS_GAUGE_TTL", "15"))
+# Lazy relationship loads in list views raise instead of querying per row (dev / tests)
+app.config["RAISE_ON_LAZY_LOAD"] = os.environ.get("CRM_RAISE_ON_LAZY_LOAD", "0") == "1"
+# Dashboard/payments stats cache: "memory" (per worker) or "sqlite" (shared file, all workers)
+app.config["CACHE_BACKEND"] = os.environ.get("CRM_CACHE_BACKEND", "memory")
+app.config["CACHE_PATH"] = Path(os.environ.get("CRM_CACHE_PATH", INSTANCE_DIR / "cache.db"))
+app.config["CACHE_TTL"] = int(os.environ.get("CRM_CACHE_TTL", "300"))
+app.config["CACHE_SIZE"] = int(os.environ.get("CRM_CACHE_SIZE", "256"))
+# Follow-up reminder digests: run inside the web workers (one elected leader) or via --reminders
+app.config["REMINDERS"] = os.environ.get("CRM_REMINDERS", "0") == "1"
+app.config["REMINDER_INTERVAL"] = int(os.environ.get("CRM_REMINDER_INTERVAL", "300"))
+app.config["REMINDER_LOOKAHEAD_DAYS"] = int(os.environ.get("CRM_REMINDER_LOOKAHEAD_DAYS", "1"))
+app.config["REMINDER_NOTIFIER"] = os.environ.get("CRM_REMINDER_NOTIFIER", "log")   # log | smtp://.. | http(s)://..
+# Background jobs (--worker): uploads and export files live here
+app.config["JOBS_DIR"] = Path(os.environ.get("CRM_JOBS_DIR", INSTANCE_DIR / "jobs"))
+app.config["JOB_POLL_SECONDS"] = float(os.environ.get("CRM_JOB_POLL", "1"))
+# RFM segmentation (--segment-customers): runs are incremental unless the last full one is older
+app.config["RFM_FULL_EVERY_DAYS"] = int(os.environ.get("CRM_RFM_FULL_EVERY_DAYS", "7"))
+# Dashboard/report reads: "ro" (own read-only pool), "snapshot" (backup copy, refreshed), "off"
+app.config["READ_ROUTING"] = os.environ.get("CRM_READ_ROUTING", "ro")
+app.config["READ_POOL_SIZE"] = int(os.environ.get("CRM_READ_POOL_SIZE", "5"))
+app.config["SNAPSHOT_PATH"] = Path(os.environ.get("CRM_SNAPSHOT_PATH", INSTANCE_DIR / "read_snapshot.db"))
+app.config["SNAPSHOT_REFRESH"] = int(os.environ.get("CRM_SNAPSHOT_REFRESH", "60"))
+# Online backups (--backup, job "backup"): gzip'd copies + catalog.json, newest BACKUP_KEEP kept;
+# the copies taken before each restore rotate separately (BACKUP_KEEP_PRE_RESTORE)
+app.config["BACKUP_DIR"] = Path(os.environ.get("CRM_BACKUP_DIR", INSTANCE_DIR / "backups"))
+app.config["BACKUP_KEEP"] = int(os.environ.get("CRM_BACKUP_KEEP", "14"))
+app.config["BACKUP_KEEP_PRE_RESTORE"] = int(os.environ.get("CRM_BACKUP_KEEP_PRE_RESTORE", "5"))
+# "Download DB" dumps inline up to this size; a bigger DB is prepared by the job worker and linked from /backup
+app.config["BACKUP_INLINE_MAX_MB"] = int(os.environ.get("CRM_BACKUP_INLINE_MAX_MB", "50"))
+# Deduplicated snapshots (--snapshot, e.g. every 5 min): only changed chunks are stored; --prune-snapshots
+# keeps the newest PAGE_STORE_KEEP plus one per day for PAGE_STORE_DAILY days
+app.config["PAGE_STORE_DIR"] = Path(os.environ.get("CRM_PAGE_STORE_DIR", app.config["BACKUP_DIR"] / "pages"))
+app.config["PAGE_STORE_CHUNK"] = int(os.environ.get("CRM_PAGE_STORE_CHUNK", "32768"))
+app.config["PAGE_STORE_KEEP"] = int(os.environ.get("CRM_PAGE_STORE_KEEP", "288"))
+app.config["PAGE_STORE_DAILY"] = int(os.environ.get("CRM_PAGE_STORE_DAILY", "30"))
+
 db = SQLAlchemy(app)
 
+# SQLite tuning for Gunicorn: WAL, busy_timeout, cache/mmap sizes (CRM_SQLITE_* env vars)
+with app.app_context():
+    sqlite_profile = install_sqlite_profile(db.engine)
+
+# Query count / SQL time / template time per request -> Server-Timing, /_metrics, slow log
+with app.app_context():
+    request_metrics = RequestMetrics(
+        app, db.engine,
+        window=app.config["METRICS_WINDOW"],
+        slow_ms=app.config["SLOW_REQUEST_MS"],
+        repeat_warn=app.config["N_PLUS_ONE_REPEATS"],
+        server_timing=app.config["SERVER_TIMING"],
+    )
+
+# Aggregate-only reads (dashboard, payments, gauges, reports) use their own read-only pool
+with app.app_context():
+    read_router = ReadRouter(
+        db.engine, DB_PATH,
+        mode=app.config["READ_ROUTING"],
+        snapshot_path=app.config["SNAPSHOT_PATH"],
+        refresh=app.config["SNAPSHOT_REFRESH"],
+        profile=sqlite_profile,
+        pool_size=app.config["READ_POOL_SIZE"],
+        on_engine=[request_metrics.watch],
+    )
+
 # --- Logging -------------------------------------------------------------------
-log_file = BASE_DIR / "crm.log"
+log_file = Path(os.environ.get("CRM_LOG_FILE", BASE_DIR / "crm.log"))
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
@@ -55,11 +162,39 @@ class Customer(db.Model):
     ctype = db.Column(db.String(64))   # Regular / VIP etc
     notes = db.Column(db.Text)
 
+    # lifetime rollup (order count, spend, last order), maintained by triggers in customer_stats.py
+    stats = db.relationship("CustomerStats", uselist=False, viewonly=True,
+                            primaryjoin="Customer.customer_id == foreign(CustomerStats.customer_id)")
+
     def __repr__(self):
         return f"<Customer {self.customer_id} {self.name}>"
 
 
+class CustomerStats(db.Model):
+    # mirrors customer_stats.SCHEMA; written only by its triggers, never through the ORM
+    __tablename__ = "customer_stats"
+    __table_args__ = (
+        db.Index("ix_customer_stats_paid_amount", "paid_amount", "customer_id"),
+        db.Index("ix_customer_stats_last_order_date", "last_order_date", "customer_id"),
+    )
+
+    customer_id = db.Column(db.String(64), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, server_default="0")
+    total_amount = db.Column(db.Integer, nullable=False, server_default="0")
+    paid_amount = db.Column(db.Integer, nullable=False, server_default="0")
+    pending_amount = db.Column(db.Integer, nullable=False, server_default="0")
+    last_order_date = db.Column(db.String(10), nullable=False, server_default="")   # '' = no orders yet
+
+
 class Order(db.Model):
+    # hot access paths: listing sort, Paid/Pending totals by date, per-customer history
+    __table_args__ = (
+        db.Index("ix_order_date", "date"),
+        db.Index("ix_order_payment_status_date", "payment_status", "date"),
+        db.Index("ix_order_payment_status_mode", "payment_status", "payment_mode"),
+        db.Index("ix_order_customer_id_date", "customer_id", "date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.String(64), unique=True, nullable=False)
     date = db.Column(db.Date, nullable=False, default=date.today)
@@ -82,6 +217,13 @@ class Order(db.Model):
 
 
 class FollowUp(db.Model):
+    # hot access paths: listing sort, open/due follow-ups, per-customer history
+    __table_args__ = (
+        db.Index("ix_follow_up_followup_date", "followup_date"),
+        db.Index("ix_follow_up_status_followup_date", "status", "followup_date"),
+        db.Index("ix_follow_up_customer_id", "customer_id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.String(64), db.ForeignKey('customer.customer_id'), nullable=False)
     followup_date = db.Column(db.Date, nullable=False, default=date.today)
@@ -91,45 +233,190 @@ class FollowUp(db.Model):
     customer = db.relationship('Customer', primaryjoin="Customer.customer_id==FollowUp.customer_id")
 
 
+# Incrementally maintained KPI summaries (order_summary / order_daily / followup_summary)
+register_summary_hooks(Order, FollowUp)
+
+# Typeahead index over customers (replaces the full <select> on the forms)
+customer_index = CustomerPrefixIndex(
+    lambda: db.session.query(Customer.id, Customer.customer_id, Customer.name, Customer.phone, Customer.insta),
+    ttl=app.config["SUGGEST_TTL"],
+)
+customer_index.watch(Customer)
+
+def ensure_runtime_tables():
+    """Side tables and triggers the app relies on (startup, --init, after a restore); True if reminders can run."""
+    try:
+        if ensure_summary_tables(db.engine):
+            log.info("Summary tables created")
+    except Exception:
+        log.exception("Summary tables unavailable; run with --init")
+    ensure_search_index(db.engine)
+    ensure_id_sequence_table(db.engine)
+    # per-table write counters (triggers) behind the stats cache keys and every ETag
+    ensure_data_version(db.engine)
+    ensure_customer_stats(db.engine)
+    ensure_segment_tables(db.engine)
+    reminders_ready = ensure_reminder_tables(db.engine)
+    ensure_jobs_table(db.engine)
+    return reminders_ready
+
+with app.app_context():
+    reminders_ready = ensure_runtime_tables()
+    id_blocks = IdBlockCache(db.engine, app.config["ID_BLOCK_SIZE"]) if app.config["ID_BLOCK_SIZE"] > 1 else None
+
+
+def business_gauges():
+    """Gauges for /metrics and /_status, read from the summary tables and the customer counter."""
+    with read_router.connect() as conn:
+        stats = load_dashboard_stats(conn)
+        return {
+            "crm_customers": ("Customers.", customer_count(conn) or 0),
+            "crm_orders": ("Orders.", stats.total_orders),
+            "crm_paid_amount": ("Sum of Paid order amounts.", stats.total_paid),
+            "crm_pending_amount": ("Sum of Pending order amounts.", stats.total_pending),
+            "crm_followups": ("Follow-ups.", followup_count(conn) or 0),
+            "crm_followups_open": ("Open follow-ups.", stats.pending_followups),
+        }
+
+with app.app_context():
+    reminder_scheduler = ReminderScheduler(
+        db.engine,
+        make_notifier(app.config["REMINDER_NOTIFIER"]),
+        interval=app.config["REMINDER_INTERVAL"],
+        lookahead_days=app.config["REMINDER_LOOKAHEAD_DAYS"],
+    )
+
+@app.before_request
+def start_reminders():
+    # started lazily so CLI runs (--init, imports) and a pre-fork master never spawn the thread
+    if app.config["REMINDERS"] and reminders_ready:
+        reminder_scheduler.start()
+
+stats_cache = make_cache(
+    app.config["CACHE_BACKEND"], app.config["CACHE_PATH"], app.config["CACHE_SIZE"], app.config["CACHE_TTL"]
+)
+
+with app.app_context():
+    prom = PrometheusMetrics(
+        app, db.engine, app.config["METRICS_DIR"], business_gauges, gauge_ttl=app.config["METRICS_GAUGE_TTL"]
+    )
+
+
 # --- Helpers -------------------------------------------------------------------
-def parse_date(dstr: str):
-    """Accepts 'YYYY-MM-DD' (from input type=date) or 'DD/MM/YYYY'."""
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y")
+
+def parse_date(dstr: str, strict=False):
+    """Accepts 'YYYY-MM-DD' (from input type=date) or 'DD/MM/YYYY'; blank is today.
+
+    Anything else is today as well, unless `strict` (imports, report ranges): then ValueError."""
+    dstr = (dstr or "").strip()
     if not dstr:
         return date.today()
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+    for fmt in DATE_FORMATS:
         try:
             return datetime.strptime(dstr, fmt).date()
         except ValueError:
             pass
+    if strict:
+        raise ValueError(f"Date {dstr!r} is not YYYY-MM-DD or DD/MM/YYYY.")
     return date.today()
 
 def next_human_id(prefix: str, table, field: str, width=5):
-    """Generate next human-readable id like ORD20251101-00001."""
+    """Generate next human-readable id like ORD20251101-00001 (atomic, see id_sequences.py)."""
     today = date.today().strftime("%Y%m%d")
-    like = f"{prefix}{today}-%"
-    # fetch latest today
-    latest = (
-        db.session.query(table)
-        .filter(getattr(table, field).like(like))
-        .order_by(getattr(table, field).desc())
-        .first()
-    )
-    if not latest:
-        seq = 1
+    column = getattr(table, field)
+    if id_blocks:
+        seq = id_blocks.next(prefix, today, column)
     else:
-        try:
-            seq = int(latest.__dict__[field].split("-")[-1]) + 1
-        except Exception:
-            seq = 1
+        # runs in the caller's transaction: rolls back with a failed insert
+        seq = allocate(db.session, prefix, today, column)
     return f"{prefix}{today}-{str(seq).zfill(width)}"
 
-def validate_order_form(form, is_update=False):
-    """Server-side guardrails for order create/update."""
+def page_size():
+    """Requested page size (?per_page=), clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        size = int(request.args.get("per_page") or app.config["PAGE_SIZE"])
+    except ValueError:
+        size = app.config["PAGE_SIZE"]
+    return max(1, min(size, app.config["MAX_PAGE_SIZE"]))
+
+def apply_search(query, base, q, like_columns, sort):
+    """Filter `query` by the search box: FTS5 + bm25 rank when indexed, else LIKE on `like_columns`."""
+    if not q:
+        return query, sort
+    if search_enabled(base):
+        hits = search_subquery(base, q)
+        pk = sort[-1]   # sort keys always end with the primary key
+        query = query.join(hits, pk[0] == hits.c.rowid).add_columns(hits.c.rank)
+        return query, [(hits.c.rank, False), pk]
+    like = f"%{q}%"
+    return query.filter(db.or_(*[c.ilike(like) for c in like_columns])), sort
+
+# List views (and their exports): model, search index, LIKE fallback columns, sort keys,
+# relationships the template touches (eager-loaded, see loading.py)
+LISTINGS = {
+    "customers": (
+        Customer, "customer",
+        (Customer.customer_id, Customer.name, Customer.phone, Customer.city),
+        [(Customer.id, True)],   # recently added first
+        ("stats",),              # c.stats.order_count / paid_amount / last_order_date
+    ),
+    "orders": (
+        Order, "order",
+        (Order.order_id, Order.customer_id, Order.saree_type, Order.payment_status, Order.delivery_status),
+        [(Order.date, True), (Order.id, True)],   # newest first by date then id
+        ("customer",),           # o.customer.name
+    ),
+    "followups": (
+        FollowUp, "follow_up",
+        (FollowUp.customer_id, FollowUp.notes, FollowUp.status),
+        [(FollowUp.followup_date, True), (FollowUp.id, True)],
+        ("customer",),
+    ),
+}
+
+# ?sort= on the customer list (without a search): walks a customer_stats index, best first
+CUSTOMER_SORTS = {
+    "spend": [(CustomerStats.paid_amount, True), (CustomerStats.customer_id, True)],
+    "recent": [(CustomerStats.last_order_date, True), (CustomerStats.customer_id, True)],
+}
+
+def customer_listing(q, order):
+    """(query, sort) for /customers: listing_query, or a customer_stats ordering for ?sort=."""
+    if q or order not in CUSTOMER_SORTS:
+        return listing_query("customers", q)
+    sort = CUSTOMER_SORTS[order]
+    query = (Customer.query.join(Customer.stats).options(contains_eager(Customer.stats))
+             .add_columns(*[col for col, _desc in sort]))   # keyset cursor values come from these
+    if app.config["RAISE_ON_LAZY_LOAD"]:
+        query = query.options(raiseload("*", sql_only=True))
+    return query, sort
+
+def listing_query(name, q, load=True):
+    """(query, sort) for a list view, filtered by the search box `q` (best match first)."""
+    model, base, like_columns, sort, related = LISTINGS[name]
+    query = model.query
+    if load:   # exports select plain columns, nothing to eager-load
+        query = eager(query, model, related, guard=app.config["RAISE_ON_LAZY_LOAD"])
+    return apply_search(query, base, q, like_columns, sort)
+
+def validate_order_form(form, is_update=False, known_customers=None, strict_dates=False):
+    """Server-side guardrails for order create/update (and bulk import rows).
+
+    known_customers: optional set of customer_ids to check against instead of querying.
+    strict_dates: an unparseable date is an error instead of today (imports must not re-date history).
+    """
     errors = []
 
     cust_id = (form.get("customer_id") or "").strip()
     if not cust_id:
         errors.append("Customer is required.")
+    elif known_customers is not None:
+        if cust_id not in known_customers:
+            errors.append(f"Customer {cust_id} not found.")
+    elif not db.session.query(Customer.id).filter_by(customer_id=cust_id).first():
+        # the form is a free-text typeahead now, so check the reference exists
+        errors.append(f"Customer {cust_id} not found.")
 
     amount_raw = (form.get("amount") or "").strip()
     try:
@@ -158,7 +445,11 @@ def validate_order_form(form, is_update=False):
     if delivery_status not in ("Pending", "Shipped", "Delivered", "Cancelled"):
         errors.append("Delivery Status must be one of Pending/Shipped/Delivered/Cancelled.")
 
-    dt = parse_date(form.get("date"))
+    try:
+        dt = parse_date(form.get("date"), strict=strict_dates)
+    except ValueError as e:
+        errors.append(str(e))
+        dt = None
 
     return {
         "customer_id": cust_id,
@@ -172,6 +463,38 @@ def validate_order_form(form, is_update=False):
         "remarks": (form.get("remarks") or "").strip(),
     }, errors
 
+# --- Stats cache & conditional GETs ---------------------------------------------
+# ETags change on deploy (templates/code) as well as on data changes
+APP_BUILD = build_token(BASE_DIR / "templates", Path(__file__))
+
+def data_versions(*tables):
+    """Write counters of `tables` (data_version); plain Core on a pooled connection, no ORM."""
+    with db.engine.connect() as conn:
+        return table_versions(conn, tables)
+
+def page_etag(versions, *extra):
+    """Strong ETag for this GET: build, endpoint, query args and the versions it depends on."""
+    return etag_for(APP_BUILD, request.endpoint, sorted(request.args.items(multi=True)), versions, *extra)
+
+def stats_version():
+    """(order, follow_up versions, day): dashboard/payments numbers change with these (month buckets daily).
+
+    Read on the report connection, so a lagging snapshot never caches old numbers under a new version."""
+    with read_router.connect() as conn:
+        return table_versions(conn, ("order", "follow_up")) + (date.today(),)
+
+def load_report_stats(today):
+    with read_router.connect() as conn:
+        return load_dashboard_stats(conn, today=today)
+
+def dashboard_stats(version):
+    """Cached DashboardStats for `version`; zeros if the DB is missing or the schema differs."""
+    try:
+        return cached(stats_cache, ("dashboard_stats",) + version, lambda: load_report_stats(version[-1]))
+    except Exception:
+        log.exception("Dashboard generation failed")
+        return DashboardStats()
+
 # --- Error pages ---------------------------------------------------------------
 @app.errorhandler(Exception)
 def on_any_error(e):
@@ -187,90 +510,31 @@ def root():
 # ...existing code...
 @app.route("/dashboard")
 def dashboard():
-    from datetime import date
-
-    try:
-        today = date.today()
-
-        # Totals
-        total_orders = db.session.query(db.func.count(Order.id)).scalar() or 0
-        total_paid = (
-            db.session.query(db.func.coalesce(db.func.sum(Order.amount), 0))
-            .filter(Order.payment_status == "Paid")
-            .scalar()
-            or 0
-        )
-        total_pending = (
-            db.session.query(db.func.coalesce(db.func.sum(Order.amount), 0))
-            .filter(Order.payment_status == "Pending")
-            .scalar()
-            or 0
+    version = stats_version()
+
+    def render():
+        stats = dashboard_stats(version)
+        log.debug(
+            "Dashboard context: total_orders=%s total_paid=%s total_pending=%s pending_followups=%s",
+            stats.total_orders,
+            stats.total_paid,
+            stats.total_pending,
+            stats.pending_followups,
         )
-        pending_followups = (
-            db.session.query(db.func.count(FollowUp.id))
-            .filter(FollowUp.status == "Open")
-            .scalar()
-            or 0
+        return render_template(
+            "dashboard.html",
+            business=APP_NAME,
+            total_orders=stats.total_orders,
+            total_paid=stats.total_paid,
+            total_pending=stats.total_pending,
+            pending_followups=stats.pending_followups,
+            orders_chart_labels=stats.month_labels,
+            orders_chart_data=stats.month_counts,
+            payment_mode_split=stats.mode_split,
         )
 
-        # Last 6 months labels & counts
-        labels = []
-        data_points = []
-        for i in range(5, -1, -1):
-            # compute year/month for (today - i months)
-            m = (today.month - i - 1) % 12 + 1
-            y = today.year + ((today.month - i - 1) // 12)
-            month_start = date(y, m, 1)
-            if m == 12:
-                next_month = date(y + 1, 1, 1)
-            else:
-                next_month = date(y, m + 1, 1)
-
-            cnt = (
-                db.session.query(db.func.count(Order.id))
-                .filter(Order.date >= month_start, Order.date < next_month)
-                .scalar()
-                or 0
-            )
-            labels.append(month_start.strftime("%b %Y"))
-            data_points.append(cnt)
-
-        # Payment mode split (Paid only)
-        mode_rows = (
-            db.session.query(Order.payment_mode, db.func.count(Order.id))
-            .filter(Order.payment_status == "Paid")
-            .group_by(Order.payment_mode)
-            .all()
-        )
-        payment_mode_split = {m or "Unknown": int(c) for (m, c) in mode_rows}
-
-    except Exception:
-        # Don't break page if DB missing or schema differs; show zeros
-        log.exception("Dashboard generation failed")
-        total_orders = total_paid = total_pending = pending_followups = 0
-        labels = []
-        data_points = []
-        payment_mode_split = {}
-
-    log.debug(
-        "Dashboard context: total_orders=%s total_paid=%s total_pending=%s pending_followups=%s",
-        total_orders,
-        total_paid,
-        total_pending,
-        pending_followups,
-    )
-
-    return render_template(
-        "dashboard.html",
-        business=APP_NAME,
-        total_orders=total_orders,
-        total_paid=total_paid,
-        total_pending=total_pending,
-        pending_followups=pending_followups,
-        orders_chart_labels=labels,
-        orders_chart_data=data_points,
-        payment_mode_split=payment_mode_split,
-    )
+    # unchanged since the client's copy -> 304 without touching the stats
+    return conditional_view(page_etag(version), render)
 # ...existing code...
 
 # --- Customers -----------------------------------------------------------------
@@ -302,26 +566,68 @@ def customers():
             flash("Error adding customer (maybe duplicate ID).", "danger")
         return redirect(url_for("customers"))
 
-    q = (request.args.get("q") or "").strip()
-    query = Customer.query
-    if q:
-        like = f"%{q}%"
-        query = query.filter(
-            db.or_(
-                Customer.customer_id.ilike(like),
-                Customer.name.ilike(like),
-                Customer.phone.ilike(like),
-                Customer.city.ilike(like),
-            )
-        )
-    # recently added first (id desc)
-    items = query.order_by(Customer.id.desc()).all()
-    return render_template("customers.html", business=APP_NAME, customers=items, q=q)
+    def render():
+        q = (request.args.get("q") or "").strip()
+        order = request.args.get("sort", "")
+        query, sort = customer_listing(q, order)
+        page = keyset_page(query, sort, request.args.get("cursor"), page_size())
+        return render_template("customers.html", business=APP_NAME, customers=page.items, page=page, q=q,
+                               sort=order if order in CUSTOMER_SORTS and not q else "")
+
+    # unchanged tables since the client's copy -> 304, no query at all
+    return conditional_view(page_etag(data_versions("customer", "order")), render)
 
 @app.route("/customers/new")
 def customer_form():
     return render_template("customer_form.html", business=APP_NAME)
 
+@app.route("/customers/edit/<int:customer_id>", methods=["GET", "POST"])
+def edit_customer(customer_id):
+    c = db.session.get(Customer, customer_id)
+    if not c:
+        flash("Customer not found.", "danger")
+        return redirect(url_for("customers"))
+
+    if request.method == "POST":
+        name = (request.form.get("name") or "").strip()
+        if not name:
+            flash("Name is required.", "danger")
+            return redirect(url_for("edit_customer", customer_id=customer_id))
+        # customer_id stays: orders and follow-ups point at it
+        c.name = name
+        for field in ("insta", "phone", "city", "ctype", "notes"):
+            if field in request.form:
+                setattr(c, field, (request.form.get(field) or "").strip())
+        try:
+            db.session.commit()
+            flash("Customer updated.", "success")
+        except Exception:
+            db.session.rollback()
+            log.exception("Update customer failed")
+            flash("Error updating customer.", "danger")
+        return redirect(url_for("customers"))
+
+    return render_template("customer_form.html", business=APP_NAME, customer=c)
+
+@app.route("/customers/delete/<int:customer_id>", methods=["POST"])
+def delete_customer(customer_id):
+    c = db.session.get(Customer, customer_id)
+    if not c:
+        flash("Customer not found.", "danger")
+    elif (Order.query.filter_by(customer_id=c.customer_id).first()
+          or FollowUp.query.filter_by(customer_id=c.customer_id).first()):
+        flash("Customer has orders or follow-ups; delete those first.", "danger")
+    else:
+        try:
+            db.session.delete(c)
+            db.session.commit()
+            flash("Customer deleted.", "success")
+        except Exception:
+            db.session.rollback()
+            log.exception("Delete customer failed")
+            flash("Error deleting customer.", "danger")
+    return redirect(url_for("customers"))
+
 # --- Orders --------------------------------------------------------------------
 @app.route("/orders", methods=["GET", "POST"])
 def orders():
@@ -358,30 +664,18 @@ def orders():
         return redirect(url_for("orders"))
 
     # GET
-    q = (request.args.get("q") or "").strip()
-    qry = Order.query
-    if q:
-        like = f"%{q}%"
-        qry = qry.filter(
-            db.or_(
-                Order.order_id.ilike(like),
-                Order.customer_id.ilike(like),
-                Order.saree_type.ilike(like),
-                Order.payment_status.ilike(like),
-                Order.delivery_status.ilike(like),
-            )
-        )
-    # newest first by date then id
-    orders_list = qry.order_by(Order.date.desc(), Order.id.desc()).all()
+    def render():
+        q = (request.args.get("q") or "").strip()
+        qry, sort = listing_query("orders", q)
+        page = keyset_page(qry, sort, request.args.get("cursor"), page_size())
+        return render_template("orders.html", business=APP_NAME, orders=page.items, page=page, q=q)
 
-    # For the order form dropdown: customers recent-first
-    customers = Customer.query.order_by(Customer.id.desc()).all()
-    return render_template("orders.html", business=APP_NAME, orders=orders_list, customers=customers, q=q)
+    return conditional_view(page_etag(data_versions("order", "customer")), render)
 
 @app.route("/orders/new")
 def order_form():
-    customers = Customer.query.order_by(Customer.id.desc()).all()
-    return render_template("order_form.html", business=APP_NAME, customers=customers)
+    # customer picker is an async typeahead (/api/customers/suggest)
+    return render_template("order_form.html", business=APP_NAME)
 
 @app.route("/orders/edit/<order_id>", methods=["GET", "POST"])
 def edit_order(order_id):
@@ -416,8 +710,23 @@ def edit_order(order_id):
 
         return redirect(url_for("orders"))
 
-    customers = Customer.query.order_by(Customer.id.desc()).all()
-    return render_template("order_form.html", business=APP_NAME, customers=customers, order=order)
+    return render_template("order_form.html", business=APP_NAME, order=order)
+
+@app.route("/orders/delete/<order_id>", methods=["POST"])
+def delete_order(order_id):
+    order = Order.query.filter_by(order_id=order_id).first()
+    if not order:
+        flash("Order not found.", "danger")
+        return redirect(url_for("orders"))
+    try:
+        db.session.delete(order)
+        db.session.commit()
+        flash("Order deleted.", "success")
+    except Exception:
+        db.session.rollback()
+        log.exception("Delete order failed")
+        flash("Error deleting order.", "danger")
+    return redirect(url_for("orders"))
 
 # --- Follow-ups ----------------------------------------------------------------
 @app.route("/followups", methods=["GET", "POST"])
@@ -443,61 +752,432 @@ def followups():
             flash("Error adding follow-up.", "danger")
         return redirect(url_for("followups"))
 
-    q = (request.args.get("q") or "").strip()
-    qry = FollowUp.query
-    if q:
-        like = f"%{q}%"
-        qry = qry.filter(
-            db.or_(
-                FollowUp.customer_id.ilike(like),
-                FollowUp.notes.ilike(like),
-                FollowUp.status.ilike(like),
-            )
-        )
-    items = qry.order_by(FollowUp.followup_date.desc(), FollowUp.id.desc()).all()
-    customers = Customer.query.order_by(Customer.id.desc()).all()
-    return render_template("followups.html", business=APP_NAME, followups=items, customers=customers, q=q)
+    def render():
+        q = (request.args.get("q") or "").strip()
+        qry, sort = listing_query("followups", q)
+        page = keyset_page(qry, sort, request.args.get("cursor"), page_size())
+        return render_template("followups.html", business=APP_NAME, followups=page.items, page=page, q=q)
+
+    return conditional_view(page_etag(data_versions("follow_up", "customer")), render)
+
+@app.route("/followups/new")
+def followup_form():
+    return render_template("followup_form.html", business=APP_NAME)
+
+@app.route("/followups/edit/<int:followup_id>", methods=["GET", "POST"])
+def edit_followup(followup_id):
+    f = db.session.get(FollowUp, followup_id)
+    if not f:
+        flash("Follow-up not found.", "danger")
+        return redirect(url_for("followups"))
+
+    if request.method == "POST":
+        c_id = (request.form.get("customer_id") or "").strip()
+        if not c_id:
+            flash("Customer is required.", "danger")
+            return redirect(url_for("edit_followup", followup_id=followup_id))
+        try:
+            f.customer_id = c_id
+            f.followup_date = parse_date(request.form.get("followup_date"))
+            f.notes = (request.form.get("notes") or "").strip()
+            f.status = (request.form.get("status") or "Open").strip()
+            db.session.commit()
+            flash("Follow-up updated.", "success")
+        except Exception:
+            db.session.rollback()
+            log.exception("Update followup failed")
+            flash("Error updating follow-up.", "danger")
+        return redirect(url_for("followups"))
+
+    return render_template("followup_form.html", business=APP_NAME, followup=f)
+
+@app.route("/followups/delete/<int:followup_id>", methods=["POST"])
+def delete_followup(followup_id):
+    f = db.session.get(FollowUp, followup_id)
+    if not f:
+        flash("Follow-up not found.", "danger")
+        return redirect(url_for("followups"))
+    try:
+        db.session.delete(f)
+        db.session.commit()
+        flash("Follow-up deleted.", "success")
+    except Exception:
+        db.session.rollback()
+        log.exception("Delete followup failed")
+        flash("Error deleting follow-up.", "danger")
+    return redirect(url_for("followups"))
 
 # --- Payments ------------------------------------------------------------------
 @app.route("/payments")
 def payments():
-    # Totals (all-time & current month)
-    today = date.today()
-    month_start = date(today.year, today.month, 1)
-
-    paid_total = db.session.query(db.func.coalesce(db.func.sum(Order.amount), 0))\
-        .filter(Order.payment_status == "Paid").scalar() or 0
-    pending_total = db.session.query(db.func.coalesce(db.func.sum(Order.amount), 0))\
-        .filter(Order.payment_status == "Pending").scalar() or 0
-
-    paid_month = db.session.query(db.func.coalesce(db.func.sum(Order.amount), 0))\
-        .filter(Order.payment_status == "Paid", Order.date >= month_start).scalar() or 0
-    pending_month = db.session.query(db.func.coalesce(db.func.sum(Order.amount), 0))\
-        .filter(Order.payment_status == "Pending", Order.date >= month_start).scalar() or 0
-
-    # Mode split (Paid only)
-    mode_rows = (
-        db.session.query(Order.payment_mode, db.func.count(Order.id))
-        .filter(Order.payment_status == "Paid", Order.payment_mode.in_(("UPI", "Cash")))
-        .group_by(Order.payment_mode)
-        .all()
-    )
-    mode_split = {m or "Unknown": c for (m, c) in mode_rows}
-
-    return render_template(
-        "payments.html",
-        business=APP_NAME,
-        paid_total=paid_total,
-        pending_total=pending_total,
-        paid_month=paid_month,
-        pending_month=pending_month,
-        mode_split=mode_split,
+    # Totals (all-time & current month) + mode split (Paid only); shares the dashboard's cache entry
+    version = stats_version()
+
+    def render():
+        stats = dashboard_stats(version)
+        return render_template(
+            "payments.html",
+            business=APP_NAME,
+            paid_total=stats.total_paid,
+            pending_total=stats.total_pending,
+            paid_month=stats.paid_month,
+            pending_month=stats.pending_month,
+            mode_split=stats.paid_mode_split(),
+        )
+
+    return conditional_view(page_etag(version), render)
+
+# --- Export --------------------------------------------------------------------
+def export_query(entity, q):
+    """(query, columns) behind an export: the list view's filter and order, plain columns."""
+    qry, sort = listing_query(entity, q, load=False)
+    qry = qry.order_by(*[(col.desc() if desc else col.asc()) for col, desc in sort])
+    return qry, list(LISTINGS[entity][0].__table__.columns)
+
+def export_filename(entity, fmt, gz):
+    return f"{entity}-{date.today():%Y%m%d}.{fmt}" + (".gz" if gz else "")
+
+@app.route("/export/<entity>.<fmt>")
+def export(entity, fmt):
+    """Stream customers/orders/followups as CSV or JSONL; ?q= filters like the list view, ?gzip=1.
+
+    ?background=1 queues the export for --worker instead and answers 202 + the job URL."""
+    if entity not in LISTINGS or fmt not in EXPORT_FORMATS:
+        # (plain tuple: the catch-all error handler would turn abort(404) into a 500)
+        return ("Not Found", 404)
+    q = (request.args.get("q") or "").strip()
+    gz = request.args.get("gzip") == "1"
+
+    if request.args.get("background") == "1":
+        return queue_job("export", {"entity": entity, "fmt": fmt, "q": q, "gzip": gz})
+
+    qry, columns = export_query(entity, q)
+    return Response(
+        stream_with_context(export_stream(qry, columns, fmt, gz)),
+        mimetype="application/gzip" if gz else EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(entity, fmt, gz)}"'},
     )
 
-# --- Reports & Settings (basic placeholders that use your templates) -----------
+# --- Import --------------------------------------------------------------------
+def run_import(entity, textfile):
+    """Bulk-load a customers/orders CSV; returns an ImportReport."""
+    if entity == "customers":
+        report = import_customers(db.engine, Customer, textfile)
+        customer_index.invalidate()   # Core inserts don't fire the ORM hooks
+    else:
+        report = import_orders(db.engine, Order, Customer, textfile,
+                               lambda row, **kw: validate_order_form(row, strict_dates=True, **kw))
+    log.info("Import %s", report.summary())
+    return report
+
+@app.route("/import", methods=["GET", "POST"])
+def import_data():
+    report = None
+    if request.method == "POST":
+        entity = request.form.get("entity")
+        upload = request.files.get("file")
+        if entity not in ("customers", "orders") or not upload or not upload.filename:
+            flash("Choose what to import and a CSV file.", "danger")
+            return redirect(url_for("import_data"))
+        if request.form.get("background"):
+            # park the upload on disk; --worker picks it up
+            path = app.config["JOBS_DIR"] / f"upload-{os.urandom(8).hex()}.csv"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            upload.save(path)
+            with db.engine.begin() as conn:
+                job_id = enqueue(conn, "import", {"entity": entity, "path": path.name}, max_attempts=1)
+            flash(f"Import queued as job #{job_id}.", "success")
+            return render_template("import.html", business=APP_NAME, job_id=job_id)
+        try:
+            report = run_import(entity, io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline=""))
+            flash(report.summary(), "success" if not report.error_rows else "warning")
+        except Exception:
+            log.exception("Import failed")
+            flash("Import failed (is it a UTF-8 CSV with a header row?).", "danger")
+    return render_template("import.html", business=APP_NAME, report=report)
+
+# --- Backup & restore ----------------------------------------------------------
+backup_store = BackupStore(app.config["BACKUP_DIR"], keep=app.config["BACKUP_KEEP"],
+                           keep_safety=app.config["BACKUP_KEEP_PRE_RESTORE"])
+page_store = PageStore(app.config["PAGE_STORE_DIR"], chunk_size=app.config["PAGE_STORE_CHUNK"],
+                       keep=app.config["PAGE_STORE_KEEP"], daily=app.config["PAGE_STORE_DAILY"])
+
+def restore_database(path):
+    """Copy the checked DB at `path` over the live one (after a "pre-restore" backup) and reset state.
+
+    Returns the pre-restore backup's catalog entry; raises BackupError for a bad file."""
+    versions = data_versions(*VERSIONED_TABLES)
+    safety = backup_store.restore(DB_PATH, path)
+    # pooled connections may hold pages / schema of the old file
+    db.session.remove()
+    db.engine.dispose()
+    read_router.reset()
+    ensure_runtime_tables()
+    # counters must move past both histories, or old ETags / cache keys would match restored data
+    with db.engine.begin() as conn:
+        restored = table_versions(conn, VERSIONED_TABLES)
+        for tbl, before, after in zip(VERSIONED_TABLES, versions, restored):
+            conn.execute(db.text("UPDATE data_version SET version = :v WHERE tbl = :t"),
+                         {"v": max(before, after) + 1, "t": tbl})
+    customer_index.invalidate()
+    log.info("Database restored from %s (previous data in %s)", path, safety["file"])
+    return safety
+
+@app.route("/backup")
+def backup():
+    backups = [{"filename": b["file"], "date": datetime.fromtimestamp(b["created"]).strftime("%d %b %Y %H:%M"),
+                "reason": b["reason"], "bytes": b["bytes"], "pruned": bool(b.get("pruned"))}
+               for b in backup_store.entries()]
+    download_job = None
+    if session.get("download_job"):
+        with db.engine.connect() as conn:
+            download_job = get_job(conn, session["download_job"])
+    return render_template("backup.html", business=APP_NAME, backups=backups, download_job=download_job)
+
+@app.route("/backup/download", methods=["POST"])
+def download_db():
+    """Take an online backup now and send it (.db.gz); not catalogued, so it never rotates a kept one out.
+
+    Above BACKUP_INLINE_MAX_MB the dump runs in the job worker instead and /backup links the file."""
+    if DB_PATH.stat().st_size > app.config["BACKUP_INLINE_MAX_MB"] * 1048576:
+        with db.engine.begin() as conn:
+            job_id = enqueue(conn, "backup", {"download": True})
+        session["download_job"] = job_id
+        flash(f"The database download is being prepared in the background (job {job_id}).", "info")
+        return redirect(url_for("backup"))
+    path = backup_store.dump(DB_PATH)
+    fh = open(path, "rb")
+    path.unlink()   # the open handle keeps the data until send_file closes it
+    return send_file(fh, mimetype="application/gzip", as_attachment=True,
+                     download_name=f"{DB_PATH.stem}-{datetime.now():%Y%m%d-%H%M%S}.db.gz")
+
+@app.route("/backup/<name>")
+def backup_file(name):
+    path = backup_store.path(name)
+    if path is None:
+        return ("Not Found", 404)
+    return send_from_directory(backup_store.dir, path.name, as_attachment=True)
+
+@app.route("/backup/restore", methods=["POST"])
+def restore_db():
+    upload = request.files.get("dbfile")
+    if not upload or not upload.filename:
+        flash("Choose a .db or .db.gz backup file.", "danger")
+        return redirect(url_for("backup"))
+    backup_store.dir.mkdir(parents=True, exist_ok=True)
+    path = backup_store.dir / f"upload-{os.urandom(8).hex()}.db"
+    try:
+        save_upload(upload.stream, path)
+        safety = restore_database(path)
+        flash(f"Database restored. The previous data was saved as {safety['file']}.", "success")
+    except (BackupError, OSError, EOFError) as e:
+        log.warning("Restore rejected: %s", e)
+        flash(f"Restore failed: {e}", "danger")
+    finally:
+        path.unlink(missing_ok=True)
+    return redirect(url_for("backup"))
+
+# --- Background jobs -----------------------------------------------------------
+def job_export(payload, job_id):
+    """Write an export to JOBS_DIR; /jobs/<id>/download serves it."""
+    entity, fmt, gz = payload["entity"], payload["fmt"], payload.get("gzip", False)
+    qry, columns = export_query(entity, payload.get("q", ""))
+    name = f"{job_id}-{export_filename(entity, fmt, gz)}"
+    path = app.config["JOBS_DIR"] / name
+    size = 0
+    try:
+        with open(path, "wb") as fh:
+            for chunk in export_stream(qry, columns, fmt, gz):
+                fh.write(chunk)
+                size += len(chunk)
+    except Exception:
+        path.unlink(missing_ok=True)   # no half-written file left behind for a retry
+        raise
+    return {"file": name, "bytes": size}
+
+def job_import(payload, job_id):
+    path = app.config["JOBS_DIR"] / Path(payload["path"]).name
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as fh:
+            report = run_import(payload["entity"], fh)
+    finally:
+        path.unlink(missing_ok=True)
+    return {"summary": report.summary(), "rows": report.rows, "inserted": report.inserted,
+            "error_rows": report.error_rows, "errors": report.errors[:100]}
+
+def job_rebuild_aggregates(payload, job_id):
+    rebuild_aggregates(db.engine)
+    return {"rebuilt": ["order_summary", "order_daily", "followup_summary"]}
+
+def job_rebuild_search(payload, job_id):
+    return {"indexed": ensure_search_index(db.engine, rebuild=True)}
+
+def job_reconcile_customer_stats(payload, job_id):
+    return reconcile_customer_stats(db.engine, fix=payload.get("fix", True))
+
+def job_segment_customers(payload, job_id):
+    return run_segmentation(db.engine, full=payload.get("full", False),
+                            full_every_days=app.config["RFM_FULL_EVERY_DAYS"])
+
+def job_backup(payload, job_id):
+    """Catalogued backup; the result names it under "backup" (served by /backup/<name>, not JOBS_DIR).
+
+    payload {"download": True} (a large "Download DB") writes an uncatalogued dump to JOBS_DIR instead."""
+    if payload.get("download"):
+        name = f"{job_id}-{DB_PATH.stem}-{datetime.now():%Y%m%d-%H%M%S}.db.gz"
+        path = app.config["JOBS_DIR"] / name
+        try:
+            stats = write_backup(DB_PATH, path, backup_store.pages, backup_store.sleep)
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+        return {"file": name, "bytes": stats["bytes"], "db_bytes": stats["db_bytes"]}
+    entry = backup_store.create(DB_PATH, reason="job")
+    return {"backup": entry["file"], "bytes": entry["bytes"], "seconds": entry["seconds"]}
+
+def job_snapshot(payload, job_id):
+    manifest = page_store.snapshot(DB_PATH, reason="job")
+    return {k: manifest[k] for k in ("id", "size", "new_objects", "new_bytes", "seconds")}
+
+JOB_HANDLERS = {
+    "export": job_export,
+    "import": job_import,
+    "rebuild_aggregates": job_rebuild_aggregates,
+    "rebuild_search": job_rebuild_search,
+    "reconcile_customer_stats": job_reconcile_customer_stats,
+    "segment_customers": job_segment_customers,
+    "backup": job_backup,
+    "snapshot": job_snapshot,
+}
+# kinds POST /jobs may queue (export / import have their own entry points)
+MAINTENANCE_JOBS = (
+    "rebuild_aggregates", "rebuild_search", "reconcile_customer_stats", "segment_customers", "backup", "snapshot",
+)
+
+def queue_job(kind, payload, max_attempts=3):
+    """Enqueue and answer 202 with the job's status URL."""
+    with db.engine.begin() as conn:
+        job_id = enqueue(conn, kind, payload, max_attempts=max_attempts)
+    status_url = url_for("job_status", job_id=job_id)
+    return jsonify({"job": job_id, "status": "queued", "status_url": status_url}), 202, {"Location": status_url}
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    """Queue maintenance work: kind=<one of MAINTENANCE_JOBS>, full=1 for a full segmentation run."""
+    body = request.get_json(silent=True) or request.form
+    kind = body.get("kind")
+    if kind not in MAINTENANCE_JOBS:
+        return jsonify({"error": "unknown job kind"}), 400
+    return queue_job(kind, {"full": True} if str(body.get("full", "")) in ("1", "true", "True") else {})
+
+@app.route("/jobs/<int:job_id>")
+def job_status(job_id):
+    with db.engine.connect() as conn:
+        job = get_job(conn, job_id)
+    if job is None:
+        return jsonify({"error": "no such job"}), 404
+    result = job["result"] if job["status"] == "done" and isinstance(job["result"], dict) else {}
+    if result.get("file"):
+        job["download_url"] = url_for("job_download", job_id=job_id)
+    elif result.get("backup"):
+        job["download_url"] = url_for("backup_file", name=result["backup"])
+    return jsonify(job)
+
+@app.route("/jobs/<int:job_id>/download")
+def job_download(job_id):
+    with db.engine.connect() as conn:
+        job = get_job(conn, job_id)
+    name = (job or {}).get("result", {}) and job["result"].get("file")
+    if not name or not (app.config["JOBS_DIR"] / name).exists():
+        return ("Not Found", 404)
+    return send_from_directory(app.config["JOBS_DIR"], name, as_attachment=True,
+                               download_name=name.split("-", 1)[1])
+
+def run_worker(once=False):
+    """--worker: run queued jobs, each in its own app context (fresh session per job)."""
+    def in_context(fn):
+        def run(payload, job_id):
+            with app.app_context():
+                return fn(payload, job_id)
+        return run
+
+    worker = JobWorker(db.engine, {k: in_context(fn) for k, fn in JOB_HANDLERS.items()},
+                       app.config["JOBS_DIR"], poll=app.config["JOB_POLL_SECONDS"])
+    log.info("Job worker %s polling every %ss", worker.me, worker.poll)
+    worker.run(once=once)
+
+# --- API -----------------------------------------------------------------------
+@app.route("/api/customers/suggest")
+def customer_suggest():
+    """Typeahead: ?q=<prefix of name / phone / customer ID / insta>&limit=10"""
+    try:
+        limit = max(1, min(int(request.args.get("limit") or 10), 50))
+    except ValueError:
+        limit = 10
+    return conditional_view(page_etag(data_versions("customer")),
+                            lambda: jsonify(customer_index.suggest(request.args.get("q"), limit)))
+
+# --- Reports -------------------------------------------------------------------
+def report_filters():
+    """(from, to, customer_id) from the query string; a blank field is no bound.
+
+    An unparseable date raises ValueError rather than quietly becoming today."""
+    start = parse_date(request.args["from"], strict=True) if request.args.get("from") else None
+    end = parse_date(request.args["to"], strict=True) if request.args.get("to") else None
+    return start, end, (request.args.get("customer_id") or "").strip() or None
+
 @app.route("/reports")
 def reports():
-    return render_template("reports.html", business=APP_NAME)
+    """Totals from the order_daily rollup + keyset-paged orders, all on the report connection."""
+    try:
+        start, end, customer_id = report_filters()
+    except ValueError as e:
+        return (str(e), 400)
+    with read_router.connect() as conn:
+        versions = table_versions(conn, ("order", "customer"))
+
+    def render():
+        with read_router.connect() as conn, Session(bind=conn) as session:
+            totals = order_range_totals(conn, start, end, customer_id)
+            qry = eager(session.query(Order), Order, ("customer",), guard=app.config["RAISE_ON_LAZY_LOAD"])
+            if start:
+                qry = qry.filter(Order.date >= start)
+            if end:
+                qry = qry.filter(Order.date <= end)
+            if customer_id:
+                qry = qry.filter(Order.customer_id == customer_id)
+            page = keyset_page(qry, LISTINGS["orders"][3], request.args.get("cursor"), page_size())
+        return render_template(
+            "reports.html",
+            business=APP_NAME,
+            total_orders=sum(n for n, _amount in totals.values()),
+            total_paid=totals.get("Paid", (0, 0))[1],
+            total_pending=totals.get("Pending", (0, 0))[1],
+            orders=page.items,
+            page=page,
+        )
+
+    return conditional_view(page_etag(versions), render)
+
+# --- Query plans (--explain) ---------------------------------------------------
+EXPLAIN_URLS = [
+    "/dashboard", "/payments", "/reports", "/_status",
+    "/orders", "/orders?q=silk", "/customers", "/customers?q=a", "/customers?sort=spend",
+    "/followups", "/followups?q=call", "/api/customers/suggest?q=a",
+]
+
+def explain(urls=EXPLAIN_URLS, out=print):
+    """EXPLAIN QUERY PLAN per route. Report reads go to the primary meanwhile (same file, same plans)
+    so the listener sees them, and the stats cache starts empty so dashboard/payments really query."""
+    global stats_cache
+    mode, cache = read_router.mode, stats_cache
+    read_router.mode, stats_cache = "off", make_cache("memory")
+    try:
+        explain_routes(app, db.engine, urls, out=out)
+    finally:
+        read_router.mode, stats_cache = mode, cache
+
+# --- Settings (basic placeholder that uses your template) ----------------------
 
 @app.route("/settings", methods=["GET", "POST"])
 def settings():
@@ -509,19 +1189,29 @@ def settings():
 @app.route("/_status")
 def _status():
     try:
-        customers_count = db.session.query(db.func.count(Customer.id)).scalar() or 0
-        orders_count = db.session.query(db.func.count(Order.id)).scalar() or 0
-        followups_count = db.session.query(db.func.count(FollowUp.id)).scalar() or 0
+        # cached (CRM_METRICS_GAUGE_TTL): health probes must not scan tables
+        gauges = prom.gauges()
         return jsonify({
             "ok": True,
-            "customers": int(customers_count),
-            "orders": int(orders_count),
-            "followups": int(followups_count),
+            "customers": int(gauges["crm_customers"][1]),
+            "orders": int(gauges["crm_orders"][1]),
+            "followups": int(gauges["crm_followups"][1]),
+            "reads": read_router.status(),
         })
     except Exception:
         log.exception("Status check failed")
         return jsonify({"ok": False, "error": "status check failed"}), 500
 
+@app.route("/metrics")
+def metrics():
+    # Prometheus scrape target; sums every Gunicorn worker's counters (see prom_metrics.py)
+    return Response(prom.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route("/_metrics")
+def _metrics():
+    # Rolling per-endpoint request/SQL stats for this worker process
+    return jsonify(request_metrics.snapshot())
+
 # ...existing code...
 
 # --- App init ------------------------------------------------------------------
@@ -531,11 +1221,141 @@ if __name__ == "__main__":
     # Check for an initialization flag (used by systemd)
     is_init_mode = "--init" in sys.argv
 
+    if "--rebuild-aggregates" in sys.argv:
+        # Recompute order_summary / order_daily / followup_summary from scratch (after bulk loads / raw SQL)
+        log.info("Rebuilding KPI summary tables...")
+        with app.app_context():
+            rebuild_aggregates(db.engine)
+        log.info("Summary tables rebuilt. Exiting...")
+        sys.exit(0)
+
+    for flag, entity in (("--import-customers", "customers"), ("--import-orders", "orders")):
+        if flag in sys.argv:
+            # python saree_crm_flask_app.py --import-orders path/to/orders.csv
+            path = sys.argv[sys.argv.index(flag) + 1]
+            with app.app_context(), open(path, encoding="utf-8-sig", newline="") as fh:
+                report = run_import(entity, fh)
+            for line, msg in report.errors:
+                log.warning("line %s: %s", line, msg)
+            sys.exit(0 if not report.error_rows else 1)
+
+    if "--explain" in sys.argv:
+        # Print EXPLAIN QUERY PLAN for the queries behind each GET route
+        with app.app_context():
+            explain()
+        sys.exit(0)
+
+    if "--reconcile-customer-stats" in sys.argv:
+        # Verify customer_stats against a full recount and repair drift (--check-only: report only)
+        with app.app_context():
+            result = reconcile_customer_stats(db.engine, fix="--check-only" not in sys.argv)
+        log.info("customer_stats: %s", result)
+        sys.exit(0 if not (result["drifted"] or result["orphans"]) or result["fixed"] else 1)
+
+    if "--segment-customers" in sys.argv:
+        # RFM scores -> Customer.ctype for customers with new orders (--full: everyone, new quintiles)
+        with app.app_context():
+            if not ensure_segment_tables(db.engine):
+                log.error("customer_stats missing; run --init first")
+                sys.exit(1)
+            log.info("Segmentation: %s", run_segmentation(db.engine, full="--full" in sys.argv,
+                                                          full_every_days=app.config["RFM_FULL_EVERY_DAYS"]))
+        sys.exit(0)
+
+    if "--refresh-snapshot" in sys.argv:
+        # Rebuild the read snapshot now (CRM_READ_ROUTING=snapshot), e.g. from cron after a bulk load
+        if read_router.refresh_snapshot(force=True):
+            sys.exit(0)
+        log.error("Snapshot refresh failed or already running")
+        sys.exit(1)
+
+    if "--backup" in sys.argv:
+        # Online backup into BACKUP_DIR (cron / systemd timer); safe while the app is serving
+        entry = backup_store.create(DB_PATH, reason="cli")
+        log.info("Backup %s: %s bytes (%s pages, %s restarts) in %ss",
+                 entry["file"], entry["bytes"], entry["pages"], entry["restarts"], entry["seconds"])
+        sys.exit(0)
+
+    if "--restore" in sys.argv:
+        # python saree_crm_flask_app.py --restore path/to/backup.db[.gz]  (previous data is backed up first)
+        src = Path(sys.argv[sys.argv.index("--restore") + 1])
+        tmp = backup_store.dir / f"upload-{os.urandom(8).hex()}.db"
+        backup_store.dir.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(src, "rb") as fh:
+                save_upload(fh, tmp)
+            with app.app_context():
+                restore_database(tmp)
+        except BackupError as e:
+            log.error("Restore rejected: %s", e)
+            sys.exit(1)
+        finally:
+            tmp.unlink(missing_ok=True)
+        sys.exit(0)
+
+    if "--snapshot" in sys.argv:
+        # Deduplicated snapshot into PAGE_STORE_DIR (cron every few minutes); costs only the changed chunks
+        snap = page_store.snapshot(DB_PATH, reason="cli")
+        log.info("Snapshot %s: %s bytes, %s new objects (%s bytes stored) in %ss",
+                 snap["id"], snap["size"], snap["new_objects"], snap["new_bytes"], snap["seconds"])
+        sys.exit(0)
+
+    if "--verify-snapshots" in sys.argv:
+        # Re-hash every stored chunk; exit 1 if any snapshot can't be rebuilt
+        result = page_store.verify()
+        log.info("Snapshot store: %s", result)
+        sys.exit(1 if result["damaged"] else 0)
+
+    if "--prune-snapshots" in sys.argv:
+        # Apply PAGE_STORE_KEEP / PAGE_STORE_DAILY and delete chunks no snapshot uses anymore
+        log.info("Snapshot prune: %s", page_store.prune())
+        sys.exit(0)
+
+    if "--export-snapshot" in sys.argv:
+        # python saree_crm_flask_app.py --export-snapshot <id> out.db  (then --restore out.db to go live)
+        i = sys.argv.index("--export-snapshot")
+        try:
+            page_store.restore(sys.argv[i + 1], sys.argv[i + 2])
+        except StoreError as e:
+            log.error("Snapshot export failed: %s", e)
+            sys.exit(1)
+        sys.exit(0)
+
+    if "--worker" in sys.argv:
+        # Background job worker (exports / imports / rebuilds queued by the web app)
+        with app.app_context():
+            run_worker(once="--once" in sys.argv)
+        sys.exit(0)
+
+    if "--reminders" in sys.argv:
+        # Reminder scheduler in its own process (systemd unit / cron with --once)
+        if not reminders_ready:
+            log.error("follow_up lacks customer_id/followup_date/status/notes; run with --init")
+            sys.exit(1)
+        log.info("Reminder scheduler running as %s (every %ss)", reminder_scheduler.holder, reminder_scheduler.interval)
+        reminder_scheduler.run(once="--once" in sys.argv)
+        sys.exit(0)
+
+    if "--rebuild-search" in sys.argv:
+        # (Re)create the FTS5 tables/triggers and re-index every row (existing databases)
+        log.info("Rebuilding full-text search index...")
+        with app.app_context():
+            indexed = ensure_search_index(db.engine, rebuild=True)
+        log.info("Search index rebuilt for %s. Exiting...", ", ".join(indexed) or "nothing")
+        sys.exit(0)
+
     if is_init_mode:
         # 1. Run initialization tasks
         log.info("Running database initialization (INIT MODE)...")
         with app.app_context():
             db.create_all()
+            # create_all() never adds indexes to tables that already exist
+            created = ensure_indexes(db.engine, db.metadata)
+            if created:
+                log.info("Created indexes: %s", ", ".join(created))
+            ensure_runtime_tables()
+            # workers start with fresh counters; old dumps would be summed forever
+            clear_registry(app.config["METRICS_DIR"])
             
             # Since the database is new, we should try the seed again
             try:
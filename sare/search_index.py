@@ -0,0 +1,108 @@
+# SQLite FTS5 search over customers, orders and follow-ups.
+# Notes:
+# - External-content FTS5 tables (customer_fts, order_fts, followup_fts) mirror the base tables
+#   and are kept in sync by AFTER INSERT/UPDATE/DELETE triggers, so every writer (ORM, raw SQL,
+#   seed scripts) keeps them current
+# - Queries are prefix matches per word ("silk ban" -> "silk"* AND "ban"*) ranked by bm25()
+# - If FTS5 is missing or a base table lacks the columns (old DB), that entity falls back to
+#   the LIKE search in the views; see search_enabled()
+
+import logging
+import re
+from dataclasses import dataclass
+
+from sqlalchemy import column, false, func, inspect, literal_column, select, table, text
+
+log = logging.getLogger("crm")
+
+
+@dataclass(frozen=True)
+class FtsIndex:
+    name: str           # FTS5 table
+    base: str           # content table
+    columns: tuple
+    weights: tuple      # bm25 column weights (same order as columns)
+
+    def ddl(self):
+        q = f'"{self.base}"'
+        cols = ", ".join(self.columns)
+        new = ", ".join(f"new.{c}" for c in self.columns)
+        old = ", ".join(f"old.{c}" for c in self.columns)
+        return (
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5(
+                    {cols}, content={q}, content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+            f"""CREATE TRIGGER IF NOT EXISTS {self.name}_ai AFTER INSERT ON {q} BEGIN
+                    INSERT INTO {self.name} (rowid, {cols}) VALUES (new.id, {new});
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {self.name}_ad AFTER DELETE ON {q} BEGIN
+                    INSERT INTO {self.name} ({self.name}, rowid, {cols}) VALUES ('delete', old.id, {old});
+                END""",
+            # only re-index when an indexed column changes (status edits stay cheap)
+            f"""CREATE TRIGGER IF NOT EXISTS {self.name}_au AFTER UPDATE OF {cols} ON {q} BEGIN
+                    INSERT INTO {self.name} ({self.name}, rowid, {cols}) VALUES ('delete', old.id, {old});
+                    INSERT INTO {self.name} (rowid, {cols}) VALUES (new.id, {new});
+                END""",
+        )
+
+
+INDEXES = {
+    "customer": FtsIndex("customer_fts", "customer",
+                         ("customer_id", "name", "phone", "city", "insta", "notes"),
+                         (4.0, 3.0, 4.0, 1.0, 2.0, 0.5)),
+    "order": FtsIndex("order_fts", "order",
+                      ("order_id", "customer_id", "saree_type", "remarks"),
+                      (4.0, 2.0, 2.0, 0.5)),
+    "follow_up": FtsIndex("followup_fts", "follow_up", ("notes",), (1.0,)),
+}
+
+_enabled = set()
+
+
+def search_enabled(base):
+    return base in _enabled
+
+
+def ensure_search_index(engine, rebuild=False):
+    """Create FTS tables/triggers where the base table supports them; backfill new ones."""
+    insp = inspect(engine)
+    _enabled.clear()
+    for base, idx in INDEXES.items():
+        if not insp.has_table(base):
+            continue
+        have = {c["name"] for c in insp.get_columns(base)}
+        if not set(idx.columns) <= have:
+            log.warning("Search index %s skipped: %s lacks %s", idx.name, base, set(idx.columns) - have)
+            continue
+        is_new = not insp.has_table(idx.name)
+        try:
+            with engine.begin() as conn:
+                for ddl in idx.ddl():
+                    conn.execute(text(ddl))
+                if is_new or rebuild:
+                    conn.execute(text(f"INSERT INTO {idx.name} ({idx.name}) VALUES ('rebuild')"))
+        except Exception:
+            log.exception("Search index %s unavailable (no FTS5?)", idx.name)
+            continue
+        _enabled.add(base)
+    return sorted(_enabled)
+
+
+def match_query(q):
+    """User text -> FTS5 MATCH expression of quoted prefix terms, or None if nothing searchable."""
+    terms = re.findall(r"\w+", q or "", re.UNICODE)
+    return " ".join(f'"{t}"*' for t in terms) or None
+
+
+def search_subquery(base, q):
+    """Subquery of (rowid, rank) for matches in `base`, rank = bm25 (lower is better)."""
+    idx = INDEXES[base]
+    fts = table(idx.name, column("rowid"))
+    ref = literal_column(idx.name)
+    expr = match_query(q)
+    return (
+        select(fts.c.rowid.label("rowid"), func.bm25(ref, *idx.weights).label("rank"))
+        .select_from(fts)
+        .where(ref.op("MATCH")(expr) if expr else false())
+        .subquery(f"{idx.name}_hits")
+    )
@@ -1,15 +1,12 @@
 import random, string, datetime
 from saree_crm_flask_app import app, db, Customer, Order
+from id_sequences import allocate
 
 def has_col(model, name): return name in model.__table__.columns
 def unique_customer_code(prefix="CUST"):
-    # generate CUST000001, CUST000002, ... until free
-    n = 1
-    while True:
-        code = f"{prefix}{n:06d}"
-        if not Customer.query.filter_by(customer_id=code).first():
-            return code
-        n += 1
+    # CUST000001, CUST000002, ... from the shared id_sequence (one PK update, no probing)
+    n = allocate(db.session, prefix, "", Customer.customer_id, sep="")
+    return f"{prefix}{n:06d}"
 
 def rand_name():
     first = ["Anita","Bhavya","Charu","Divya","Eesha","Farah","Gita","Hema","Ishita","Jaya","Kajal",
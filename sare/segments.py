@@ -0,0 +1,203 @@
+# RFM segmentation: sets Customer.ctype from recency / frequency / monetary scores.
+# Notes:
+# - Inputs come from customer_stats (last_order_date, order_count, paid_amount), which already is
+#   the per-customer GROUP BY of "order": one narrow indexed read instead of scanning orders
+# - Each measure is scored 1..5 by quintile (5 = most recent / most orders / most spent); NumPy
+#   bins whole columns at once when installed, the stdlib path (bisect) gives the same scores
+# - Scores map to VIP / Loyal / New / At Risk / Lost / Regular through a 250-entry lookup table
+#   built from segment_for(), so the rules live in one readable function
+# - Writes go through a temp table and one UPDATE ... FROM touching only customers whose segment
+#   changed; each change is appended to customer_segment_history (old -> new, with the scores)
+# - A full run recomputes the quintile edges for everyone and stores them (rfm_run); an
+#   incremental run rescores only customers with orders newer than the last run's watermark,
+#   using those stored edges. Recency drifts for untouched customers, so schedule full runs too
+# - Customers without orders keep whatever ctype was typed by hand, and so do trade accounts
+#   (KEEP: Wholesale / Supplier are relationships, not purchase tiers); so do customers whose
+#   orders carry no readable date (legacy rows), which cannot be scored on recency
+
+import json
+import time
+from bisect import bisect_left
+from datetime import date
+from statistics import quantiles
+
+from sqlalchemy import bindparam, inspect, text
+
+try:
+    import numpy as np
+except ImportError:   # optional; same scores, just slower
+    np = None
+
+SEGMENTS = ("VIP", "Loyal", "New", "At Risk", "Lost", "Regular")
+KEEP = ("Wholesale", "Supplier")
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS rfm_run (
+        id INTEGER PRIMARY KEY,
+        mode TEXT NOT NULL,                 -- full / incremental
+        as_of TEXT NOT NULL,
+        max_order_id INTEGER NOT NULL,      -- watermark for the next incremental run
+        edges TEXT NOT NULL,                -- {"r": [...], "f": [...], "m": [...]} quintile edges
+        scored INTEGER NOT NULL,
+        changed INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        created REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS customer_segment_history (
+        id INTEGER PRIMARY KEY,
+        customer_id VARCHAR(64) NOT NULL,
+        run_id INTEGER NOT NULL,
+        old_segment TEXT,
+        new_segment TEXT NOT NULL,
+        r INTEGER NOT NULL, f INTEGER NOT NULL, m INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_customer_segment_history_customer_id "
+    "ON customer_segment_history (customer_id, run_id)",
+]
+
+ALL = text("""
+    SELECT customer_id, last_order_date, order_count, paid_amount
+    FROM customer_stats WHERE order_count > 0 AND last_order_date != ''
+""")
+# customers with orders past the watermark (rowid range scan, then the customer_stats PK)
+SINCE = text("""
+    SELECT s.customer_id, s.last_order_date, s.order_count, s.paid_amount
+    FROM customer_stats AS s
+    WHERE s.order_count > 0 AND s.last_order_date != ''
+      AND s.customer_id IN (SELECT customer_id FROM "order" WHERE id > :after)
+""")
+
+
+def segment_for(r, f, m, single):
+    """Segment for scores r/f/m (1..5); `single` = exactly one order."""
+    if r >= 4 and f >= 4 and m >= 4:
+        return "VIP"
+    if single and r >= 4:
+        return "New"
+    if r >= 3 and f >= 4:
+        return "Loyal"
+    if r == 1:
+        return "Lost"
+    if r <= 2 and (f >= 3 or m >= 4):
+        return "At Risk"
+    return "Regular"
+
+
+# index = 125 * single + 25 * (r - 1) + 5 * (f - 1) + (m - 1)
+LOOKUP = [segment_for(r, f, m, single) for single in (False, True)
+          for r in range(1, 6) for f in range(1, 6) for m in range(1, 6)]
+
+
+def ensure_segment_tables(engine):
+    """Create the RFM tables; False when customer_stats (the input) is missing."""
+    if not inspect(engine).has_table("customer_stats"):
+        return False
+    with engine.begin() as conn:
+        for ddl in SCHEMA:
+            conn.execute(text(ddl))
+    return True
+
+
+# --- Scoring -----------------------------------------------------------------------
+def quintile_edges(values):
+    """The 4 cut points between quintiles (all equal to the value for a constant column)."""
+    if np is not None:
+        return [float(x) for x in np.quantile(np.asarray(values, dtype=float), [0.2, 0.4, 0.6, 0.8])]
+    if len(values) < 2:
+        return [float(values[0]) if values else 0.0] * 4
+    return [float(x) for x in quantiles(values, n=5, method="inclusive")]
+
+
+def score(values, edges):
+    """1..5 per value: 1 + number of edges strictly below it."""
+    if np is not None:
+        return 1 + np.searchsorted(np.asarray(edges), np.asarray(values, dtype=float), side="left")
+    return [1 + bisect_left(edges, v) for v in values]
+
+
+def classify(rows, edges=None):
+    """rows of (customer_id, last_order_date, order_count, paid_amount) -> (results, edges).
+
+    results: [(customer_id, segment, r, f, m)]; edges are computed from `rows` unless given."""
+    dated = []
+    for cid, last, count, paid in rows:
+        try:
+            dated.append((cid, date.fromisoformat(last[:10]).toordinal(), count, paid))   # later = higher
+        except (TypeError, ValueError):
+            continue   # legacy order with no / a garbled date: cannot be scored on recency
+    if not dated:
+        return [], edges
+    ids, recency, count, paid = zip(*dated)
+    if edges is None:
+        edges = {"r": quintile_edges(recency), "f": quintile_edges(count), "m": quintile_edges(paid)}
+    r, f, m = score(recency, edges["r"]), score(count, edges["f"]), score(paid, edges["m"])
+    if np is not None:
+        codes = 125 * (np.asarray(count) == 1) + 25 * (r - 1) + 5 * (f - 1) + (m - 1)
+        labels = np.asarray(LOOKUP, dtype=object)[codes]
+        return list(zip(ids, labels.tolist(), r.tolist(), f.tolist(), m.tolist())), edges
+    return [(cid, LOOKUP[125 * (n == 1) + 25 * (ri - 1) + 5 * (fi - 1) + (mi - 1)], ri, fi, mi)
+            for cid, n, ri, fi, mi in zip(ids, count, r, f, m)], edges
+
+
+# --- Runs --------------------------------------------------------------------------
+def last_run(conn, mode=None):
+    sql = "SELECT id, mode, as_of, max_order_id, edges, created FROM rfm_run"
+    if mode:
+        sql += " WHERE mode = :mode"
+    row = conn.execute(text(sql + " ORDER BY id DESC LIMIT 1"), {"mode": mode}).first()
+    if row is None:
+        return None
+    return {"id": row[0], "mode": row[1], "as_of": row[2], "max_order_id": row[3],
+            "edges": json.loads(row[4]), "created": row[5]}
+
+
+def run_segmentation(engine, full=False, full_every_days=7):
+    """Score customers and write changed segments; incremental unless `full` or the last full
+    run is older than `full_every_days`. Returns a summary dict."""
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        prev_full = last_run(conn, "full")
+        prev = last_run(conn)
+        max_order_id = conn.execute(text('SELECT COALESCE(MAX(id), 0) FROM "order"')).scalar()
+    if prev_full is None or time.time() - prev_full["created"] > full_every_days * 86400:
+        full = True
+
+    with engine.connect() as conn:
+        if full:
+            rows = conn.execute(ALL).all()
+        else:
+            rows = conn.execute(SINCE, {"after": prev["max_order_id"]}).all()
+    results, edges = classify(rows, None if full else prev_full["edges"])
+    t_score = time.perf_counter() - t0
+
+    with engine.begin() as conn:
+        run_id = conn.execute(
+            text("INSERT INTO rfm_run (mode, as_of, max_order_id, edges, scored, changed, seconds, created) "
+                 "VALUES (:mode, :as_of, :max_id, :edges, :scored, 0, 0, :now) RETURNING id"),
+            {"mode": "full" if full else "incremental", "as_of": date.today().isoformat(), "max_id": max_order_id,
+             "edges": json.dumps(edges or (prev_full or {}).get("edges") or {}), "scored": len(results),
+             "now": time.time()},
+        ).scalar()
+        conn.execute(text("DROP TABLE IF EXISTS temp.rfm_new"))
+        conn.execute(text("CREATE TEMP TABLE rfm_new (customer_id TEXT PRIMARY KEY, segment TEXT, "
+                          "r INTEGER, f INTEGER, m INTEGER)"))
+        if results:
+            conn.exec_driver_sql("INSERT INTO temp.rfm_new VALUES (?, ?, ?, ?, ?)", results)
+        conn.execute(text("""
+            INSERT INTO customer_segment_history (customer_id, run_id, old_segment, new_segment, r, f, m)
+            SELECT n.customer_id, :run, c.ctype, n.segment, n.r, n.f, n.m
+            FROM temp.rfm_new AS n JOIN customer AS c ON c.customer_id = n.customer_id
+            WHERE c.ctype IS NOT n.segment AND COALESCE(c.ctype, '') NOT IN :keep
+        """).bindparams(bindparam("keep", expanding=True)), {"run": run_id, "keep": list(KEEP)})
+        changed = conn.execute(text("""
+            UPDATE customer SET ctype = n.segment
+            FROM temp.rfm_new AS n
+            WHERE n.customer_id = customer.customer_id AND customer.ctype IS NOT n.segment
+              AND COALESCE(customer.ctype, '') NOT IN :keep
+        """).bindparams(bindparam("keep", expanding=True)), {"keep": list(KEEP)}).rowcount
+        conn.execute(text("DROP TABLE temp.rfm_new"))
+        seconds = time.perf_counter() - t0
+        conn.execute(text("UPDATE rfm_run SET changed = :changed, seconds = :s WHERE id = :id"),
+                     {"changed": changed, "s": seconds, "id": run_id})
+    return {"run": run_id, "mode": "full" if full else "incremental", "scored": len(results),
+            "changed": changed, "score_seconds": round(t_score, 3), "seconds": round(seconds, 3)}
@@ -0,0 +1,68 @@
+# SQLite connection tuning (applied to every new pooled connection).
+# Notes:
+# - WAL lets readers run alongside the single writer instead of queueing behind it
+# - busy_timeout makes writers wait for the lock instead of failing with "database is locked"
+# - synchronous=NORMAL is durable across app crashes in WAL mode (only an OS crash / power cut
+#   can lose the last commits)
+# - Every knob can be overridden with a CRM_SQLITE_* env var; see SQLiteProfile.from_env
+
+import os
+from dataclasses import dataclass, fields
+
+from sqlalchemy import event
+
+
+@dataclass
+class SQLiteProfile:
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    busy_timeout: int = 5000            # ms
+    cache_size: int = -20000            # negative = KiB (here ~20 MB per connection)
+    mmap_size: int = 268435456          # bytes (256 MB)
+    temp_store: str = "MEMORY"
+    foreign_keys: bool = True
+
+    @classmethod
+    def from_env(cls, env=None):
+        """Defaults overridden by CRM_SQLITE_<FIELD> (e.g. CRM_SQLITE_BUSY_TIMEOUT=10000)."""
+        env = os.environ if env is None else env
+        kwargs = {}
+        for f in fields(cls):
+            raw = env.get(f"CRM_SQLITE_{f.name.upper()}")
+            if raw is None:
+                continue
+            if f.type is bool:
+                kwargs[f.name] = raw.strip().lower() in ("1", "true", "on", "yes")
+            elif f.type is int:
+                kwargs[f.name] = int(raw)
+            else:
+                kwargs[f.name] = raw.strip().upper()
+        return cls(**kwargs)
+
+    def pragmas(self):
+        return [
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={self.synchronous}",
+            f"PRAGMA busy_timeout={int(self.busy_timeout)}",
+            f"PRAGMA cache_size={int(self.cache_size)}",
+            f"PRAGMA mmap_size={int(self.mmap_size)}",
+            f"PRAGMA temp_store={self.temp_store}",
+            f"PRAGMA foreign_keys={'ON' if self.foreign_keys else 'OFF'}",
+        ]
+
+
+def install_sqlite_profile(engine, profile=None):
+    """Run the profile's PRAGMAs on each new DBAPI connection of `engine`."""
+    profile = profile or SQLiteProfile.from_env()
+    pragmas = profile.pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for p in pragmas:
+                cur.execute(p)
+        finally:
+            cur.close()
+
+    return profile
@@ -0,0 +1,36 @@
+// Async customer picker: <input data-customer-typeahead list="..."> + <datalist>
+// Fills the datalist from /api/customers/suggest as the user types (debounced).
+(function () {
+  const inputs = document.querySelectorAll('input[data-customer-typeahead]');
+  Array.from(inputs).forEach(input => {
+    const list = document.getElementById(input.getAttribute('list'));
+    const url = input.dataset.customerTypeahead;
+    let timer = null;
+    let last = '';
+
+    function render(items) {
+      list.innerHTML = '';
+      items.forEach(c => {
+        const opt = document.createElement('option');
+        opt.value = c.customer_id;
+        opt.label = c.name + (c.phone ? ' (' + c.phone + ')' : '');
+        opt.textContent = opt.label;
+        list.appendChild(opt);
+      });
+    }
+
+    input.addEventListener('input', () => {
+      const q = input.value.trim();
+      if (q === last) return;
+      last = q;
+      clearTimeout(timer);
+      if (!q) { render([]); return; }
+      timer = setTimeout(() => {
+        fetch(url + '?q=' + encodeURIComponent(q))
+          .then(r => r.ok ? r.json() : [])
+          .then(items => { if (q === last) render(items); })
+          .catch(() => {});
+      }, 150);
+    });
+  });
+})();
@@ -0,0 +1,279 @@
+# Materialized KPI summaries for Order / FollowUp.
+# Notes:
+# - order_summary is keyed by (month, payment_status, payment_mode, purchase_type, delivery_status)
+# - followup_summary is keyed by status
+# - order_daily is keyed by (customer_id, day, payment_status), with customer_id '*' holding the
+#   all-customer rows, so /reports totals for any date range (optionally one customer) are a
+#   primary-key range scan over at most a few rows per day
+# - Kept current by ORM after_insert/after_update/before_delete hooks, inside the same transaction
+#   as the row change; bulk SQL (query.update(), raw INSERTs) bypasses them, so either fold the
+#   rows in with apply_order_rows() or run `--rebuild-aggregates` after such loads
+# - NULL key parts are stored as '' so they can sit in the primary key
+
+from sqlalchemy import event, inspect, text
+
+ORDER_KEYS = ("payment_status", "payment_mode", "purchase_type", "delivery_status")
+# attributes whose old value we need on update (see _old)
+ORDER_TRACKED = ("date", "amount", "customer_id") + ORDER_KEYS
+ALL_CUSTOMERS = "*"
+FOLLOWUP_TRACKED = ("status",)
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS order_summary (
+        month TEXT NOT NULL,
+        payment_status TEXT NOT NULL,
+        payment_mode TEXT NOT NULL,
+        purchase_type TEXT NOT NULL,
+        delivery_status TEXT NOT NULL,
+        order_count INTEGER NOT NULL DEFAULT 0,
+        amount_total INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, payment_status, payment_mode, purchase_type, delivery_status)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS order_daily (
+        customer_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        payment_status TEXT NOT NULL,
+        order_count INTEGER NOT NULL DEFAULT 0,
+        amount_total INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (customer_id, day, payment_status)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS followup_summary (
+        status TEXT NOT NULL PRIMARY KEY,
+        followup_count INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+)
+
+UPSERT_ORDER = text("""
+    INSERT INTO order_summary
+        (month, payment_status, payment_mode, purchase_type, delivery_status, order_count, amount_total)
+    VALUES (:month, :payment_status, :payment_mode, :purchase_type, :delivery_status, :n, :amount)
+    ON CONFLICT (month, payment_status, payment_mode, purchase_type, delivery_status) DO UPDATE SET
+        order_count = order_count + excluded.order_count,
+        amount_total = amount_total + excluded.amount_total
+""")
+
+UPSERT_DAILY = text("""
+    INSERT INTO order_daily (customer_id, day, payment_status, order_count, amount_total)
+    VALUES (:customer_id, :day, :payment_status, :n, :amount)
+    ON CONFLICT (customer_id, day, payment_status) DO UPDATE SET
+        order_count = order_count + excluded.order_count,
+        amount_total = amount_total + excluded.amount_total
+""")
+
+UPSERT_FOLLOWUP = text("""
+    INSERT INTO followup_summary (status, followup_count) VALUES (:status, :n)
+    ON CONFLICT (status) DO UPDATE SET followup_count = followup_count + excluded.followup_count
+""")
+
+REBUILD = (
+    "DELETE FROM order_summary",
+    """
+    INSERT INTO order_summary
+        (month, payment_status, payment_mode, purchase_type, delivery_status, order_count, amount_total)
+    SELECT COALESCE(strftime('%Y-%m', date), ''),
+           COALESCE(payment_status, ''), COALESCE(payment_mode, ''),
+           COALESCE(purchase_type, ''), COALESCE(delivery_status, ''),
+           COUNT(*), COALESCE(SUM(amount), 0)
+    FROM "order"
+    GROUP BY 1, 2, 3, 4, 5
+    """,
+    "DELETE FROM order_daily",
+    """
+    INSERT INTO order_daily (customer_id, day, payment_status, order_count, amount_total)
+    SELECT customer_id, COALESCE(strftime('%Y-%m-%d', date), ''), COALESCE(payment_status, ''),
+           COUNT(*), COALESCE(SUM(amount), 0)
+    FROM "order"
+    GROUP BY 1, 2, 3
+    """,
+    """
+    INSERT INTO order_daily (customer_id, day, payment_status, order_count, amount_total)
+    SELECT '*', day, payment_status, SUM(order_count), SUM(amount_total)
+    FROM order_daily
+    GROUP BY 2, 3
+    """,
+    "DELETE FROM followup_summary",
+    """
+    INSERT INTO followup_summary (status, followup_count)
+    SELECT COALESCE(status, ''), COUNT(*) FROM follow_up GROUP BY 1
+    """,
+)
+
+
+# --- Schema / rebuild ----------------------------------------------------------
+def ensure_summary_tables(engine):
+    """Create the summary tables if missing; backfill them when they are new."""
+    insp = inspect(engine)
+    missing = not all(insp.has_table(t) for t in ("order_summary", "order_daily", "followup_summary"))
+    with engine.begin() as conn:
+        for ddl in SCHEMA:
+            conn.execute(text(ddl))
+    # nothing to backfill on a brand-new DB (create_all has not run yet)
+    if missing and insp.has_table("order") and insp.has_table("follow_up"):
+        rebuild_aggregates(engine)
+    return missing
+
+
+def rebuild_aggregates(engine):
+    """Recompute both summary tables from the base tables (idempotent)."""
+    with engine.begin() as conn:
+        for stmt in REBUILD:
+            conn.execute(text(stmt))
+
+
+# --- Incremental maintenance ---------------------------------------------------
+def _old(target, attr):
+    """Committed value of `attr` before this flush (falls back to the current value)."""
+    hist = inspect(target).attrs[attr].history
+    if hist.deleted:
+        return hist.deleted[0]
+    return getattr(target, attr)
+
+
+def _order_row(month_date, amount, keys, n):
+    row = {k: (v or "") for k, v in zip(ORDER_KEYS, keys)}
+    row["month"] = month_date.strftime("%Y-%m") if month_date else ""
+    row["n"] = n
+    row["amount"] = n * int(amount or 0)
+    return row
+
+
+def _daily_rows(customer_id, day, amount, payment_status, n):
+    """The customer's order_daily row plus the matching all-customer ('*') row."""
+    row = {"customer_id": customer_id, "day": day.isoformat() if day else "",
+           "payment_status": payment_status or "", "n": n, "amount": n * int(amount or 0)}
+    return [row, dict(row, customer_id=ALL_CUSTOMERS)]
+
+
+def _current_order(target, n):
+    return _order_row(target.date, target.amount, [getattr(target, k) for k in ORDER_KEYS], n)
+
+
+def _previous_order(target, n):
+    return _order_row(_old(target, "date"), _old(target, "amount"), [_old(target, k) for k in ORDER_KEYS], n)
+
+
+def _current_daily(target, n):
+    return _daily_rows(target.customer_id, target.date, target.amount, target.payment_status, n)
+
+
+def _previous_daily(target, n):
+    return _daily_rows(_old(target, "customer_id"), _old(target, "date"), _old(target, "amount"),
+                       _old(target, "payment_status"), n)
+
+
+def _on_order_insert(mapper, connection, target):
+    connection.execute(UPSERT_ORDER, _current_order(target, 1))
+    connection.execute(UPSERT_DAILY, _current_daily(target, 1))
+
+
+def _on_order_update(mapper, connection, target):
+    before, after = _previous_order(target, -1), _current_order(target, 1)
+    if not (before["amount"] == -after["amount"] and all(before[k] == after[k] for k in ("month",) + ORDER_KEYS)):
+        connection.execute(UPSERT_ORDER, [before, after])
+    before, after = _previous_daily(target, -1), _current_daily(target, 1)
+    if not (before[0]["amount"] == -after[0]["amount"]
+            and all(before[0][k] == after[0][k] for k in ("customer_id", "day", "payment_status"))):
+        connection.execute(UPSERT_DAILY, before + after)
+
+
+def _on_order_delete(mapper, connection, target):
+    connection.execute(UPSERT_ORDER, _previous_order(target, -1))
+    connection.execute(UPSERT_DAILY, _previous_daily(target, -1))
+
+
+def _on_followup_insert(mapper, connection, target):
+    connection.execute(UPSERT_FOLLOWUP, {"status": target.status or "", "n": 1})
+
+
+def _on_followup_update(mapper, connection, target):
+    old, new = _old(target, "status") or "", target.status or ""
+    if old != new:
+        connection.execute(UPSERT_FOLLOWUP, [{"status": old, "n": -1}, {"status": new, "n": 1}])
+
+
+def _on_followup_delete(mapper, connection, target):
+    connection.execute(UPSERT_FOLLOWUP, {"status": _old(target, "status") or "", "n": -1})
+
+
+def apply_order_rows(conn, rows):
+    """Fold bulk-inserted order dicts into order_summary / order_daily (Core inserts skip the hooks)."""
+    deltas, daily = {}, {}
+    for r in rows:
+        row = _order_row(r.get("date"), r.get("amount"), [r.get(k) for k in ORDER_KEYS], 1)
+        key = (row["month"],) + tuple(row[k] for k in ORDER_KEYS)
+        acc = deltas.setdefault(key, row)
+        if acc is not row:
+            acc["n"] += 1
+            acc["amount"] += row["amount"]
+        for row in _daily_rows(r.get("customer_id"), r.get("date"), r.get("amount"), r.get("payment_status"), 1):
+            acc = daily.setdefault((row["customer_id"], row["day"], row["payment_status"]), row)
+            if acc is not row:
+                acc["n"] += 1
+                acc["amount"] += row["amount"]
+    if deltas:
+        conn.execute(UPSERT_ORDER, list(deltas.values()))
+    if daily:
+        conn.execute(UPSERT_DAILY, list(daily.values()))
+
+
+def _load_old_values(target, value, oldvalue, initiator):
+    pass
+
+
+def register_summary_hooks(Order, FollowUp):
+    """Wire the incremental maintenance hooks onto the models."""
+    # active_history makes SQLAlchemy load the old value even when the attribute was
+    # expired (e.g. after a commit), so _old() always sees it
+    for model, attrs in ((Order, ORDER_TRACKED), (FollowUp, FOLLOWUP_TRACKED)):
+        for attr in attrs:
+            event.listen(getattr(model, attr), "set", _load_old_values, active_history=True)
+
+    event.listen(Order, "after_insert", _on_order_insert)
+    event.listen(Order, "after_update", _on_order_update)
+    # deletes hook in *before* the DELETE so expired attributes can still be loaded
+    event.listen(Order, "before_delete", _on_order_delete)
+    event.listen(FollowUp, "after_insert", _on_followup_insert)
+    event.listen(FollowUp, "after_update", _on_followup_update)
+    event.listen(FollowUp, "before_delete", _on_followup_delete)
+
+
+# --- Reads ---------------------------------------------------------------------
+def order_buckets(conn):
+    """(month, payment_status, payment_mode, count, amount) rows – O(months), not O(orders)."""
+    rows = conn.execute(text("""
+        SELECT month, payment_status, payment_mode, SUM(order_count), SUM(amount_total)
+        FROM order_summary
+        GROUP BY month, payment_status, payment_mode
+    """)).all()
+    return [(m or None, s or None, pm or None, c, a) for m, s, pm, c, a in rows]
+
+
+def followup_count(conn, status=None):
+    if status is None:
+        return conn.execute(text("SELECT COALESCE(SUM(followup_count), 0) FROM followup_summary")).scalar()
+    return conn.execute(
+        text("SELECT COALESCE(SUM(followup_count), 0) FROM followup_summary WHERE status = :s"), {"s": status}
+    ).scalar()
+
+
+def order_count(conn):
+    return conn.execute(text("SELECT COALESCE(SUM(order_count), 0) FROM order_summary")).scalar()
+
+
+def order_range_totals(conn, start=None, end=None, customer_id=None):
+    """{payment_status: (count, amount)} for orders dated start..end (inclusive, open-ended if None)."""
+    rows = conn.execute(text("""
+        SELECT payment_status, SUM(order_count), SUM(amount_total)
+        FROM order_daily
+        WHERE customer_id = :customer_id AND day >= :start AND day <= :end
+        GROUP BY payment_status
+    """), {"customer_id": customer_id or ALL_CUSTOMERS,
+           "start": start.isoformat() if start else "",
+           "end": end.isoformat() if end else "9999-12-31"}).all()
+    return {status or None: (int(n or 0), int(amount or 0)) for status, n, amount in rows}
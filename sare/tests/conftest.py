@@ -0,0 +1,69 @@
+# Shared fixtures: the sibling modules are imported flat (as the app does), and the app runs on a
+# throwaway DB / instance dir set through its CRM_* env vars before it is first imported.
+
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+SARE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SARE))
+
+_TMP = Path(tempfile.mkdtemp(prefix="crm-tests-"))
+for key, value in {
+    "CRM_DB_PATH": _TMP / "crm.db",
+    "CRM_LOG_FILE": _TMP / "crm.log",
+    "CRM_METRICS_DIR": _TMP / "metrics",
+    "CRM_CACHE_PATH": _TMP / "cache.db",
+    "CRM_JOBS_DIR": _TMP / "jobs",
+    "CRM_SNAPSHOT_PATH": _TMP / "read_snapshot.db",
+    "CRM_BACKUP_DIR": _TMP / "backups",
+}.items():
+    os.environ[key] = str(value)
+os.environ["CRM_READ_ROUTING"] = "off"
+
+
+@pytest.fixture(scope="session")
+def crm():
+    """The app module on an empty, fully initialised DB."""
+    import saree_crm_flask_app as crm
+    with crm.app.app_context():
+        crm.db.create_all()
+        crm.ensure_indexes(crm.db.engine, crm.db.metadata)
+        crm.ensure_runtime_tables()
+    return crm
+
+
+@pytest.fixture
+def app_db(crm):
+    """Empty tables (and side tables) for each test; yields the app module inside an app context."""
+    with crm.app.app_context():
+        with crm.db.engine.begin() as conn:
+            for table in ("follow_up", '"order"', "customer", "jobs", "id_sequence"):
+                conn.exec_driver_sql(f"DELETE FROM {table}")
+        crm.rebuild_aggregates(crm.db.engine)
+        crm.ensure_search_index(crm.db.engine, rebuild=True)
+        crm.customer_index.invalidate()
+        yield crm
+        crm.db.session.remove()
+
+
+def add_orders(crm, rows):
+    """rows of (customer_id, days_ago, amount, payment_status); customers are created as needed."""
+    Customer, Order = crm.Customer, crm.Order
+    known = {c for (c,) in crm.db.session.query(Customer.customer_id)}
+    for i, (cid, days_ago, amount, status) in enumerate(rows):
+        if cid not in known:
+            crm.db.session.add(Customer(customer_id=cid, name=f"Customer {cid}", phone=f"9{len(known):09d}"))
+            crm.db.session.flush()
+            known.add(cid)
+        crm.db.session.add(Order(
+            order_id=f"ORD-T{crm.db.session.query(Order).count() + 1}", date=date.today() - timedelta(days=days_ago),
+            customer_id=cid, saree_type="Silk", amount=amount, purchase_type="Online", payment_status=status,
+            payment_mode="UPI" if status == "Paid" else "Pending", delivery_status="Pending",
+        ))
+        crm.db.session.flush()
+    crm.db.session.commit()
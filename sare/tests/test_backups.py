@@ -0,0 +1,118 @@
+import gzip
+import io
+import re
+import sqlite3
+
+import pytest
+
+from backups import BackupError, BackupStore, check_database, save_upload
+from conftest import add_orders
+
+
+def make_db(path, rows=50):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE customer (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute('CREATE TABLE "order" (id INTEGER PRIMARY KEY, amount INTEGER)')
+    conn.executemany('INSERT INTO "order" (amount) VALUES (?)', [(i,) for i in range(rows)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def order_count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM "order"').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backup_is_a_checked_gzip_of_the_db(tmp_path):
+    db = make_db(tmp_path / "live.db")
+    store = BackupStore(tmp_path / "backups", pages=1)
+    entry = store.create(db, reason="test")
+    out = tmp_path / "out.db"
+    with gzip.open(store.path(entry["file"]), "rb") as fh:
+        out.write_bytes(fh.read())
+    check_database(out)
+    assert order_count(out) == 50 and entry["steps"] > 1
+
+
+def test_rotation_never_pushes_out_pre_restore_copies(tmp_path):
+    db = make_db(tmp_path / "live.db")
+    store = BackupStore(tmp_path / "backups", keep=2, keep_safety=1)
+    safety = store.create(db, reason=BackupStore.SAFETY)
+    routine = [store.create(db, reason="cli") for _ in range(4)]
+    kept = {e["file"] for e in store.entries(include_pruned=False)}
+    assert kept == {safety["file"], routine[-1]["file"], routine[-2]["file"]}
+    assert len(store.entries()) == 5   # pruned ones stay in the history
+    newer = store.create(db, reason=BackupStore.SAFETY)
+    assert store.path(safety["file"]) is None and store.path(newer["file"]) is not None
+
+
+def test_restore_takes_safety_copy_and_rejects_bad_files(tmp_path):
+    live = make_db(tmp_path / "live.db", rows=50)
+    other = make_db(tmp_path / "other.db", rows=7)
+    store = BackupStore(tmp_path / "backups")
+    safety = store.restore(live, other)
+    assert order_count(live) == 7 and safety["reason"] == BackupStore.SAFETY
+    junk = tmp_path / "junk.db"
+    junk.write_bytes(b"not a database" * 100)
+    with pytest.raises(BackupError):
+        store.restore(live, junk)
+    assert order_count(live) == 7
+
+
+def test_save_upload_accepts_plain_and_gzip(tmp_path):
+    db = make_db(tmp_path / "live.db").read_bytes()
+    for name, data in (("plain", db), ("gz", gzip.compress(db))):
+        save_upload(io.BytesIO(data), tmp_path / f"{name}.db")
+        assert (tmp_path / f"{name}.db").read_bytes() == db
+
+
+def test_download_is_post_only_and_not_catalogued(app_db):
+    client = app_db.app.test_client()
+    before = len(app_db.backup_store.entries())
+    assert client.get("/backup/download").status_code == 404   # GET only reaches /backup/<name>
+    resp = client.post("/backup/download")
+    assert resp.status_code == 200 and gzip.decompress(resp.data).startswith(b"SQLite format 3")
+    assert len(app_db.backup_store.entries()) == before
+    assert not list(app_db.backup_store.dir.glob("dump-*"))
+
+
+def test_large_download_is_prepared_by_the_worker(app_db, monkeypatch):
+    monkeypatch.setitem(app_db.app.config, "BACKUP_INLINE_MAX_MB", 0)
+    client = app_db.app.test_client()
+    before = len(app_db.backup_store.entries())
+    resp = client.post("/backup/download")
+    assert resp.status_code == 302 and resp.headers["Location"].endswith("/backup")
+    assert b"being prepared" in client.get("/backup").data
+    app_db.run_worker(once=True)
+    page = client.get("/backup").data.decode()
+    link = re.search(r'href="(/jobs/\d+/download)"', page).group(1)
+    data = client.get(link).data
+    assert gzip.decompress(data).startswith(b"SQLite format 3")
+    assert len(app_db.backup_store.entries()) == before
+
+
+def test_backup_job_links_to_its_file(app_db):
+    client = app_db.app.test_client()
+    resp = client.post("/jobs", json={"kind": "backup"})
+    assert resp.status_code == 202
+    app_db.run_worker(once=True)
+    job = client.get(resp.headers["Location"]).get_json()
+    assert job["status"] == "done"
+    assert client.get(job["download_url"]).status_code == 200
+    assert job["download_url"].encode() in client.get("/backup").data
+
+
+def test_restore_route_round_trip(app_db):
+    add_orders(app_db, [("C1", 1, 100, "Paid"), ("C2", 2, 200, "Pending")])
+    client = app_db.app.test_client()
+    snapshot = client.post("/backup/download").data
+    add_orders(app_db, [("C3", 0, 300, "Paid")])
+    resp = client.post("/backup/restore", data={"dbfile": (io.BytesIO(snapshot), "crm.db.gz")},
+                       content_type="multipart/form-data", follow_redirects=True)
+    assert b"Database restored" in resp.data
+    assert app_db.db.session.query(app_db.Order).count() == 2
+    assert app_db.reconcile_customer_stats(app_db.db.engine, fix=False)["drifted"] == 0
@@ -0,0 +1,43 @@
+from customer_index import CustomerPrefixIndex
+
+
+def names(crm, q):
+    return [row["name"] for row in crm.customer_index.suggest(q)]
+
+
+def test_suggest_sees_committed_customers(app_db):
+    crm = app_db
+    crm.db.session.add(crm.Customer(customer_id="C1", name="Anita Rao", phone="9000000001"))
+    crm.db.session.commit()
+    assert names(crm, "rao") == ["Anita Rao"]
+    assert names(crm, "90000") == ["Anita Rao"]
+    crm.db.session.query(crm.Customer).filter_by(customer_id="C1").one().name = "Anita Shah"
+    crm.db.session.commit()
+    assert names(crm, "rao") == [] and names(crm, "shah") == ["Anita Shah"]
+
+
+def test_rolled_back_flush_never_reaches_the_index(app_db):
+    crm = app_db
+    assert names(crm, "ghost") == []
+    crm.db.session.add(crm.Customer(customer_id="C9", name="Ghost", phone="9000000009"))
+    crm.db.session.flush()
+    assert names(crm, "ghost") == []   # flushed, not committed: the built index still stands
+    crm.db.session.rollback()
+    crm.db.session.add(crm.Customer(customer_id="C2", name="Bela", phone="9000000002"))
+    crm.db.session.commit()
+    assert names(crm, "ghost") == [] and names(crm, "bela") == ["Bela"]
+
+
+def test_build_overlapping_an_invalidation_is_not_kept():
+    rows = [[(1, "C1", "Old", None, None)]]
+    index = CustomerPrefixIndex(lambda: rows[0])
+
+    def loader():
+        index.invalidate()   # a commit lands while we are reading
+        rows[0] = [(1, "C1", "New", None, None)]
+        return [(1, "C1", "Old", None, None)]
+
+    index._loader = loader
+    assert [r["name"] for r in index.suggest("old")] == ["Old"]
+    index._loader = lambda: rows[0]
+    assert [r["name"] for r in index.suggest("new")] == ["New"]
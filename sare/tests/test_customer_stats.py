@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from conftest import add_orders
+from customer_stats import COLUMNS, EXPECTED
+
+
+def stats(crm):
+    with crm.db.engine.connect() as conn:
+        kept = sorted(conn.execute(text(f"SELECT {COLUMNS} FROM customer_stats")).all())
+        expected = sorted(conn.execute(text(EXPECTED)).all())
+    return kept, expected
+
+
+def test_triggers_match_a_full_recount(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid"), ("C1", 5, 250, "Pending"), ("C2", 3, 400, "Paid")])
+    session = crm.db.session
+    session.add(crm.Customer(customer_id="C3", name="No orders", phone="9100000000"))
+    first, second, third = crm.Order.query.order_by(crm.Order.id).all()
+    first.customer_id = "C2"                                      # move to another customer
+    second.payment_status, second.amount = "Paid", 300            # restatus + reprice
+    third.date = date.today() - timedelta(days=30)                # last_order_date moves back
+    session.commit()
+    with crm.db.engine.begin() as conn:                           # raw SQL is covered too
+        conn.execute(text("DELETE FROM \"order\" WHERE customer_id = 'C1'"))
+    kept, expected = stats(crm)
+    assert kept == expected
+    assert dict((row[0], row[1:]) for row in kept)["C1"] == (0, 0, 0, 0, "")
+
+
+def test_reconcile_repairs_drift(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid"), ("C2", 2, 50, "Pending")])
+    with crm.db.engine.begin() as conn:
+        conn.execute(text("UPDATE customer_stats SET paid_amount = 7 WHERE customer_id = 'C1'"))
+        conn.execute(text("INSERT INTO customer_stats (customer_id) VALUES ('ghost')"))
+        conn.execute(text("UPDATE customer_total SET customers = 99"))
+    report = crm.reconcile_customer_stats(crm.db.engine)
+    assert (report["drifted"], report["orphans"], report["fixed"]) == (2, 1, True)
+    kept, expected = stats(crm)
+    assert kept == expected and crm.reconcile_customer_stats(crm.db.engine, fix=False)["drifted"] == 0
+
+
+def test_spend_sort_walks_customer_stats(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid"), ("C2", 2, 500, "Paid"), ("C3", 3, 900, "Pending")])
+    query, sort = crm.customer_listing("", "spend")
+    assert [row[0].customer_id for row in query.order_by(*[c.desc() for c, _ in sort])] == ["C2", "C1", "C3"]
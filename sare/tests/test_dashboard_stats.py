@@ -0,0 +1,28 @@
+from datetime import date
+
+from conftest import add_orders
+from dashboard_stats import fold_order_buckets, load_dashboard_stats
+
+
+def test_fold_order_buckets():
+    rows = [("2025-06", "Paid", "UPI", 2, 300), ("2025-06", "Pending", "Pending", 1, 50),
+            ("2025-01", "Paid", "Cash", 1, 100), (None, "Paid", None, 1, 10)]
+    stats = fold_order_buckets(rows, 4, date(2025, 6, 15), months=3)
+    assert (stats.total_orders, stats.total_paid, stats.total_pending) == (5, 410, 50)
+    assert (stats.paid_month, stats.pending_month, stats.pending_followups) == (300, 50, 4)
+    assert stats.month_labels == ["Apr 2025", "May 2025", "Jun 2025"] and stats.month_counts == [0, 0, 3]
+    assert stats.mode_split == {"UPI": 2, "Cash": 1, "Unknown": 1}
+    assert stats.paid_mode_split() == {"UPI": 2, "Cash": 1}
+
+
+def test_kpis_match_the_orders_table(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 0, 100, "Paid"), ("C1", 1, 250, "Pending"), ("C2", 70, 400, "Paid"),
+                     ("C2", 200, 30, "Paid")])
+    orders = crm.Order.query.all()
+    stats = load_dashboard_stats(crm.db.session)
+    assert stats.total_orders == len(orders)
+    assert stats.total_paid == sum(o.amount for o in orders if o.payment_status == "Paid")
+    assert stats.total_pending == sum(o.amount for o in orders if o.payment_status == "Pending")
+    assert stats.mode_split == {"UPI": 3}
+    assert crm.app.test_client().get("/dashboard").status_code == 200
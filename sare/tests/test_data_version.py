@@ -0,0 +1,49 @@
+from sqlalchemy import text
+
+from conftest import add_orders
+from response_cache import table_versions
+
+
+def versions(crm):
+    with crm.db.engine.connect() as conn:
+        return table_versions(conn, ("customer", "order", "follow_up"))
+
+
+def test_every_kind_of_write_bumps_its_table(app_db):
+    crm = app_db
+    before = versions(crm)
+    add_orders(crm, [("C1", 1, 100, "Paid")])                    # ORM
+    after_orm = versions(crm)
+    assert after_orm[0] > before[0] and after_orm[1] > before[1] and after_orm[2] == before[2]
+    with crm.db.engine.begin() as conn:                          # raw SQL
+        conn.execute(text('UPDATE "order" SET amount = amount + 1'))
+        conn.execute(text("INSERT INTO customer (customer_id, name, phone) VALUES ('C9', 'Raw', '9999999999')"))
+        conn.execute(text("DELETE FROM customer WHERE customer_id = 'C9'"))
+    after_sql = versions(crm)
+    assert after_sql[1] == after_orm[1] + 1 and after_sql[0] == after_orm[0] + 2
+
+
+def test_unchanged_page_answers_304_until_a_write(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid")])
+    client = crm.app.test_client()
+    first = client.get("/dashboard")
+    etag = first.headers["ETag"]
+    again = client.get("/dashboard", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.data == b""
+    assert client.get("/dashboard?x=1", headers={"If-None-Match": etag}).status_code == 200
+
+    add_orders(crm, [("C1", 2, 50, "Paid")])
+    changed = client.get("/dashboard", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+
+def test_page_showing_a_flash_is_never_cached(app_db):
+    client = app_db.app.test_client()
+    etag = client.get("/dashboard").headers["ETag"]
+    client.post("/customers", data={"customer_id": "", "name": ""})   # flashes a validation error
+    flashed = client.get("/dashboard", headers={"If-None-Match": etag})
+    assert flashed.status_code == 200 and b"Customer ID and Name are required." in flashed.data
+    assert "ETag" not in flashed.headers and flashed.headers["Cache-Control"] == "no-store"
+    again = client.get("/dashboard", headers={"If-None-Match": etag})   # the copy cached before the flash
+    assert again.status_code == 304
@@ -0,0 +1,29 @@
+import re
+
+from sqlalchemy import inspect
+
+from conftest import add_orders
+
+
+def test_declared_indexes_exist_and_ensure_is_idempotent(app_db):
+    crm = app_db
+    assert crm.ensure_indexes(crm.db.engine, crm.db.metadata) == []
+    have = {ix["name"] for ix in inspect(crm.db.engine).get_indexes("order")}
+    declared = {ix.name for ix in crm.Order.__table__.indexes}
+    assert declared and declared <= have
+
+
+def test_explain_sees_report_reads_behind_the_read_router(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid"), ("C2", 40, 200, "Pending")])
+    lines = []
+    mode = crm.read_router.mode
+    crm.read_router.mode = "ro"
+    try:
+        crm.explain(["/dashboard", "/payments", "/reports"], out=lines.append)
+        assert crm.read_router.mode == "ro"   # restored afterwards
+    finally:
+        crm.read_router.mode = mode
+    counts = dict(re.findall(r"=== GET (\S+) -> 200, (\d+) queries", "\n".join(lines)))
+    assert set(counts) == {"/dashboard", "/payments", "/reports"}
+    assert all(int(n) > 0 for n in counts.values())
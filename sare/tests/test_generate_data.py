@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, text
+
+from conftest import SARE
+from customer_stats import customer_count, reconcile_customer_stats
+
+
+def generate(db, *args):
+    subprocess.run([sys.executable, str(SARE / "bench" / "generate_data.py"), "--db", str(db), *args],
+                   check=True, capture_output=True)
+
+
+def test_generated_dataset_is_consistent(tmp_path):
+    db = tmp_path / "big.db"
+    generate(db, "--customers", "300", "--orders", "2000", "--days", "60")
+    generate(db, "--customers", "0", "--orders", "500", "--followups", "0")   # append to the same DB
+    engine = create_engine(f"sqlite:///{db}")
+    with engine.connect() as conn:
+        scalar = lambda sql: conn.execute(text(sql)).scalar()   # noqa: E731
+        assert scalar('SELECT COUNT(*) FROM "order"') == 2500
+        assert scalar('SELECT COUNT(DISTINCT order_id) FROM "order"') == 2500
+        assert scalar("SELECT COUNT(*) FROM follow_up") == 400
+        assert customer_count(conn) == scalar("SELECT COUNT(*) FROM customer") == 300
+        assert scalar("SELECT SUM(order_count) FROM order_summary") == 2500
+        assert scalar("SELECT COUNT(*) FROM customer_fts WHERE customer_fts MATCH 'CUST*'") == 300
+        assert scalar("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'order_fts_ai'") == 1
+    assert reconcile_customer_stats(engine, fix=False)["drifted"] == 0
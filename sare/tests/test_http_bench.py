@@ -0,0 +1,93 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from conftest import SARE
+
+BENCH = SARE / "bench" / "http_bench.py"
+sys.path.insert(0, str(BENCH.parent))
+
+import http_bench  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_percentile_is_nearest_rank():
+    ms = [float(i) for i in range(1, 101)]
+    assert (http_bench.percentile(ms, 50), http_bench.percentile(ms, 95), http_bench.percentile(ms, 99)) == (
+        50.0, 95.0, 99.0)
+    assert http_bench.percentile([], 95) is None
+
+
+def test_compare_flags_p95_regressions(tmp_path):
+    base = tmp_path / "base.json"
+    base.write_text(json.dumps({"meta": {}, "results": {"1000": {"dashboard": {"p95_ms": 10}, "orders": {"p95_ms": 10}}}}))
+    report = {"results": {"1000": {"dashboard": {"p95_ms": 15}, "orders": {"p95_ms": 11}}}}
+    assert http_bench.compare(report, base, threshold=20) == [("1000", "dashboard")]
+
+
+def test_compare_skips_invalid_routes(tmp_path):
+    base = tmp_path / "base.json"
+    base.write_text(json.dumps({"meta": {}, "results": {"1000": {"orders": {"p95_ms": 50, "status": {"200": 9}}}}}))
+    report = {"results": {"1000": {"orders": {"p95_ms": 2, "status": {"500": 9}, "valid": False}}}}
+    assert http_bench.compare(report, base, threshold=20) == []
+
+
+class Flaky(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    calls = 0
+
+    def do_GET(self):
+        Flaky.calls += 1
+        ok = Flaky.calls % 2
+        if ok:
+            time.sleep(0.02)   # the real page is slow, the error fast
+        self.send_response(200 if ok else 500)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_error_responses_are_not_timed(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Flaky)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        r = http_bench.run_route(server.server_address[1], ("flaky", "GET", "/"), 20, 1, ["C1"], ["O1"],
+                                 http_bench.RssMonitor(os.getpid()))
+    finally:
+        server.shutdown()
+    assert not r["valid"] and r["errors"] == 10 and r["status"] == {"200": 10, "500": 10}
+    assert r["p50_ms"] >= 20 and r["peak_rss_kb"] > 0
+
+
+def test_worker_rss_comes_from_the_children():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        monitor = http_bench.RssMonitor(os.getpid(), workers=True)
+        assert child.pid in monitor.pids()
+        assert monitor.peak_kb() > 0
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_bench_runs_end_to_end(tmp_path):
+    out = tmp_path / "report.json"
+    subprocess.run([sys.executable, str(BENCH), "--sizes", "200", "--requests", "6", "--concurrency", "2",
+                    "--routes", "status,dashboard,order_create", "--port", str(free_port()),
+                    "--workdir", str(tmp_path), "--json", str(out)], check=True, capture_output=True, timeout=300)
+    results = json.loads(out.read_text())["results"]["200"]
+    assert set(results) == {"status", "dashboard", "order_create"}
+    assert results["dashboard"]["status"] == {"200": 6} and results["dashboard"]["p95_ms"] > 0
+    assert all(r["valid"] for r in results.values())
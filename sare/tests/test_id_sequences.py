@@ -0,0 +1,47 @@
+import threading
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine
+
+from id_sequences import IdBlockCache, allocate, ensure_id_sequence_table
+
+orders = Table("orders", MetaData(), Column("id", Integer, primary_key=True), Column("order_id", String))
+
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ids.db'}", connect_args={"timeout": 30})
+    orders.metadata.create_all(engine)
+    ensure_id_sequence_table(engine)
+    return engine
+
+
+def test_allocation_continues_after_existing_ids_and_rolls_back(tmp_path):
+    engine = make_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(orders.insert(), [{"order_id": "ORD20250601-00007"}, {"order_id": "ORD20250531-00099"}])
+    with engine.begin() as conn:
+        assert allocate(conn, "ORD", "20250601", orders.c.order_id) == 8
+        assert allocate(conn, "ORD", "20250601", orders.c.order_id) == 9
+    with engine.connect() as conn:   # never committed: the number is handed out again
+        assert allocate(conn, "ORD", "20250601", orders.c.order_id) == 10
+        conn.rollback()
+    with engine.begin() as conn:
+        assert allocate(conn, "ORD", "20250601", orders.c.order_id) == 10
+        assert allocate(conn, "ORD", "20250602", orders.c.order_id) == 1
+
+
+def test_block_cache_never_hands_out_a_number_twice(tmp_path):
+    engine = make_engine(tmp_path)
+    caches = [IdBlockCache(engine, block=5) for _ in range(3)]   # one per "worker"
+    seen, lock = [], threading.Lock()
+
+    def work(cache):
+        got = [cache.next("ORD", "20250601", orders.c.order_id) for _ in range(40)]
+        with lock:
+            seen.extend(got)
+
+    threads = [threading.Thread(target=work, args=(c,)) for c in caches for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(seen) == len(set(seen)) == 240
@@ -0,0 +1,43 @@
+import io
+from datetime import date
+
+from conftest import add_orders
+
+HEADER = "order_id,date,customer_id,saree_type,amount,purchase_type,payment_status,payment_mode,delivery_status,remarks\n"
+
+
+def run(crm, entity, body):
+    with crm.app.app_context():
+        return crm.run_import(entity, io.StringIO(body))
+
+
+def test_customer_import_skips_duplicates(app_db):
+    report = run(app_db, "customers", "customer_id,name,phone\nC1,Anita,9000000001\nC1,Again,9\nC2,Meera,9000000002\n")
+    assert (report.rows, report.inserted, report.error_rows) == (3, 2, 1)
+    report = run(app_db, "customers", "customer_id,name\nC2,Meera\n")
+    assert report.inserted == 0 and "already exists" in report.errors[0][1]
+
+
+def test_order_import_rejects_unparseable_dates(app_db):
+    add_orders(app_db, [("C1", 0, 100, "Paid")])
+    report = run(app_db, "orders", HEADER + "\n".join([
+        "O-1,2024-03-05,C1,Silk,1000,Online,Paid,UPI,Delivered,",
+        "O-2,05/03/2024,C1,Silk,2000,Online,Pending,,Pending,",
+        "O-3,05-03-2024,C1,Silk,3000,Online,Paid,UPI,Pending,",
+        "O-4,someday,C1,Silk,4000,Online,Paid,UPI,Pending,",
+    ]) + "\n")
+    assert report.inserted == 2
+    assert [line for line, _ in report.errors] == [4, 5]
+    assert all("is not YYYY-MM-DD" in msg for _, msg in report.errors)
+    dates = dict(app_db.db.session.query(app_db.Order.order_id, app_db.Order.date)
+                 .filter(app_db.Order.order_id.in_(["O-1", "O-2"])))
+    assert dates == {"O-1": date(2024, 3, 5), "O-2": date(2024, 3, 5)}
+
+
+def test_order_form_keeps_lenient_dates(app_db):
+    add_orders(app_db, [("C1", 0, 100, "Paid")])
+    data, errors = app_db.validate_order_form({
+        "customer_id": "C1", "amount": "10", "purchase_type": "Online", "payment_status": "Pending",
+        "delivery_status": "Pending", "date": "05-03-2024",
+    })
+    assert errors == [] and data["date"] == date.today()
@@ -0,0 +1,89 @@
+import time
+
+from sqlalchemy import create_engine, text
+
+from jobs import JobWorker, enqueue, ensure_jobs_table, get_job
+
+
+def make_worker(tmp_path, handlers, **kw):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    ensure_jobs_table(engine)
+    return engine, JobWorker(engine, handlers, tmp_path / "files", poll=0.01, **kw)
+
+
+def test_job_runs_once_and_records_result(tmp_path):
+    calls = []
+    engine, worker = make_worker(tmp_path, {"echo": lambda payload, job_id: calls.append(payload) or payload})
+    with engine.begin() as conn:
+        job_id = enqueue(conn, "echo", {"n": 1})
+    worker.run(once=True)
+    with engine.connect() as conn:
+        job = get_job(conn, job_id)
+    assert calls == [{"n": 1}]
+    assert (job["status"], job["result"], job["attempts"]) == ("done", {"n": 1}, 1)
+
+
+def test_failed_job_with_one_attempt_is_not_retried(tmp_path):
+    calls = []
+
+    def boom(payload, job_id):
+        calls.append(job_id)
+        raise RuntimeError("nope")
+
+    engine, worker = make_worker(tmp_path, {"boom": boom}, backoff=0)
+    with engine.begin() as conn:
+        job_id = enqueue(conn, "boom", max_attempts=1)
+    worker.run(once=True)
+    worker.run(once=True)
+    with engine.connect() as conn:
+        job = get_job(conn, job_id)
+    assert calls == [job_id]
+    assert job["status"] == "failed" and "nope" in job["error"]
+
+
+def test_stale_job_out_of_attempts_fails_instead_of_rerunning(tmp_path):
+    calls = []
+    engine, worker = make_worker(tmp_path, {"import": lambda payload, job_id: calls.append(job_id)}, stale_after=60)
+    with engine.begin() as conn:
+        once = enqueue(conn, "import", max_attempts=1)
+        twice = enqueue(conn, "import", max_attempts=2)
+        # both were claimed by a worker that died an hour ago
+        conn.execute(text("UPDATE jobs SET status = 'running', attempts = 1, claimed_by = 'dead:1', "
+                          "claimed_at = :t"), {"t": time.time() - 3600})
+    worker.housekeeping()
+    worker.run(once=True)
+    with engine.connect() as conn:
+        assert get_job(conn, once)["status"] == "failed"
+        assert get_job(conn, twice)["status"] == "done"
+    assert calls == [twice]
+
+
+def test_claim_skips_queued_job_without_attempts_left(tmp_path):
+    engine, worker = make_worker(tmp_path, {"x": lambda payload, job_id: None})
+    with engine.begin() as conn:
+        job_id = enqueue(conn, "x", max_attempts=1)
+        conn.execute(text("UPDATE jobs SET attempts = 1"))
+    assert worker.run_one() is None
+    with engine.connect() as conn:
+        assert get_job(conn, job_id)["status"] == "queued"
+
+
+def test_heartbeat_keeps_a_long_job_from_going_stale(tmp_path):
+    def slow(payload, job_id):
+        time.sleep(0.5)
+        # housekeeping from another worker while this one is still busy
+        other.housekeeping()
+        with engine.connect() as conn:
+            seen.append(get_job(conn, job_id)["status"])
+        return "ok"
+
+    seen = []
+    engine, worker = make_worker(tmp_path, {"slow": slow}, stale_after=0.3, heartbeat=0.05)
+    other = JobWorker(engine, {}, tmp_path / "files", stale_after=0.3)
+    with engine.begin() as conn:
+        job_id = enqueue(conn, "slow", max_attempts=1)
+    worker.run(once=True)
+    with engine.connect() as conn:
+        job = get_job(conn, job_id)
+    assert seen == ["running"]
+    assert (job["status"], job["attempts"]) == ("done", 1)
@@ -0,0 +1,66 @@
+import re
+from datetime import date
+
+import pytest
+
+from conftest import add_orders
+
+
+@pytest.fixture
+def client(app_db):
+    crm = app_db
+    add_orders(crm, [(f"C{i % 4}", i, 100 * (i + 1), "Paid" if i % 2 else "Pending") for i in range(9)])
+    for i in range(5):
+        crm.db.session.add(crm.FollowUp(customer_id="C1", followup_date=date.today(), notes=f"call {i}",
+                                        status="Open"))
+    crm.db.session.commit()
+    return crm.app.test_client()
+
+
+@pytest.mark.parametrize("url", ["/customers", "/customers?sort=spend", "/customers?sort=recent",
+                                 "/customers?q=C1", "/orders", "/orders?q=silk", "/followups",
+                                 "/followups?q=call", "/customers/new", "/orders/new", "/followups/new"])
+def test_pages_render(client, url):
+    assert client.get(url).status_code == 200
+
+
+@pytest.mark.parametrize("url,row,rows", [("/customers?sort=spend", rb"Customer C\d", 4),
+                                          ("/orders", rb"ORD-T\d+", 9), ("/followups", rb"call \d", 5)])
+def test_cursor_pages_cover_every_row(client, url, row, rows):
+    sep = "&" if "?" in url else "?"
+    seen, cursor = [], None
+    for _ in range(10):
+        resp = client.get(f"{url}{sep}per_page=2" + (f"&cursor={cursor}" if cursor else ""))
+        assert resp.status_code == 200
+        seen += sorted(set(re.findall(row, resp.data)))
+        older = re.search(rb'cursor=([\w-]+)[^"]*">Older', resp.data)
+        if not older:
+            break
+        cursor = older.group(1).decode()
+    assert len(seen) == len(set(seen)) == rows   # every row once, across pages
+
+
+def test_add_edit_and_delete_through_the_pages(client, app_db):
+    crm = app_db
+    client.post("/customers", data={"customer_id": "C9", "name": "Nila", "phone": "9300000000"})
+    nila = crm.Customer.query.filter_by(customer_id="C9").one()
+    client.post(f"/customers/edit/{nila.id}", data={"name": "Nila R", "phone": "9300000000", "city": "Salem"})
+    crm.db.session.expire_all()
+    assert (nila.name, nila.city) == ("Nila R", "Salem")
+    assert client.get(f"/customers/edit/{nila.id}").status_code == 200
+
+    client.post("/followups", data={"customer_id": "C9", "followup_date": "2025-06-01", "notes": "x"})
+    f = crm.FollowUp.query.filter_by(customer_id="C9").one()
+    assert (f.followup_date, f.status) == (date(2025, 6, 1), "Open")
+    client.post(f"/followups/edit/{f.id}", data={"customer_id": "C9", "followup_date": "2025-06-02",
+                                                 "notes": "y", "status": "Done"})
+    crm.db.session.expire_all()
+    assert (f.followup_date, f.status) == (date(2025, 6, 2), "Done")
+    client.post(f"/customers/delete/{nila.id}")             # refused: still has a follow-up
+    assert crm.Customer.query.filter_by(customer_id="C9").count() == 1
+    client.post(f"/followups/delete/{f.id}")
+    client.post(f"/customers/delete/{nila.id}")
+    assert crm.Customer.query.filter_by(customer_id="C9").count() == 0
+
+    client.post("/orders/delete/ORD-T1")
+    assert crm.Order.query.filter_by(order_id="ORD-T1").count() == 0
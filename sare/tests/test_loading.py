@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+
+from conftest import add_orders
+from loading import eager
+
+
+class CountQueries:
+    def __init__(self, engine):
+        self.n, self.engine = 0, engine
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self.count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self.count)
+
+    def count(self, *args):
+        self.n += 1
+
+
+def test_page_costs_a_fixed_number_of_queries(app_db):
+    crm = app_db
+    add_orders(crm, [(f"C{i}", i, 100, "Paid") for i in range(6)])
+    crm.db.session.expunge_all()
+    with CountQueries(crm.db.engine) as q:
+        orders = eager(crm.Order.query, crm.Order, ("customer",)).all()
+        names = {o.customer.name for o in orders}
+    assert len(names) == 6 and q.n == 1
+    with CountQueries(crm.db.engine) as q:
+        customers = eager(crm.Customer.query, crm.Customer, ("orders",)).all()
+        assert sum(len(c.orders) for c in customers) == 6
+    assert q.n == 2   # page + one IN query for the collection
+
+
+def test_guard_raises_on_unlisted_relationships(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid")])
+    crm.db.session.expunge_all()
+    order = eager(crm.Order.query, crm.Order, ("customer",), guard=True).one()
+    assert order.customer.name == "Customer C1"
+    with pytest.raises(InvalidRequestError):
+        order.customer.orders
@@ -0,0 +1,73 @@
+import hashlib
+import sqlite3
+
+from page_store import PageStore
+
+
+def make_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS t (id INTEGER PRIMARY KEY, body TEXT)")
+    conn.executemany("INSERT INTO t (body) VALUES (?)", ((f"row {i} " * 20,) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def sha(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_snapshot_restores_byte_for_byte_and_dedupes(tmp_path):
+    db = tmp_path / "crm.db"
+    make_db(db, 500)
+    store = PageStore(tmp_path / "store", chunk_size=4096)
+    first = store.snapshot(db)
+    assert first["new_objects"] > 0
+    assert store.snapshot(db)["new_objects"] == 0   # nothing changed: nothing stored
+    store.restore(first["id"], tmp_path / "restored.db")
+    assert sha(tmp_path / "restored.db") == first["sha256"]
+    conn = sqlite3.connect(tmp_path / "restored.db")
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone() == (500,)
+    conn.close()
+
+
+def test_verify_reports_damaged_snapshots(tmp_path):
+    db = tmp_path / "crm.db"
+    make_db(db, 200)
+    store = PageStore(tmp_path / "store", chunk_size=4096)
+    snap = store.snapshot(db)
+    assert store.verify()["damaged"] == []
+    chunk = next(store._chunks(snap))
+    store._object_path(chunk).write_bytes(b"garbage")
+    result = store.verify()
+    assert result["damaged"] == [snap["id"]] and result["bad_objects"] == 1
+
+
+def test_prune_survives_a_damaged_tree(tmp_path):
+    db = tmp_path / "crm.db"
+    make_db(db, 200)
+    store = PageStore(tmp_path / "store", chunk_size=4096, keep=2, daily=0)
+    old = store.snapshot(db)
+    make_db(db, 200)
+    new = store.snapshot(db)
+    tree = store._object_path(bytes.fromhex(old["trees"][0]))
+    tree.write_bytes(b"garbage")
+    result = store.prune()
+    assert result["unreadable"] == [old["id"]] and result["snapshots"] == 2
+    assert tree.exists()
+    store.restore(new["id"], tmp_path / "restored.db")
+    assert sha(tmp_path / "restored.db") == new["sha256"]
+
+
+def test_prune_leaves_stray_files_alone(tmp_path):
+    db = tmp_path / "crm.db"
+    make_db(db, 50)
+    store = PageStore(tmp_path / "store", chunk_size=4096, keep=1, daily=0)
+    snap = store.snapshot(db)
+    shard = store._object_path(bytes.fromhex(snap["trees"][0])).parent
+    for name in (".DS_Store", "notes.swp", "a" * 64 + ".bak"):
+        (shard / name).write_text("x")
+    (store.objects / "zz" / "sub").mkdir(parents=True)
+    result = store.prune()
+    assert result["stray"] == 4 and result["objects_removed"] == 0
+    assert (shard / ".DS_Store").exists()
+    store.restore(snap["id"], tmp_path / "restored.db")
@@ -0,0 +1,35 @@
+from datetime import date
+
+from conftest import add_orders
+from pagination import decode_cursor, encode_cursor, keyset_page
+
+
+def test_cursor_round_trip(crm):
+    sort = crm.LISTINGS["orders"][3]
+    token = encode_cursor("n", [date(2025, 6, 1), 42])
+    assert decode_cursor(token, sort) == ("n", [date(2025, 6, 1), 42])
+    assert decode_cursor("not-a-cursor", sort) == (None, None)
+    assert decode_cursor(encode_cursor("x", [date(2025, 6, 1), 42]), sort) == (None, None)
+    assert decode_cursor(encode_cursor("n", [42]), sort) == (None, None)
+
+
+def test_pages_walk_forward_and_back(app_db):
+    crm = app_db
+    add_orders(crm, [(f"C{i % 3}", i % 4, 100 + i, "Paid") for i in range(11)])   # repeated dates: ties on id
+    sort = crm.LISTINGS["orders"][3]
+    expected = [o.id for o in crm.Order.query.order_by(crm.Order.date.desc(), crm.Order.id.desc())]
+
+    pages, cursor = [], None
+    while True:
+        page = keyset_page(crm.Order.query, sort, cursor, size=4)
+        pages.append(page)
+        if not page.next_cursor:
+            break
+        cursor = page.next_cursor
+    assert [o.id for p in pages for o in p.items] == expected
+    assert [len(p.items) for p in pages] == [4, 4, 3] and pages[0].prev_cursor is None
+
+    back = keyset_page(crm.Order.query, sort, pages[-1].prev_cursor, size=4)
+    assert [o.id for o in back.items] == [o.id for o in pages[1].items]
+    first = keyset_page(crm.Order.query, sort, back.prev_cursor, size=4)
+    assert [o.id for o in first.items] == expected[:4] and first.prev_cursor is None
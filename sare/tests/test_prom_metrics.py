@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+
+from prom_metrics import FileRegistry, render
+
+REQUESTS = "crm_http_requests_total"
+LABELS = (("route", "/"), ("method", "GET"), ("status", "200"))
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def write_dump(directory, pid, value, token="old"):
+    (directory / f"{pid}.json").write_text(json.dumps({
+        "counters": [[REQUESTS, [list(p) for p in LABELS], value]],
+        "hists": [], "buckets": {}, "token": token,
+    }))
+
+
+def total(registry):
+    counters, _, _ = registry.collect()
+    return counters.get((REQUESTS, LABELS), 0)
+
+
+def test_dead_worker_counts_are_folded_once(tmp_path):
+    pid = dead_pid()
+    write_dump(tmp_path, pid, 7)
+    registry = FileRegistry(tmp_path)
+    registry.inc(REQUESTS, LABELS, 2)
+    assert total(registry) == 9
+    assert not (tmp_path / f"{pid}.json").exists() and (tmp_path / "dead.json").exists()
+    assert total(registry) == 9   # folded, not added again
+
+
+def test_reused_pid_does_not_overwrite_previous_counts(tmp_path):
+    write_dump(tmp_path, os.getpid(), 5, token="previous-process")
+    registry = FileRegistry(tmp_path)
+    registry.inc(REQUESTS, LABELS, 1)
+    registry.flush()
+    assert total(registry) == 6
+    assert json.loads((tmp_path / f"{os.getpid()}.json").read_text())["token"] == registry.token
+
+
+def test_retired_worker_keeps_its_counts(tmp_path):
+    registry = FileRegistry(tmp_path)
+    registry.inc(REQUESTS, LABELS, 3)
+    registry.retire()
+    assert not (tmp_path / f"{os.getpid()}.json").exists()
+    assert total(FileRegistry(tmp_path)) == 3
+
+
+def test_render_histogram_is_cumulative():
+    text = render({}, {("crm_http_request_duration_seconds", ()): [1, 2] + [0] * 9 + [1, 3.5]},
+                  {"crm_http_request_duration_seconds": (0.005, 0.01) + (1,) * 9}, {"crm_x": ("X.", 4)})
+    assert 'crm_http_request_duration_seconds_bucket{le="0.01"} 3' in text
+    assert 'crm_http_request_duration_seconds_count 4' in text and "crm_x 4" in text
+
+
+def test_customers_gauge_reads_the_maintained_counter(app_db):
+    crm = app_db
+    for i in range(3):
+        crm.db.session.add(crm.Customer(customer_id=f"G{i}", name="G", phone=f"8{i:09d}"))
+    crm.db.session.commit()
+    crm.db.session.delete(crm.db.session.query(crm.Customer).filter_by(customer_id="G0").one())
+    crm.db.session.commit()
+    assert crm.business_gauges()["crm_customers"][1] == 2
+    assert crm.reconcile_customer_stats(crm.db.engine, fix=False)["drifted"] == 0
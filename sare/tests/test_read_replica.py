@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from read_replica import ReadRouter
+from sqlite_profile import SQLiteProfile, install_sqlite_profile
+
+
+def primary(tmp_path):
+    path = tmp_path / "crm.db"
+    engine = create_engine(f"sqlite:///{path}")
+    install_sqlite_profile(engine, SQLiteProfile())
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (n INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+    return engine, path
+
+
+def count(router):
+    with router.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM t")).scalar()
+
+
+def add_row(engine):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO t VALUES (2)"))
+
+
+def test_ro_pool_sees_commits_but_cannot_write(tmp_path):
+    engine, path = primary(tmp_path)
+    router = ReadRouter(engine, path, mode="ro", profile=SQLiteProfile())
+    assert count(router) == 1
+    add_row(engine)
+    assert count(router) == 2
+    with router.connect() as conn, pytest.raises(OperationalError):
+        conn.execute(text("INSERT INTO t VALUES (3)"))
+
+
+def test_snapshot_lags_until_refreshed(tmp_path):
+    engine, path = primary(tmp_path)
+    snap = tmp_path / "snap.db"
+    router = ReadRouter(engine, path, mode="snapshot", snapshot_path=snap, refresh=3600, profile=SQLiteProfile())
+    assert router.refresh_snapshot(force=True)
+    assert count(router) == 1
+    add_row(engine)
+    assert count(router) == 1                                    # still the old copy
+    assert router.refresh_snapshot() is False                    # younger than `refresh`
+    router.reset()                                               # e.g. after a restore
+    assert count(router) == 2
+    assert router.status()["mode"] == "snapshot" and router.status()["age_seconds"] is not None
+
+
+def test_off_and_missing_read_side_use_the_primary(tmp_path):
+    engine, path = primary(tmp_path)
+    assert count(ReadRouter(engine, path, mode="off")) == 1
+    lost = ReadRouter(engine, path, mode="snapshot", snapshot_path=tmp_path / "none" / "snap.db", refresh=3600,
+                      profile=SQLiteProfile())
+    lost.maybe_refresh = lambda: None   # no snapshot yet, none coming
+    assert count(lost) == 1
+    with pytest.raises(ValueError):
+        ReadRouter(engine, path, mode="replica")
@@ -0,0 +1,64 @@
+import os
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+
+from reminders import ReminderScheduler, ensure_reminder_tables
+
+
+class Collect:
+    def __init__(self):
+        self.digests = []
+
+    def send(self, digest):
+        self.digests.append(digest)
+
+
+def lease_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'lease.db'}")
+    ensure_reminder_tables(engine)
+    return engine
+
+
+def test_one_leader_until_the_lease_expires(tmp_path):
+    engine = lease_engine(tmp_path)
+    a, b = ReminderScheduler(engine, Collect(), interval=60), ReminderScheduler(engine, Collect(), interval=60)
+    assert a.is_leader() and not b.is_leader() and a.is_leader()
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE scheduler_lease SET expires = :t"), {"t": time.time() - 1})
+    assert b.is_leader() and not a.is_leader()
+
+
+def test_forked_workers_get_their_own_holder(tmp_path):
+    engine = lease_engine(tmp_path)
+    scheduler = ReminderScheduler(engine, Collect(), interval=60)   # built before the fork (--preload)
+    parent = scheduler.holder
+    assert scheduler.is_leader()
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:   # the "worker": must not think it holds the parent's lease
+        engine.dispose(close=False)
+        os.write(write, f"{scheduler.holder}|{int(scheduler.is_leader())}".encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    child, child_leader = os.read(read, 1024).decode().split("|")
+    assert child != parent and child_leader == "0"
+
+
+def test_tick_sends_each_due_follow_up_once_a_day(app_db):
+    crm = app_db
+    crm.db.session.add(crm.Customer(customer_id="C1", name="Anita", phone="9000000001"))
+    today = date.today()
+    for days, status in ((-3, "Open"), (0, "Open"), (1, "Open"), (5, "Open"), (-1, "Done")):
+        crm.db.session.add(crm.FollowUp(customer_id="C1", followup_date=today + timedelta(days=days),
+                                        notes="call", status=status))
+    crm.db.session.commit()
+    notifier = Collect()
+    scheduler = ReminderScheduler(crm.db.engine, notifier, interval=60, lookahead_days=1,
+                                  name=f"test-{os.getpid()}-{time.time()}")
+    assert scheduler.tick(today) == 3
+    digest = notifier.digests[0]
+    assert (len(digest.overdue), len(digest.due_today), len(digest.upcoming)) == (1, 1, 1)
+    assert scheduler.tick(today) == 0
+    assert scheduler.tick(today + timedelta(days=1)) == 3   # still open: repeated the next day
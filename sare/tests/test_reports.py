@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from conftest import add_orders
+
+
+def daily(crm):
+    with crm.db.engine.connect() as conn:
+        return sorted(conn.execute(text(
+            "SELECT customer_id, day, payment_status, order_count, amount_total FROM order_daily"
+            " WHERE order_count != 0 OR amount_total != 0")).all())
+
+
+def test_incremental_daily_rollup_matches_a_rebuild(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid"), ("C1", 3, 250, "Pending"), ("C2", 3, 400, "Paid")])
+    session = crm.db.session
+    first, second, third = session.query(crm.Order).order_by(crm.Order.id).all()
+    first.payment_status, first.amount = "Pending", 120          # restatus + reprice
+    second.date, second.customer_id = date.today() - timedelta(days=10), "C2"   # move day + customer
+    session.delete(third)
+    session.commit()
+    incremental = daily(crm)
+    crm.rebuild_aggregates(crm.db.engine)
+    assert incremental == daily(crm)
+
+
+def test_report_totals_for_a_range(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid"), ("C1", 5, 250, "Pending"), ("C2", 30, 400, "Paid")])
+    start = (date.today() - timedelta(days=7)).isoformat()
+    with crm.db.engine.connect() as conn:
+        assert crm.order_range_totals(conn, date.fromisoformat(start)) == {"Paid": (1, 100), "Pending": (1, 250)}
+        assert crm.order_range_totals(conn, customer_id="C2") == {"Paid": (1, 400)}
+    resp = crm.app.test_client().get(f"/reports?from={start}")
+    assert resp.status_code == 200
+
+
+def test_unparseable_report_date_is_rejected(app_db):
+    client = app_db.app.test_client()
+    resp = client.get("/reports?from=2024-13-45")
+    assert resp.status_code == 400 and b"2024-13-45" in resp.data
+    assert client.get("/reports?to=31/01/2024").status_code == 200
@@ -0,0 +1,49 @@
+import logging
+
+from flask import Flask, render_template_string
+from sqlalchemy import create_engine, text
+
+from request_metrics import RequestMetrics, _pct
+
+
+def make_app(**kw):
+    app, engine = Flask(__name__), create_engine("sqlite://")
+    metrics = RequestMetrics(app, engine, **kw)
+
+    @app.route("/q/<int:n>")
+    def queries(n):
+        with engine.connect() as conn:
+            for i in range(n):
+                conn.execute(text("SELECT :i"), {"i": i})
+        return render_template_string("{{ n }} done", n=n)
+
+    return app, metrics
+
+
+def test_pct_is_nearest_rank():
+    vals = [float(i) for i in range(1, 101)]
+    assert (_pct(vals, 50), _pct(vals, 95), _pct([], 50)) == (50.0, 95.0, None)
+
+
+def test_queries_are_counted_per_request():
+    app, metrics = make_app()
+    client = app.test_client()
+    timing = client.get("/q/3").headers.getlist("Server-Timing")
+    assert timing[0].endswith('desc="3 queries"') and timing[1].startswith("tpl;dur=")
+    client.get("/q/1")
+    ep = metrics.snapshot()["endpoints"]["queries"]
+    assert (ep["requests"], ep["avg_queries"], ep["max_queries"]) == (2, 2.0, 3)
+    assert ep["n_plus_one"] is None
+
+
+def test_repeated_statement_is_logged_as_n_plus_one(caplog):
+    app, metrics = make_app(repeat_warn=5)
+    with caplog.at_level(logging.WARNING, logger="crm"):
+        app.test_client().get("/q/6")
+    assert "Possible N+1 in GET /q/6: same statement ran 6 times" in caplog.text
+    assert metrics.snapshot()["endpoints"]["queries"]["n_plus_one"]["repeats"] == 6
+
+
+def test_app_pages_report_their_queries(app_db):
+    resp = app_db.app.test_client().get("/dashboard")
+    assert resp.status_code == 200 and "queries" in resp.headers["Server-Timing"]
@@ -0,0 +1,38 @@
+from conftest import add_orders
+from response_cache import MISSING, MemoryCache, SQLiteCache, cached
+
+
+def test_memory_cache_is_an_lru_with_a_ttl():
+    cache = MemoryCache(maxsize=2, ttl=300)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")        # a is now the most recent
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, MISSING, 3)
+    cache.ttl = -1
+    cache.set("d", 4)
+    assert cache.get("d") is MISSING
+
+
+def test_sqlite_cache_is_shared_between_workers(tmp_path):
+    one, two = SQLiteCache(tmp_path / "cache.db"), SQLiteCache(tmp_path / "cache.db")
+    calls = []
+    assert cached(one, ("stats", 1), lambda: calls.append(1) or {"n": 1}) == {"n": 1}
+    assert cached(two, ("stats", 1), lambda: calls.append(2) or {"n": 2}) == {"n": 1}
+    assert calls == [1]
+
+
+def test_dashboard_stats_recompute_only_after_a_write(app_db, monkeypatch):
+    crm = app_db
+    monkeypatch.setattr(crm, "stats_cache", MemoryCache())
+    add_orders(crm, [("C1", 1, 100, "Paid")])
+    loads = []
+    real = crm.load_report_stats
+    monkeypatch.setattr(crm, "load_report_stats", lambda today: loads.append(today) or real(today))
+    with crm.app.test_request_context():
+        assert crm.dashboard_stats(crm.stats_version()).total_paid == 100
+        assert crm.dashboard_stats(crm.stats_version()).total_paid == 100
+        assert len(loads) == 1
+        add_orders(crm, [("C1", 2, 50, "Paid")])
+        assert crm.dashboard_stats(crm.stats_version()).total_paid == 150
+        assert len(loads) == 2
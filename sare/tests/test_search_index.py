@@ -0,0 +1,40 @@
+from sqlalchemy import select
+
+from conftest import add_orders
+from search_index import match_query, search_enabled, search_subquery
+
+
+def hits(crm, base, q):
+    sub = search_subquery(base, q)
+    return {rowid for (rowid,) in crm.db.session.execute(select(sub.c.rowid))}
+
+
+def test_match_query_quotes_prefix_terms():
+    assert match_query('silk "ban') == '"silk"* "ban"*'
+    assert match_query("  --  ") is None
+
+
+def test_triggers_keep_the_index_in_step(app_db):
+    crm = app_db
+    assert search_enabled("customer") and search_enabled("order")
+    session = crm.db.session
+    session.add(crm.Customer(customer_id="C1", name="Meera Iyer", phone="9000000001", city="Chennai"))
+    session.commit()
+    meera = crm.Customer.query.filter_by(customer_id="C1").one()
+    assert hits(crm, "customer", "mee che") == {meera.id}
+
+    meera.city = "Madurai"
+    session.commit()
+    assert hits(crm, "customer", "chennai") == set() and hits(crm, "customer", "madu") == {meera.id}
+
+    session.delete(meera)
+    session.commit()
+    assert hits(crm, "customer", "meera") == set()
+
+
+def test_search_ranks_orders_through_the_listing(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid"), ("C2", 2, 200, "Paid")])
+    query, sort = crm.listing_query("orders", "ORD-T2")
+    assert [row[0].order_id for row in query.all()] == ["ORD-T2"]
+    assert len(sort) == 2 and sort[-1][0] is crm.Order.id
@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+
+import segments
+from conftest import add_orders
+from segments import KEEP, classify, run_segmentation, segment_for
+
+
+def test_rules():
+    assert segment_for(5, 5, 5, single=False) == "VIP"
+    assert segment_for(5, 1, 1, single=True) == "New"
+    assert segment_for(3, 4, 2, single=False) == "Loyal"
+    assert segment_for(1, 5, 5, single=False) == "Lost"
+    assert segment_for(2, 3, 1, single=False) == "At Risk"
+    assert segment_for(3, 2, 2, single=False) == "Regular"
+
+
+@pytest.fixture(params=["stdlib", "numpy"])
+def backend(request, monkeypatch):
+    monkeypatch.setattr(segments, "np", pytest.importorskip("numpy") if request.param == "numpy" else None)
+    return request.param
+
+
+def test_classify_scores_by_quintile(backend):
+    today = date(2025, 6, 1)
+    rows = [(f"C{i}", (today - timedelta(days=10 * i)).isoformat(), 10 - i, 1000 * (10 - i)) for i in range(10)]
+    results, edges = classify(rows)
+    by_id = {cid: (seg, r, f, m) for cid, seg, r, f, m in results}
+    assert by_id["C0"] == ("VIP", 5, 5, 5) and by_id["C9"][1:] == (1, 1, 1)
+    assert set(edges) == {"r", "f", "m"} and classify(rows, edges)[0] == results
+
+
+def test_rows_without_a_readable_date_are_skipped(backend):
+    rows = [("C1", "2025-06-01", 3, 300), ("C2", "", 1, 100), ("C3", "01/06/2025", 2, 50), ("C4", None, 1, 10)]
+    results, _ = classify(rows)
+    assert [cid for cid, *_ in results] == ["C1"]
+    assert classify([("C2", "", 1, 100)]) == ([], None)
+
+
+def test_runs_set_ctype_but_keep_trade_accounts(app_db):
+    crm = app_db
+    add_orders(crm, [(f"C{i}", 40 * i, 100 * (5 - i), "Paid") for i in range(5)] + [("C0", 1, 500, "Paid")])
+    session = crm.db.session
+    trade = session.query(crm.Customer).filter_by(customer_id="C4").one()
+    trade.ctype = KEEP[0]
+    session.add(crm.Customer(customer_id="C9", name="Walk-in", phone="9200000000", ctype="Regular"))
+    session.commit()
+
+    first = run_segmentation(crm.db.engine, full=True)
+    ctypes = dict(session.query(crm.Customer.customer_id, crm.Customer.ctype))
+    assert first["scored"] == 5 and ctypes["C4"] == KEEP[0] and ctypes["C9"] == "Regular"
+    assert all(ctypes[f"C{i}"] in segments.SEGMENTS for i in range(4))
+    assert run_segmentation(crm.db.engine, full=True)["changed"] == 0   # nothing moved
+
+    add_orders(crm, [("C3", 0, 50, "Paid")])
+    incremental = run_segmentation(crm.db.engine)
+    assert (incremental["mode"], incremental["scored"]) == ("incremental", 1)
+
+
+def test_run_survives_legacy_rows_without_dates(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid"), ("C2", 2, 200, "Paid")])
+    with crm.db.engine.begin() as conn:
+        conn.execute(text("UPDATE customer_stats SET last_order_date = '' WHERE customer_id = 'C1'"))
+    assert run_segmentation(crm.db.engine, full=True)["scored"] == 1
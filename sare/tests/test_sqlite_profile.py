@@ -0,0 +1,29 @@
+from sqlalchemy import create_engine
+
+from sqlite_profile import SQLiteProfile, install_sqlite_profile
+
+
+def test_env_overrides_are_typed():
+    profile = SQLiteProfile.from_env({"CRM_SQLITE_BUSY_TIMEOUT": "9000", "CRM_SQLITE_FOREIGN_KEYS": "off",
+                                      "CRM_SQLITE_SYNCHRONOUS": "full"})
+    assert (profile.busy_timeout, profile.foreign_keys, profile.synchronous) == (9000, False, "FULL")
+    assert profile.journal_mode == "WAL"
+
+
+def test_every_new_connection_gets_the_pragmas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'p.db'}")
+    install_sqlite_profile(engine, SQLiteProfile(busy_timeout=7000, cache_size=-1000))
+    for _ in range(2):
+        with engine.connect() as conn:
+            pragma = conn.exec_driver_sql
+            assert pragma("PRAGMA journal_mode").scalar() == "wal"
+            assert pragma("PRAGMA busy_timeout").scalar() == 7000
+            assert pragma("PRAGMA cache_size").scalar() == -1000
+            assert pragma("PRAGMA foreign_keys").scalar() == 1
+            assert pragma("PRAGMA synchronous").scalar() == 1   # NORMAL
+        engine.dispose()
+
+
+def test_app_engine_runs_the_profile(app_db):
+    with app_db.db.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == app_db.sqlite_profile.busy_timeout
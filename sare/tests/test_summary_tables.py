@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from conftest import add_orders
+from summary_tables import apply_order_rows
+
+
+def summaries(crm):
+    with crm.db.engine.connect() as conn:
+        orders = conn.execute(text("SELECT * FROM order_summary WHERE order_count != 0 OR amount_total != 0"))
+        followups = conn.execute(text("SELECT * FROM followup_summary WHERE followup_count != 0"))
+        return sorted(orders.all()), sorted(followups.all())
+
+
+def test_incremental_summaries_match_a_rebuild(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid"), ("C1", 40, 250, "Pending"), ("C2", 90, 400, "Paid")])
+    session = crm.db.session
+    for status in ("Open", "Open", "Done"):
+        session.add(crm.FollowUp(customer_id="C1", followup_date=date.today(), notes="call", status=status))
+    session.commit()
+
+    first, second, third = crm.Order.query.order_by(crm.Order.id).all()
+    first.payment_status, first.payment_mode = "Pending", "Pending"
+    second.date, second.amount = date.today() - timedelta(days=400), 260
+    session.delete(third)
+    followup = crm.FollowUp.query.filter_by(status="Open").first()
+    followup.status = "Done"
+    session.delete(crm.FollowUp.query.filter_by(status="Done").first())
+    session.commit()
+
+    incremental = summaries(crm)
+    crm.rebuild_aggregates(crm.db.engine)
+    assert incremental == summaries(crm)
+
+
+def test_bulk_rows_are_folded_in(app_db):
+    crm = app_db
+    add_orders(crm, [("C1", 1, 100, "Paid")])
+    rows = [dict(order_id=f"ORD-B{i}", date=date.today(), customer_id="C1", saree_type="Silk", amount=50,
+                 purchase_type="Online", payment_status="Paid", payment_mode="Cash", delivery_status="Pending")
+            for i in range(3)]
+    with crm.db.engine.begin() as conn:
+        conn.execute(crm.Order.__table__.insert(), rows)
+        apply_order_rows(conn, rows)
+    incremental = summaries(crm)
+    crm.rebuild_aggregates(crm.db.engine)
+    assert incremental == summaries(crm)